@@ -5,7 +5,7 @@ from django.urls import reverse
 from django.utils import timezone
 from .models import (
     User, UserProfile, SubscriptionPlan, UserSubscription,
-    UserFavoriteArticle, UserCustomSource, APIUsageLog
+    UserFavoriteArticle, UserCustomSource, APIUsageLog, APIUsageDaily
 )
 
 
@@ -222,7 +222,7 @@ class UserCustomSourceAdmin(admin.ModelAdmin):
             'fields': ('user', 'name', 'url', 'description')
         }),
         ('Настройки парсинга', {
-            'fields': ('requires_headless', 'parsing_frequency')
+            'fields': ('requires_headless', 'parsing_frequency', 'crawl_source')
         }),
         ('Модерация', {
             'fields': ('status', 'admin_notes', 'approved_by', 'approved_at')
@@ -233,7 +233,7 @@ class UserCustomSourceAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'crawl_source']
     
     actions = ['approve_sources', 'reject_sources']
     
@@ -267,6 +267,8 @@ class APIUsageLogAdmin(admin.ModelAdmin):
         'user__email', 'endpoint', 'ip_address'
     ]
     date_hierarchy = 'created_at'
+    # Полный COUNT(*) по всем секциям на каждой странице не нужен
+    show_full_result_count = False
     readonly_fields = [
         'user', 'endpoint', 'method', 'status_code',
         'response_time', 'ip_address', 'user_agent', 'created_at'
@@ -277,3 +279,20 @@ class APIUsageLogAdmin(admin.ModelAdmin):
     
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(APIUsageDaily)
+class APIUsageDailyAdmin(admin.ModelAdmin):
+    """Админка для дневной статистики API."""
+    
+    list_display = ['user', 'date', 'requests_count']
+    list_filter = ['date']
+    search_fields = ['user__email']
+    date_hierarchy = 'date'
+    readonly_fields = ['user', 'date', 'requests_count']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,168 @@
+"""
+Сервис данных для дашбордов пользователя.
+
+Счетчики пользователя (избранное, свои источники) собираются одним
+запросом к User через подзапросы вместе с профилем, статистика API -
+одним запросом к дневным агрегатам за неделю. Готовые ответы
+dashboard_data и subscription_dashboard кэшируются на пользователя на
+DASHBOARD_CACHE_TTL секунд и сбрасываются сигналами при изменении
+избранного, источников, подписки и платежей. Использование квот не
+кэшируется - оно читается из движка квот при каждом запросе.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import entitlements, quota
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'dashboard:'
+API_USAGE_DAYS = 7
+
+
+def get_user_summary(user) -> Dict:
+    """Профиль и счетчики пользователя + API запросы за неделю (два запроса)."""
+    from .models import APIUsageDaily, User, UserCustomSource, UserFavoriteArticle
+
+    def count_of(model):
+        subquery = model.objects.filter(
+            user=OuterRef('pk')
+        ).order_by().values('user').annotate(total=Count('id')).values('total')
+        return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+    summary_user = User.objects.select_related('profile').annotate(
+        favorites_count=count_of(UserFavoriteArticle),
+        custom_sources_count=count_of(UserCustomSource),
+    ).get(pk=user.pk)
+
+    today = timezone.localdate()
+    api_usage_week = list(APIUsageDaily.objects.filter(
+        user=user,
+        date__gt=today - timedelta(days=API_USAGE_DAYS)
+    ).order_by('date').values_list('date', 'requests_count'))
+
+    return {
+        'user': summary_user,
+        'favorites_count': summary_user.favorites_count,
+        'custom_sources_count': summary_user.custom_sources_count,
+        'api_usage_week': [{'day': day, 'requests_count': count} for day, count in api_usage_week],
+        'api_requests_today': next((count for day, count in api_usage_week if day == today), 0),
+    }
+
+
+def get_usage_stats(user) -> Dict:
+    """Использование и лимиты пользователя из движка квот."""
+    usage = quota.get_usage(user.id)
+    limits = entitlements.get_entitlements(user).limits
+    return {
+        'daily_articles_read': usage['articles'],
+        'daily_articles_limit': limits['articles'],
+        'favorites_count': usage['favorites'],
+        'favorites_limit': limits['favorites'],
+        'exports_count': usage['exports'],
+        'exports_limit': limits['exports'],
+        'api_calls_count': usage['api'],
+        'api_calls_limit': limits['api'],
+        'reset_date': quota.next_daily_reset().isoformat()
+    }
+
+
+def get_dashboard_data(user) -> Dict:
+    """Ответ dashboard_data (кэшируется на пользователя)."""
+    from .models import UserFavoriteArticle
+    from .serializers import UserFavoriteArticleSerializer, UserSerializer, UserSubscriptionSerializer
+
+    key = _cache_key('data', user.id)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    summary = get_user_summary(user)
+    subscription = entitlements.get_entitlements(user).subscription
+    recent_favorites = UserFavoriteArticle.objects.filter(
+        user=user
+    ).select_related('article', 'article__source').order_by('-created_at')[:5]
+
+    data = {
+        'user': UserSerializer(summary['user']).data,
+        'subscription': UserSubscriptionSerializer(subscription).data if subscription else None,
+        'recent_favorites': UserFavoriteArticleSerializer(recent_favorites, many=True).data,
+        'api_usage_week': summary['api_usage_week'],
+        'stats': {
+            'total_favorites': summary['favorites_count'],
+            'total_custom_sources': summary['custom_sources_count'],
+            'api_requests_today': summary['api_requests_today'],
+        }
+    }
+    cache.set(key, data, _ttl())
+    return data
+
+
+def get_subscription_dashboard(user) -> Dict:
+    """Ответ subscription_dashboard; блок usage всегда актуальный."""
+    from .models import PaymentHistory, PaymentMethod
+    from .serializers import (
+        PaymentHistorySerializer, PaymentMethodSerializer,
+        UsageStatsSerializer, UserSubscriptionSerializer
+    )
+
+    key = _cache_key('subscription', user.id)
+    data = cache.get(key)
+    if data is None:
+        subscription = entitlements.get_entitlements(user).subscription
+        payment_methods = PaymentMethod.objects.filter(user=user, is_active=True)
+        recent_payments = PaymentHistory.objects.filter(
+            user=user
+        ).select_related('payment_method').order_by('-created_at')[:5]
+
+        data = {
+            'subscription': UserSubscriptionSerializer(subscription).data if subscription else None,
+            'plans': get_active_plans(),
+            'payment_methods': PaymentMethodSerializer(payment_methods, many=True).data,
+            'recent_payments': PaymentHistorySerializer(recent_payments, many=True).data,
+        }
+        cache.set(key, data, _ttl())
+
+    return {
+        'subscription': data['subscription'],
+        'usage': UsageStatsSerializer(get_usage_stats(user)).data,
+        'plans': data['plans'],
+        'payment_methods': data['payment_methods'],
+        'recent_payments': data['recent_payments'],
+    }
+
+
+def get_active_plans():
+    """Сериализованные активные планы (общие для всех пользователей)."""
+    from .models import SubscriptionPlan
+    from .serializers import SubscriptionPlanSerializer
+
+    key = f'{KEY_PREFIX}plans:v{entitlements.plans_generation()}'
+    plans = cache.get(key)
+    if plans is None:
+        plans = SubscriptionPlanSerializer(
+            SubscriptionPlan.objects.filter(is_active=True).order_by('price'), many=True
+        ).data
+        cache.set(key, plans, None)
+    return plans
+
+
+def invalidate(user_id: int) -> None:
+    """Сбрасывает закэшированные дашборды пользователя."""
+    cache.delete_many([_cache_key('data', user_id), _cache_key('subscription', user_id)])
+
+
+def _cache_key(kind: str, user_id: int) -> str:
+    return f'{KEY_PREFIX}{kind}:{user_id}'
+
+
+def _ttl() -> int:
+    return getattr(settings, 'DASHBOARD_CACHE_TTL', 30)
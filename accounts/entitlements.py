@@ -0,0 +1,120 @@
+"""
+Кэш прав пользователя: активная подписка, план и лимиты.
+
+Активная подписка (вместе с планом) ищется один раз: в пределах запроса
+результат запоминается на объекте пользователя, между запросами хранится
+в кэше Django. TTL записи не превышает времени до окончания подписки,
+поэтому истекшая подписка перестает действовать без явной очистки.
+
+Кэш сбрасывается сигналами (accounts/signals.py): изменение подписки
+удаляет запись пользователя, изменение любого плана меняет поколение
+ключей для всех пользователей.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import quota
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'entitlements:'
+PLANS_GENERATION_KEY = 'entitlements:plans_generation'
+FREE_PLAN_NAME = 'Бесплатный'
+
+_NO_SUBSCRIPTION = 'none'
+
+
+@dataclass
+class Entitlements:
+    """Права пользователя по активной подписке."""
+    subscription: Optional[object]
+
+    @property
+    def plan(self):
+        return self.subscription.plan if self.subscription else None
+
+    @property
+    def plan_name(self) -> str:
+        return self.plan.name if self.plan else FREE_PLAN_NAME
+
+    @property
+    def days_remaining(self) -> int:
+        return self.subscription.days_remaining if self.subscription else 0
+
+    @property
+    def limits(self) -> Dict[str, Optional[int]]:
+        """Лимиты по функциям движка квот (None - безлимит)."""
+        return quota.get_plan_limits(self.plan)
+
+    def has_feature(self, flag: str) -> bool:
+        """Включена ли премиум-функция плана (headless_parsing_enabled, api_access, ...)."""
+        return bool(self.plan and getattr(self.plan, flag, False))
+
+
+def get_entitlements(user) -> Entitlements:
+    """Права пользователя (мемоизация на запрос + кэш между запросами)."""
+    memo = getattr(user, '_entitlements_cache', None)
+    if memo is not None:
+        return memo
+
+    key = _cache_key(user.id)
+    cached = cache.get(key)
+    if cached is None:
+        subscription = _load_subscription(user)
+        cache.set(key, subscription or _NO_SUBSCRIPTION, _ttl_for(subscription))
+    else:
+        subscription = None if cached == _NO_SUBSCRIPTION else cached
+
+    if subscription is not None and not subscription.is_active:
+        subscription = None
+
+    entitlements = Entitlements(subscription=subscription)
+    user._entitlements_cache = entitlements
+    return entitlements
+
+
+def invalidate_user(user_id: int) -> None:
+    """Сбрасывает закэшированные права пользователя."""
+    cache.delete(_cache_key(user_id))
+
+
+def invalidate_all() -> None:
+    """Сбрасывает права всех пользователей (после изменения планов)."""
+    try:
+        cache.incr(PLANS_GENERATION_KEY)
+    except ValueError:
+        cache.set(PLANS_GENERATION_KEY, 2, None)
+
+
+def plans_generation() -> int:
+    """Текущее поколение планов (меняется при любом изменении планов)."""
+    return cache.get_or_set(PLANS_GENERATION_KEY, 1, None)
+
+
+def _cache_key(user_id: int) -> str:
+    return f'{KEY_PREFIX}v{plans_generation()}:{user_id}'
+
+
+def _load_subscription(user):
+    from .models import UserSubscription
+
+    return UserSubscription.objects.filter(
+        user=user,
+        status='active',
+        end_date__gt=timezone.now()
+    ).select_related('plan').first()
+
+
+def _ttl_for(subscription) -> int:
+    """TTL записи: не дольше ENTITLEMENTS_CACHE_TTL и окончания подписки."""
+    ttl = getattr(settings, 'ENTITLEMENTS_CACHE_TTL', 300)
+    if subscription is not None:
+        remaining = (subscription.end_date - timezone.now()).total_seconds()
+        ttl = max(1, min(ttl, int(remaining)))
+    return ttl
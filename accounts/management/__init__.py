@@ -0,0 +1 @@
+# Django management package 
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Django management команда для обслуживания секций логов API.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts import partitions
+
+
+class Command(BaseCommand):
+    help = 'Создает будущие помесячные секции APIUsageLog и удаляет устаревшие секции и строки DEFAULT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=getattr(settings, 'API_USAGE_LOG_PARTITIONS_AHEAD', 3),
+            help='Сколько будущих месяцев подготовить (по умолчанию: API_USAGE_LOG_PARTITIONS_AHEAD)',
+        )
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            default=getattr(settings, 'API_USAGE_LOG_RETENTION_MONTHS', 12),
+            help='Срок хранения логов в месяцах (по умолчанию: API_USAGE_LOG_RETENTION_MONTHS)',
+        )
+        parser.add_argument(
+            '--archive-dir',
+            default=getattr(settings, 'API_USAGE_LOG_ARCHIVE_DIR', None),
+            help='Каталог для выгрузки секций перед удалением (gzip CSV)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Показать что будет сделано, без выполнения изменений',
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            raise CommandError(f'Таблица {partitions.TABLE} не секционирована (нужен PostgreSQL и миграция 0004)')
+
+        ahead = options['ahead']
+        retention_months = options['retention_months']
+        archive_dir = options['archive_dir']
+        dry_run = options['dry_run']
+
+        expired = partitions.expired_partitions(retention_months)
+
+        if dry_run:
+            existing = set(partitions.list_partitions())
+            current = partitions.month_start(timezone.now().date())
+            missing = [
+                month for month in (partitions.add_months(current, offset) for offset in range(ahead + 1))
+                if month not in existing
+            ]
+            default_rows = partitions.expired_default_rows(retention_months)
+            self.stdout.write(self.style.WARNING(
+                f'DRY RUN: будет создано секций: {len(missing)}, удалено: {len(expired)}, '
+                f'строк из {partitions.DEFAULT_PARTITION}: {default_rows}'
+            ))
+            for month in missing:
+                self.stdout.write(f'  + {partitions.partition_name(month)}')
+            for month in expired:
+                self.stdout.write(f'  - {partitions.partition_name(month)}')
+            return
+
+        created = partitions.ensure_partitions(ahead)
+        for month in created:
+            self.stdout.write(self.style.SUCCESS(f'  + {partitions.partition_name(month)}'))
+
+        for month in expired:
+            if archive_dir:
+                path = partitions.archive_partition(month, archive_dir)
+                self.stdout.write(f'  → {partitions.partition_name(month)} выгружена в {path}')
+            partitions.drop_partition(month)
+            self.stdout.write(self.style.WARNING(f'  - {partitions.partition_name(month)}'))
+
+        default_rows, path = partitions.purge_default(retention_months, archive_dir)
+        if path:
+            self.stdout.write(f'  → устаревшие строки {partitions.DEFAULT_PARTITION} выгружены в {path}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: создано секций {len(created)}, удалено {len(expired)}, '
+            f'строк из {partitions.DEFAULT_PARTITION}: {default_rows}'
+        ))
@@ -0,0 +1,60 @@
+import logging
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import quota, usage_log
+
+logger = logging.getLogger(__name__)
+
+
+class APIUsageLogMiddleware:
+    """
+    Учет запросов аутентифицированных пользователей к API.
+
+    Метаданные запроса передаются в фоновую очередь (accounts/usage_log.py),
+    а дневной счетчик API вызовов увеличивается в движке квот -
+    ответ не ждет ни одной записи в БД.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'USAGE_LOG_ENABLED', True)
+        self.prefixes = tuple(getattr(settings, 'USAGE_LOG_PATH_PREFIXES', ('/api/',)))
+
+    def __call__(self, request):
+        if not self.enabled or not request.path.startswith(self.prefixes):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+
+        # DRF проставляет пользователя (в т.ч. по токену) в исходный HttpRequest
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return response
+
+        try:
+            usage_log.enqueue({
+                'user_id': user.id,
+                'endpoint': request.path[:200],
+                'method': request.method,
+                'status_code': response.status_code,
+                'response_time': time.perf_counter() - started,
+                'ip_address': self.get_client_ip(request),
+                'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+                'created_at': timezone.now(),
+            })
+            quota.consume(user.id, 'api')
+        except Exception as e:
+            logger.error(f"Ошибка учета запроса к API: {e}")
+
+        return response
+
+    @staticmethod
+    def get_client_ip(request) -> str:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+        return request.META.get('REMOTE_ADDR') or '0.0.0.0'
@@ -0,0 +1,111 @@
+# Помесячное секционирование accounts_apiusagelog по created_at (только PostgreSQL)
+
+from datetime import date, datetime, time, timezone
+
+from django.db import migrations
+
+TABLE = 'accounts_apiusagelog'
+SEQUENCE = 'accounts_apiusagelog_part_id_seq'
+COLUMNS = 'id, endpoint, method, status_code, response_time, ip_address, user_agent, created_at, user_id'
+PARTITIONS_AHEAD = 3
+
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month):
+    return datetime.combine(month, time.min, tzinfo=timezone.utc)
+
+
+def partition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_old")
+        cursor.execute(f"CREATE SEQUENCE {SEQUENCE}")
+        # Первичный ключ секционированной таблицы обязан включать ключ секционирования
+        cursor.execute(f"""
+            CREATE TABLE {TABLE} (
+                id bigint NOT NULL DEFAULT nextval('{SEQUENCE}'),
+                endpoint varchar(200) NOT NULL,
+                method varchar(10) NOT NULL,
+                status_code integer NOT NULL CHECK (status_code >= 0),
+                response_time double precision NOT NULL,
+                ip_address inet NOT NULL,
+                user_agent text NOT NULL,
+                created_at timestamp with time zone NOT NULL,
+                user_id bigint NOT NULL
+                    REFERENCES accounts_user (id) DEFERRABLE INITIALLY DEFERRED,
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+        """)
+        cursor.execute(f"ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id")
+        cursor.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+
+        # Секции для имеющихся данных и нескольких следующих месяцев
+        cursor.execute(f"SELECT MIN(created_at) FROM {TABLE}_old")
+        oldest = cursor.fetchone()[0]
+        current = datetime.now(timezone.utc).date().replace(day=1)
+        month = oldest.astimezone(timezone.utc).date().replace(day=1) if oldest else current
+        last = _add_months(current, PARTITIONS_AHEAD)
+        while month <= last:
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_p{month:%Y%m} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [_bound(month), _bound(_add_months(month, 1))]
+            )
+            month = _add_months(month, 1)
+
+        cursor.execute(f"INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {TABLE}_old")
+        cursor.execute(f"SELECT setval('{SEQUENCE}', COALESCE(MAX(id), 0) + 1, false) FROM {TABLE}")
+        cursor.execute(f"DROP TABLE {TABLE}_old")
+
+        # Индексы с прежними именами, чтобы состояние миграций совпадало с БД
+        cursor.execute(f"CREATE INDEX accounts_apiusagelog_user_id_idx ON {TABLE} (user_id)")
+        cursor.execute(f"CREATE INDEX accounts_ap_user_id_bed36f_idx ON {TABLE} (user_id, created_at)")
+        cursor.execute(f"CREATE INDEX accounts_ap_created_645b74_idx ON {TABLE} (created_at)")
+
+
+def unpartition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_partitioned")
+        cursor.execute("DROP INDEX accounts_apiusagelog_user_id_idx, "
+                       "accounts_ap_user_id_bed36f_idx, accounts_ap_created_645b74_idx")
+        cursor.execute(f"""
+            CREATE TABLE {TABLE} (
+                id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                endpoint varchar(200) NOT NULL,
+                method varchar(10) NOT NULL,
+                status_code integer NOT NULL CHECK (status_code >= 0),
+                response_time double precision NOT NULL,
+                ip_address inet NOT NULL,
+                user_agent text NOT NULL,
+                created_at timestamp with time zone NOT NULL,
+                user_id bigint NOT NULL
+                    REFERENCES accounts_user (id) DEFERRABLE INITIALLY DEFERRED
+            )
+        """)
+        cursor.execute(f"INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {TABLE}_partitioned")
+        cursor.execute(f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+                       f"COALESCE(MAX(id), 0) + 1, false) FROM {TABLE}")
+        cursor.execute(f"DROP TABLE {TABLE}_partitioned CASCADE")
+        cursor.execute(f"CREATE INDEX accounts_apiusagelog_user_id_idx ON {TABLE} (user_id)")
+        cursor.execute(f"CREATE INDEX accounts_ap_user_id_bed36f_idx ON {TABLE} (user_id, created_at)")
+        cursor.execute(f"CREATE INDEX accounts_ap_created_645b74_idx ON {TABLE} (created_at)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_api_usage_daily'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_table, unpartition_table),
+    ]
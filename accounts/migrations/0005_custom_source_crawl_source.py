@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-19 09:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_article_analyzer_version'),
+        ('accounts', '0004_partition_apiusagelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercustomsource',
+            name='crawl_source',
+            field=models.ForeignKey(blank=True, help_text='Общий источник, через который собираются статьи (один на URL)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='user_sources', to='core.source', verbose_name='Источник для парсинга'),
+        ),
+    ]
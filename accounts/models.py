@@ -430,6 +430,15 @@ class UserCustomSource(models.Model):
         default=60,
         verbose_name="Частота парсинга (мин)"
     )
+    crawl_source = models.ForeignKey(
+        'core.Source',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='user_sources',
+        verbose_name="Источник для парсинга",
+        help_text="Общий источник, через который собираются статьи (один на URL)"
+    )
     
     # Модерация
     admin_notes = models.TextField(
@@ -464,7 +473,12 @@ class UserCustomSource(models.Model):
 
 
 class APIUsageLog(models.Model):
-    """Лог использования API пользователями."""
+    """
+    Лог использования API пользователями.
+    
+    В PostgreSQL таблица секционирована по месяцам created_at
+    (accounts/partitions.py) - фильтруйте по диапазону created_at.
+    """
     
     user = models.ForeignKey(
         User,
@@ -493,7 +507,8 @@ class APIUsageLog(models.Model):
         blank=True,
         verbose_name="User Agent"
     )
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Время запроса")
+    # Не auto_now_add: записи сохраняются пакетно, время берется из запроса
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Время запроса")
 
     class Meta:
         verbose_name = "Лог API"
@@ -508,6 +523,31 @@ class APIUsageLog(models.Model):
         return f"{self.user.username} - {self.method} {self.endpoint}"
 
 
+class APIUsageDaily(models.Model):
+    """Количество API запросов пользователя за день (агрегат APIUsageLog)."""
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='api_usage_daily',
+        verbose_name="Пользователь"
+    )
+    date = models.DateField(verbose_name="Дата")
+    requests_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество запросов"
+    )
+
+    class Meta:
+        verbose_name = "API запросы за день"
+        verbose_name_plural = "API запросы по дням"
+        ordering = ['-date']
+        unique_together = ['user', 'date']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date}: {self.requests_count}"
+
+
 class UsageTracking(models.Model):
     """Отслеживание использования лимитов пользователем."""
     
@@ -560,51 +600,33 @@ class UsageTracking(models.Model):
     def __str__(self):
         return f"Использование {self.user.get_full_name()}"
 
-    def reset_daily_limits(self):
-        """Сбрасывает дневные лимиты."""
-        today = timezone.now().date()
-        if self.last_daily_reset < today:
-            self.daily_articles_read = 0
-            self.daily_api_calls = 0
-            self.last_daily_reset = today
-            self.save()
-
-    def reset_monthly_limits(self):
-        """Сбрасывает месячные лимиты."""
-        today = timezone.now().date()
-        if self.last_monthly_reset.month != today.month or self.last_monthly_reset.year != today.year:
-            self.monthly_exports = 0
-            self.last_monthly_reset = today
-            self.save()
+    # Счетчики ведет движок квот (accounts/quota.py): запись в модель
+    # выполняется пакетно, а окна учета определяются ключами, без сброса
 
     def increment_articles_read(self):
         """Увеличивает счетчик прочитанных статей."""
-        self.reset_daily_limits()
-        self.daily_articles_read += 1
-        self.save()
+        from .quota import consume
+        consume(self.user_id, 'articles')
 
     def increment_api_calls(self):
         """Увеличивает счетчик API вызовов."""
-        self.reset_daily_limits()
-        self.daily_api_calls += 1
-        self.save()
+        from .quota import consume
+        consume(self.user_id, 'api')
 
     def increment_exports(self):
         """Увеличивает счетчик экспортов."""
-        self.reset_monthly_limits()
-        self.monthly_exports += 1
-        self.save()
+        from .quota import consume
+        consume(self.user_id, 'exports')
 
     def increment_favorites(self):
         """Увеличивает счетчик избранных."""
-        self.total_favorites += 1
-        self.save()
+        from .quota import consume
+        consume(self.user_id, 'favorites')
 
     def decrement_favorites(self):
         """Уменьшает счетчик избранных."""
-        if self.total_favorites > 0:
-            self.total_favorites -= 1
-            self.save()
+        from .quota import release
+        release(self.user_id, 'favorites')
 
 
 class PaymentMethod(models.Model):
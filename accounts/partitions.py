@@ -0,0 +1,200 @@
+"""
+Помесячное секционирование таблицы логов API (PostgreSQL).
+
+accounts_apiusagelog - секционированная по RANGE (created_at) таблица
+(см. миграцию 0004): одна секция на календарный месяц плюс секция
+DEFAULT для строк вне созданных диапазонов. Команда
+manage_usage_partitions заранее создает секции на будущие месяцы
+и удаляет (при необходимости архивирует) секции старше
+API_USAGE_LOG_RETENTION_MONTHS, а также устаревшие строки секции DEFAULT.
+"""
+
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, time, timezone as dt_timezone
+from typing import List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'accounts_apiusagelog'
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_RE = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+
+
+def month_start(value: date) -> date:
+    """Первое число месяца."""
+    return value.replace(day=1)
+
+
+def add_months(value: date, months: int) -> date:
+    """Первое число месяца, отстоящего на months от value."""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Имя секции месяца."""
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def month_bounds(month: date) -> Tuple[datetime, datetime]:
+    """Границы месяца в UTC - совпадают с границами секции."""
+    start = datetime.combine(month_start(month), time.min, tzinfo=dt_timezone.utc)
+    end = datetime.combine(add_months(month, 1), time.min, tzinfo=dt_timezone.utc)
+    return start, end
+
+
+def is_partitioned() -> bool:
+    """Секционирована ли таблица логов (только PostgreSQL)."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s",
+            [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> List[date]:
+    """Месяцы существующих помесячных секций (по возрастанию)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s",
+            [TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    months = []
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_partition(month: date) -> bool:
+    """
+    Создает секцию месяца, если ее еще нет.
+
+    Строки этого месяца, попавшие в DEFAULT, переносятся в новую секцию
+    (иначе PostgreSQL не позволит ее создать).
+    """
+    month = month_start(month)
+    if month in list_partitions():
+        return False
+
+    name = partition_name(month)
+    start, end = month_bounds(month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            f"WHERE created_at >= %s AND created_at < %s)",
+            [start, end]
+        )
+        has_default_rows = cursor.fetchone()[0]
+
+        if has_default_rows:
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)",
+            [start, end]
+        )
+        if has_default_rows:
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                f"WHERE created_at >= %s AND created_at < %s RETURNING *) "
+                f"INSERT INTO {TABLE} SELECT * FROM moved",
+                [start, end]
+            )
+            cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+
+    logger.info(f"Создана секция {name}")
+    return True
+
+
+def ensure_partitions(ahead: int, today: Optional[date] = None) -> List[date]:
+    """Создает секции текущего и ahead следующих месяцев; возвращает созданные."""
+    current = month_start(today or timezone.now().date())
+    created = []
+    for offset in range(ahead + 1):
+        month = add_months(current, offset)
+        if create_partition(month):
+            created.append(month)
+    return created
+
+
+def retention_cutoff(retention_months: int, today: Optional[date] = None) -> date:
+    """Первый месяц, который еще хранится."""
+    return add_months(month_start(today or timezone.now().date()), -retention_months)
+
+
+def expired_partitions(retention_months: int, today: Optional[date] = None) -> List[date]:
+    """Секции целиком старше срока хранения."""
+    cutoff = retention_cutoff(retention_months, today)
+    return [month for month in list_partitions() if month < cutoff]
+
+
+def expired_default_rows(retention_months: int, today: Optional[date] = None) -> int:
+    """Количество строк секции DEFAULT старше срока хранения."""
+    start, _ = month_bounds(retention_cutoff(retention_months, today))
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {DEFAULT_PARTITION} WHERE created_at < %s", [start])
+        return cursor.fetchone()[0]
+
+
+def purge_default(retention_months: int, archive_dir: Optional[str] = None,
+                  today: Optional[date] = None) -> Tuple[int, Optional[str]]:
+    """
+    Удаляет из секции DEFAULT строки старше срока хранения.
+
+    Удаление секций их не затрагивает: в DEFAULT попадают строки месяцев,
+    для которых секция не была создана. При archive_dir строки сначала
+    выгружаются в gzip CSV. Возвращает (количество удаленных, путь к архиву).
+    """
+    cutoff = retention_cutoff(retention_months, today)
+    start, _ = month_bounds(cutoff)
+    path = None
+    with transaction.atomic(), connection.cursor() as cursor:
+        if archive_dir:
+            os.makedirs(archive_dir, exist_ok=True)
+            path = os.path.join(archive_dir, f'{DEFAULT_PARTITION}_before_{cutoff:%Y%m}.csv.gz')
+            query = cursor.mogrify(
+                f"SELECT * FROM {DEFAULT_PARTITION} WHERE created_at < %s", [start]
+            ).decode('utf-8')
+            with gzip.open(path, 'wt', encoding='utf-8') as archive:
+                cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+        cursor.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at < %s", [start])
+        deleted = cursor.rowcount
+    if deleted:
+        logger.info(f"Из {DEFAULT_PARTITION} удалено {deleted} строк старше {cutoff:%Y-%m}")
+    return deleted, path
+
+
+def archive_partition(month: date, archive_dir: str) -> str:
+    """Выгружает секцию в gzip CSV (COPY) и возвращает путь к файлу."""
+    os.makedirs(archive_dir, exist_ok=True)
+    name = partition_name(month)
+    path = os.path.join(archive_dir, f'{name}.csv.gz')
+    with connection.cursor() as cursor, gzip.open(path, 'wt', encoding='utf-8') as archive:
+        cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+    logger.info(f"Секция {name} выгружена в {path}")
+    return path
+
+
+def drop_partition(month: date) -> None:
+    """Отсоединяет и удаляет секцию месяца."""
+    name = partition_name(month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+        cursor.execute(f"DROP TABLE {name}")
+    logger.info(f"Удалена секция {name}")
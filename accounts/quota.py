@@ -0,0 +1,251 @@
+"""
+Движок квот использования (лимиты тарифных планов).
+
+Счетчики хранятся в быстром хранилище (core.kvstore), а окно учета
+закодировано в ключе: quota:{user}:{feature}:{YYYYMMDD|YYYYMM|all}.
+Новый день или месяц - это просто новый ключ, поэтому записи
+"сброса лимитов" не нужны, а старые ключи удаляются по TTL.
+
+Проверка и увеличение выполняются одной атомарной операцией
+(Lua-скрипт в Redis, блокировка в памяти процесса), поэтому
+конкурентные запросы не могут превысить лимит.
+
+UsageTracking остается долговременной копией: при первом обращении
+к окну счетчик засевается из БД, а измененные счетчики периодически
+записываются обратно задачей persist_usage_counters. Из пути запроса
+счетчики сохраняются, только если хранилище не общее (memory://):
+воркер Celery их не видит (не чаще QUOTA_PERSIST_INTERVAL).
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, time as dt_time, timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.kvstore import get_store
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'quota:'
+DIRTY_KEY = 'quota:dirty'
+
+# Функция -> (окно, поле UsageTracking, поле лимита плана, лимит без подписки)
+FEATURES = {
+    'articles': ('daily', 'daily_articles_read', 'daily_articles_limit', 10),
+    'api': ('daily', 'daily_api_calls', 'api_calls_limit', 0),
+    'exports': ('monthly', 'monthly_exports', 'exports_limit', 0),
+    'favorites': ('total', 'total_favorites', 'favorites_limit', 10),
+}
+
+# Время жизни ключей окна (сек) - с запасом на часовые пояса и сброс в БД
+WINDOW_TTLS = {
+    'daily': 2 * 24 * 3600,
+    'monthly': 32 * 24 * 3600,
+    'total': None,
+}
+
+_persist_lock = threading.Lock()
+_last_persist = time.monotonic()
+
+
+@dataclass
+class QuotaResult:
+    """Результат операции с квотой."""
+    allowed: bool
+    used: int
+    limit: Optional[int]
+
+
+def window_id(window: str, today=None) -> str:
+    """Идентификатор текущего окна учета."""
+    today = today or timezone.localdate()
+    if window == 'daily':
+        return today.strftime('%Y%m%d')
+    if window == 'monthly':
+        return today.strftime('%Y%m')
+    return 'all'
+
+
+def quota_key(user_id: int, feature: str, today=None) -> str:
+    """Ключ счетчика функции для текущего окна."""
+    window = FEATURES[feature][0]
+    return f'{KEY_PREFIX}{user_id}:{feature}:{window_id(window, today)}'
+
+
+def next_daily_reset() -> datetime:
+    """Момент начала следующего дневного окна."""
+    tomorrow = timezone.localdate() + timedelta(days=1)
+    return timezone.make_aware(datetime.combine(tomorrow, dt_time.min))
+
+
+def get_plan_limits(plan=None) -> Dict[str, Optional[int]]:
+    """Лимиты плана по функциям (None - безлимит); без плана - бесплатные лимиты."""
+    return {
+        feature: getattr(plan, limit_field) if plan else default
+        for feature, (_, _, limit_field, default) in FEATURES.items()
+    }
+
+
+def consume(user_id: int, feature: str, limit: Optional[int] = None, amount: int = 1) -> QuotaResult:
+    """
+    Атомарно расходует квоту.
+
+    Если после увеличения счетчик превысит limit, он не меняется
+    и возвращается allowed=False. limit=None - учет без ограничения.
+    """
+    store = get_store()
+    key = _seeded_key(store, user_id, feature)
+    allowed, used = store.incr_with_limit(key, amount, limit, WINDOW_TTLS[FEATURES[feature][0]])
+    if allowed:
+        store.hincrby(DIRTY_KEY, str(user_id), 1)
+        if not store.is_shared:
+            _maybe_persist()
+    return QuotaResult(allowed=allowed, used=used, limit=limit)
+
+
+def release(user_id: int, feature: str, amount: int = 1) -> int:
+    """Возвращает ранее израсходованную квоту (счетчик не опускается ниже нуля)."""
+    store = get_store()
+    key = _seeded_key(store, user_id, feature)
+    ttl = WINDOW_TTLS[FEATURES[feature][0]]
+    _, used = store.incr_with_limit(key, -amount, None, ttl)
+    if used < 0:
+        _, used = store.incr_with_limit(key, -used, None, ttl)
+    store.hincrby(DIRTY_KEY, str(user_id), 1)
+    if not store.is_shared:
+        _maybe_persist()
+    return used
+
+
+def is_allowed(user_id: int, feature: str, limit: Optional[int]) -> bool:
+    """
+    Можно ли израсходовать еще единицу квоты (без расходования).
+
+    Проверка выполняется той же атомарной операцией, что и consume:
+    приращение на 0 с лимитом limit - 1.
+    """
+    if limit is None:
+        return True
+    if limit <= 0:
+        return False
+    store = get_store()
+    key = _seeded_key(store, user_id, feature)
+    allowed, _ = store.incr_with_limit(key, 0, limit - 1, WINDOW_TTLS[FEATURES[feature][0]])
+    return allowed
+
+
+def get_usage(user_id: int) -> Dict[str, int]:
+    """Текущее использование по всем функциям {feature: значение}."""
+    store = get_store()
+    today = timezone.localdate()
+    keys = {feature: quota_key(user_id, feature, today) for feature in FEATURES}
+    values = dict(zip(keys, store.mget(keys.values())))
+
+    missing = [feature for feature, value in values.items() if value is None]
+    if missing:
+        seeds = _load_seeds(user_id, today)
+        for feature in missing:
+            window = FEATURES[feature][0]
+            store.set_if_absent(keys[feature], str(seeds[feature]), WINDOW_TTLS[window])
+        values.update(zip(missing, store.mget(keys[feature] for feature in missing)))
+
+    return {feature: int(value or 0) for feature, value in values.items()}
+
+
+def persist_usage() -> Dict[str, int]:
+    """
+    Записывает измененные счетчики в UsageTracking.
+
+    Пользователи с изменениями накапливаются в DIRTY_KEY; для них
+    одним bulk_update/bulk_create сохраняются значения текущих окон.
+    Новые строки вставляются как upsert: если строку пользователя
+    параллельно создал другой процесс, она обновляется, а не теряется.
+    """
+    from .models import UsageTracking
+
+    store = get_store()
+    dirty = store.hpop_all(DIRTY_KEY)
+    if not dirty:
+        return {'users': 0}
+
+    user_ids = [int(user_id) for user_id in dirty]
+    today = timezone.localdate()
+    fields = [field for _, field, _, _ in FEATURES.values()]
+
+    try:
+        existing = {row.user_id: row for row in UsageTracking.objects.filter(user_id__in=user_ids)}
+        to_create = []
+        for user_id in user_ids:
+            usage = get_usage(user_id)
+            row = existing.get(user_id) or UsageTracking(user_id=user_id)
+            for feature, (_, field, _, _) in FEATURES.items():
+                setattr(row, field, usage[feature])
+            row.last_daily_reset = today
+            row.last_monthly_reset = today
+            if row.pk is None:
+                to_create.append(row)
+
+        update_fields = fields + ['last_daily_reset', 'last_monthly_reset']
+        UsageTracking.objects.bulk_update(list(existing.values()), update_fields)
+        UsageTracking.objects.bulk_create(
+            to_create, update_conflicts=True, unique_fields=['user'], update_fields=update_fields
+        )
+    except Exception as e:
+        logger.error(f"Ошибка сохранения квот, возвращаем в очередь: {e}")
+        for user_id, count in dirty.items():
+            store.hincrby(DIRTY_KEY, user_id, count)
+        raise
+
+    logger.debug(f"Сохранены счетчики квот для {len(user_ids)} пользователей")
+    return {'users': len(user_ids)}
+
+
+def _seeded_key(store, user_id: int, feature: str) -> str:
+    """Ключ счетчика; при первом обращении к окну засевает его из БД."""
+    today = timezone.localdate()
+    key = quota_key(user_id, feature, today)
+    if store.get(key) is None:
+        seed = _load_seeds(user_id, today)[feature]
+        store.set_if_absent(key, str(seed), WINDOW_TTLS[FEATURES[feature][0]])
+    return key
+
+
+def _load_seeds(user_id: int, today) -> Dict[str, int]:
+    """Начальные значения счетчиков из UsageTracking с учетом окон."""
+    from .models import UsageTracking
+
+    seeds = {feature: 0 for feature in FEATURES}
+    row = UsageTracking.objects.filter(user_id=user_id).first()
+    if row is None:
+        return seeds
+
+    for feature, (window, field, _, _) in FEATURES.items():
+        if window == 'daily' and row.last_daily_reset != today:
+            continue
+        if window == 'monthly' and (row.last_monthly_reset.year, row.last_monthly_reset.month) != (today.year, today.month):
+            continue
+        seeds[feature] = getattr(row, field)
+    return seeds
+
+
+def _maybe_persist() -> None:
+    """Сохраняет счетчики, если с прошлого сохранения прошло достаточно времени."""
+    global _last_persist
+
+    interval = getattr(settings, 'QUOTA_PERSIST_INTERVAL', 30)
+    if time.monotonic() - _last_persist < interval:
+        return
+    if not _persist_lock.acquire(blocking=False):
+        return
+    try:
+        _last_persist = time.monotonic()
+        persist_usage()
+    except Exception as e:
+        logger.error(f"Не удалось сохранить счетчики квот: {e}")
+    finally:
+        _persist_lock.release()
@@ -1,6 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import User, UserProfile
+from . import dashboard, favorites
+from .entitlements import invalidate_all, invalidate_user
+from .models import (
+    PaymentHistory, PaymentMethod, SubscriptionPlan, User, UserCustomSource,
+    UserFavoriteArticle, UserProfile, UserSubscription
+)
 
 
 @receiver(post_save, sender=User)
@@ -16,4 +21,39 @@ def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, 'profile'):
         instance.profile.save()
     else:
-        UserProfile.objects.create(user=instance) 
\ No newline at end of file
+        UserProfile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=UserSubscription)
+@receiver(post_delete, sender=UserSubscription)
+def invalidate_subscription_entitlements(sender, instance, **kwargs):
+    """Сбрасывает кэш прав пользователя при изменении его подписки."""
+    invalidate_user(instance.user_id)
+    dashboard.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=SubscriptionPlan)
+@receiver(post_delete, sender=SubscriptionPlan)
+def invalidate_plan_entitlements(sender, instance, **kwargs):
+    """Сбрасывает кэш прав всех пользователей при изменении плана."""
+    invalidate_all()
+
+
+@receiver(post_save, sender=UserFavoriteArticle)
+@receiver(post_delete, sender=UserFavoriteArticle)
+def invalidate_user_favorites(sender, instance, **kwargs):
+    """Сбрасывает закэшированное множество избранных статей пользователя."""
+    favorites.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=UserFavoriteArticle)
+@receiver(post_delete, sender=UserFavoriteArticle)
+@receiver(post_save, sender=UserCustomSource)
+@receiver(post_delete, sender=UserCustomSource)
+@receiver(post_save, sender=PaymentMethod)
+@receiver(post_delete, sender=PaymentMethod)
+@receiver(post_save, sender=PaymentHistory)
+@receiver(post_delete, sender=PaymentHistory)
+def invalidate_user_dashboard(sender, instance, **kwargs):
+    """Сбрасывает закэшированные дашборды пользователя."""
+    dashboard.invalidate(instance.user_id)
@@ -1,3 +1,365 @@
-from django.test import TestCase
+import gzip
+import os
+import queue
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.kvstore import MemoryStore, reset_store
+from core.models import Article, Source
+
+from . import partitions, quota, usage_log
+from .models import (
+    APIUsageDaily, APIUsageLog, PaymentHistory, PaymentMethod, SubscriptionPlan, UsageTracking, User,
+    UserCustomSource, UserFavoriteArticle, UserSubscription
+)
+
+
+@override_settings(USAGE_LOG_ENABLED=False)
+class DashboardQueryCountTests(APITestCase):
+    """Регрессия количества запросов к БД для дашбордов."""
+
+    def setUp(self):
+        cache.clear()
+        reset_store(MemoryStore())
+
+        self.user = User.objects.create_user(
+            email='reader@example.com', username='reader', password='secret-pass-123',
+            first_name='Test', last_name='Reader'
+        )
+        plan = SubscriptionPlan.objects.create(
+            name='Премиум', slug='premium', plan_type='premium', description='Премиум план',
+            price=Decimal('9.99'), daily_articles_limit=None, favorites_limit=100,
+            exports_limit=10, api_calls_limit=1000
+        )
+        SubscriptionPlan.objects.create(
+            name='Базовый', slug='basic', plan_type='basic', description='Базовый план',
+            price=Decimal('4.99'), daily_articles_limit=50
+        )
+        subscription = UserSubscription.objects.create(
+            user=self.user, plan=plan, status='active', start_date=timezone.now(),
+            end_date=timezone.now() + timedelta(days=30), amount_paid=plan.price
+        )
+
+        source = Source.objects.create(name='Источник', url='https://example.com', type='html')
+        for index in range(5):
+            article = Article.objects.create(
+                title=f'Статья {index}', url=f'https://example.com/{index}',
+                source=source, published_at=timezone.now()
+            )
+            UserFavoriteArticle.objects.create(user=self.user, article=article)
+        UserCustomSource.objects.create(user=self.user, name='Мой блог', url='https://blog.example.com')
+
+        today = timezone.localdate()
+        for offset in range(3):
+            APIUsageDaily.objects.create(user=self.user, date=today - timedelta(days=offset), requests_count=offset + 1)
+
+        method = PaymentMethod.objects.create(
+            user=self.user, type='card', last_four='4242', card_brand='visa', provider_id='pm_1'
+        )
+        for index in range(3):
+            PaymentHistory.objects.create(
+                user=self.user, subscription=subscription, payment_method=method, amount=plan.price,
+                payment_intent_id=f'pi_{index}', description=f'Подписка на план {plan.name}'
+            )
+
+        cache.clear()
+        self.client.force_authenticate(user=self.user)
+
+    def test_dashboard_data_query_count(self):
+        # подписка, пользователь со счетчиками, API за неделю, последние избранные
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('accounts:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stats']['total_favorites'], 5)
+        self.assertEqual(response.data['stats']['total_custom_sources'], 1)
+        self.assertEqual(response.data['stats']['api_requests_today'], 1)
+        self.assertEqual(len(response.data['api_usage_week']), 3)
+        self.assertEqual(len(response.data['recent_favorites']), 5)
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse('accounts:dashboard'))
+
+    def test_subscription_dashboard_query_count(self):
+        # подписка, способы оплаты, платежи с методом, планы, засев квот
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('accounts:subscription-dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['subscription']['plan']['slug'], 'premium')
+        self.assertEqual(len(response.data['plans']), 2)
+        self.assertEqual(len(response.data['recent_payments']), 3)
+        self.assertEqual(response.data['usage']['favorites_limit'], 100)
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse('accounts:subscription-dashboard'))
+
+    def test_user_stats_query_count(self):
+        # подписка, пользователь со счетчиками, API за неделю
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('accounts:user-stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['favorite_articles_count'], 5)
+        self.assertEqual(response.data['subscription_status'], 'Премиум')
+
+    def test_favorite_change_invalidates_dashboard(self):
+        self.client.get(reverse('accounts:dashboard'))
+        UserFavoriteArticle.objects.filter(user=self.user).first().delete()
+
+        response = self.client.get(reverse('accounts:dashboard'))
+        self.assertEqual(response.data['stats']['total_favorites'], 4)
+
+
+@override_settings(USAGE_LOG_ENABLED=False)
+class FavoriteStatusQueryCountTests(APITestCase):
+    """Статус избранного для ленты - не больше одного запроса на страницу."""
+
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(
+            email='fan@example.com', username='fan', password='secret-pass-123'
+        )
+        source = Source.objects.create(name='Источник', url='https://example.com', type='html')
+        self.articles = [
+            Article.objects.create(
+                title=f'Статья {index}', url=f'https://example.com/{index}',
+                source=source, published_at=timezone.now()
+            )
+            for index in range(20)
+        ]
+        for article in self.articles[:3]:
+            UserFavoriteArticle.objects.create(user=self.user, article=article)
+
+        cache.clear()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_status_query_count(self):
+        ids = [article.id for article in self.articles]
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('accounts:favorite-status'), {'article_ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['favorites'][str(ids[0])])
+        self.assertFalse(response.data['favorites'][str(ids[-1])])
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse('accounts:favorite-status'), {'ids': ','.join(map(str, ids))})
+
+    def test_article_list_with_favorites_costs_one_query(self):
+        with CaptureQueriesContext(connection) as plain:
+            self.client.get(reverse('api:article-list'))
+        cache.clear()
+        with CaptureQueriesContext(connection) as flagged:
+            response = self.client.get(reverse('api:article-list'), {'with_favorites': 'true'})
+
+        self.assertEqual(len(flagged), len(plain) + 1)
+        flags = {item['id']: item['is_favorite'] for item in response.data['results']}
+        self.assertTrue(flags[self.articles[0].id])
+        self.assertFalse(flags[self.articles[-1].id])
+
+    def test_toggle_invalidates_favorite_ids(self):
+        article = self.articles[-1]
+        self.client.get(reverse('accounts:check-favorite', args=[article.id]))
+        self.client.post(reverse('accounts:toggle-favorite', args=[article.id]))
+
+        response = self.client.get(reverse('accounts:check-favorite', args=[article.id]))
+        self.assertTrue(response.data['is_favorite'])
+
+
+class CustomSourceCrawlPlanTests(APITestCase):
+    """Планирование парсинга пользовательских источников."""
+
+    def setUp(self):
+        self.free_user = User.objects.create_user(
+            email='free@example.com', username='free', password='secret-pass-123'
+        )
+        self.premium_user = User.objects.create_user(
+            email='premium@example.com', username='premium', password='secret-pass-123'
+        )
+        plan = SubscriptionPlan.objects.create(
+            name='Премиум', slug='premium', plan_type='premium', description='Премиум план',
+            price=Decimal('9.99'), headless_parsing_enabled=True
+        )
+        UserSubscription.objects.create(
+            user=self.premium_user, plan=plan, status='active', start_date=timezone.now(),
+            end_date=timezone.now() + timedelta(days=30), amount_paid=plan.price
+        )
+
+    def test_same_url_is_crawled_once_with_best_plan(self):
+        from scraper import custom_sources
+
+        for user in (self.free_user, self.premium_user):
+            UserCustomSource.objects.create(
+                user=user, name='Блог', url='https://blog.example.com', status='approved',
+                parsing_frequency=10
+            )
+
+        self.assertEqual(custom_sources.link_crawl_sources(), 2)
+        self.assertEqual(Source.objects.filter(url='https://blog.example.com', is_active=False).count(), 1)
+
+        targets = custom_sources.plan_targets()
+        self.assertEqual(len(targets), 1)
+        self.assertEqual(targets[0].tier, 'premium')
+        self.assertEqual(targets[0].subscribers, 2)
+        self.assertEqual(targets[0].interval, 15)
+
+        Source.objects.filter(id=targets[0].source_id).update(last_parsed=timezone.now())
+        self.assertEqual(custom_sources.plan_targets(), [])
+
+    def test_headless_source_requires_plan_feature(self):
+        from scraper import custom_sources
+
+        UserCustomSource.objects.create(
+            user=self.free_user, name='SPA', url='https://spa.example.com', status='approved',
+            requires_headless=True
+        )
+        custom_sources.link_crawl_sources()
+        self.assertEqual(custom_sources.plan_targets(), [])
+
+
+@override_settings(USAGE_LOG_ENABLED=False, QUOTA_PERSIST_INTERVAL=0)
+class QuotaTests(APITestCase):
+    """Квоты: проверка лимита и сохранение счетчиков в UsageTracking."""
+
+    def setUp(self):
+        cache.clear()
+        reset_store(MemoryStore())
+        self.user = User.objects.create_user(email='free@example.com', username='free', password='secret-pass-123')
+
+    def tearDown(self):
+        reset_store(None)
+
+    def test_check_limit(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('accounts:check-limit', args=['favorites'])
+        for _ in range(9):
+            quota.consume(self.user.id, 'favorites', limit=10)
+        self.assertTrue(self.client.get(url).data['allowed'])
+
+        quota.consume(self.user.id, 'favorites', limit=10)
+        self.assertFalse(self.client.get(url).data['allowed'])
+        self.assertFalse(self.client.get(reverse('accounts:check-limit', args=['exports'])).data['allowed'])
+        self.assertEqual(quota.get_usage(self.user.id)['favorites'], 10)
+
+    def test_request_path_persists_only_process_store(self):
+        with patch.object(quota, 'persist_usage') as persist:
+            quota.consume(self.user.id, 'articles', limit=None)
+        persist.assert_called_once()
+
+        shared = MemoryStore()
+        shared.is_shared = True
+        reset_store(shared)
+        with patch.object(quota, 'persist_usage') as persist:
+            quota.consume(self.user.id, 'articles', limit=None)
+            quota.release(self.user.id, 'articles')
+        persist.assert_not_called()
+
+    def test_persist_updates_concurrently_created_row(self):
+        for _ in range(3):
+            quota.consume(self.user.id, 'api', limit=None)
+        UsageTracking.objects.filter(user=self.user).delete()
+        quota.get_store().hincrby(quota.DIRTY_KEY, str(self.user.id), 1)
+
+        # Строку создал другой процесс после выборки существующих
+        real_filter = UsageTracking.objects.filter
+
+        def filter_before_insert(*args, **kwargs):
+            if 'user_id__in' in kwargs:
+                UsageTracking.objects.create(user=self.user, daily_api_calls=1)
+                return UsageTracking.objects.none()
+            return real_filter(*args, **kwargs)
+
+        with patch.object(UsageTracking.objects, 'filter', side_effect=filter_before_insert):
+            self.assertEqual(quota.persist_usage(), {'users': 1})
+
+        self.assertEqual(UsageTracking.objects.get(user=self.user).daily_api_calls, 3)
+
+
+class UsageLogQueueTests(SimpleTestCase):
+    """Очередь логов API и поток их записи."""
+
+    def entry(self, index):
+        return {'user_id': 1, 'endpoint': f'/api/articles/{index}/', 'created_at': timezone.now()}
+
+    def test_drop_when_full(self):
+        dropped = usage_log.get_stats()['dropped']
+        with patch.object(usage_log, '_ensure_started'), \
+                patch.object(usage_log, '_queue', queue.Queue(maxsize=2)):
+            results = [usage_log.enqueue(self.entry(index)) for index in range(3)]
+            self.assertEqual(usage_log.get_stats()['pending'], 2)
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(usage_log.get_stats()['dropped'], dropped + 1)
+
+    @override_settings(USAGE_LOG_BATCH_SIZE=2)
+    def test_drain_by_size(self):
+        pending = queue.Queue()
+        for index in range(5):
+            pending.put(self.entry(index))
+        with patch.object(usage_log, '_queue', pending):
+            started = time.monotonic()
+            self.assertEqual(len(usage_log._drain(timeout=5)), 2)
+            self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(pending.qsize(), 3)
+
+    @override_settings(USAGE_LOG_BATCH_SIZE=10)
+    def test_drain_by_time(self):
+        pending = queue.Queue()
+        pending.put(self.entry(0))
+        with patch.object(usage_log, '_queue', pending):
+            started = time.monotonic()
+            self.assertEqual(len(usage_log._drain(timeout=0.2)), 1)
+            self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+    @override_settings(USAGE_LOG_BATCH_SIZE=3, USAGE_LOG_FLUSH_INTERVAL=0.1)
+    def test_flusher_writes_full_batch_then_remainder(self):
+        with patch.object(usage_log, 'write_entries') as write:
+            for index in range(4):
+                self.assertTrue(usage_log.enqueue(self.entry(index)))
+
+            deadline = time.monotonic() + 10
+            while sum(len(call.args[0]) for call in write.call_args_list) < 4 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual([len(call.args[0]) for call in write.call_args_list], [3, 1])
+
+
+@override_settings(USAGE_LOG_ENABLED=False)
+class UsagePartitionRetentionTests(TestCase):
+    """Срок хранения логов API распространяется и на секцию DEFAULT."""
+
+    def setUp(self):
+        if not partitions.is_partitioned():
+            self.skipTest('Нужна секционированная таблица (PostgreSQL)')
+        self.user = User.objects.create_user(username='logs', email='logs@example.com', password='pass12345')
+
+    def add_log(self, days_ago):
+        return APIUsageLog.objects.create(
+            user=self.user, endpoint='/api/articles/', method='GET', status_code=200,
+            response_time=0.01, ip_address='127.0.0.1', created_at=timezone.now() - timedelta(days=days_ago)
+        )
+
+    def test_purges_expired_default_rows(self):
+        expired = self.add_log(days_ago=3 * 365)
+        kept = self.add_log(days_ago=60)
+
+        call_command('manage_usage_partitions', retention_months=12, dry_run=True, stdout=StringIO())
+        self.assertEqual(partitions.expired_default_rows(12), 1)
+
+        with TemporaryDirectory() as archive_dir:
+            call_command('manage_usage_partitions', retention_months=12, archive_dir=archive_dir, stdout=StringIO())
+            with gzip.open(os.path.join(archive_dir, os.listdir(archive_dir)[0]), 'rt', encoding='utf-8') as archive:
+                self.assertEqual(len(archive.read().splitlines()), 2)
+        self.assertEqual(partitions.expired_default_rows(12), 0)
+        self.assertFalse(APIUsageLog.objects.filter(id=expired.id).exists())
+        self.assertTrue(APIUsageLog.objects.filter(id=kept.id).exists())
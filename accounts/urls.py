@@ -40,4 +40,5 @@ urlpatterns = [
     path('favorites/<int:pk>/', views.UserFavoriteArticleDetailView.as_view(), name='favorite-detail'),
     path('articles/<int:article_id>/toggle-favorite/', views.toggle_favorite_article, name='toggle-favorite'),
     path('articles/<int:article_id>/check-favorite/', views.check_favorite_article, name='check-favorite'),
+    path('articles/favorite-status/', views.favorite_status, name='favorite-status'),
 ] 
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Асинхронная пакетная запись логов использования API.
+
+Middleware кладет метаданные запроса в ограниченную очередь процесса
+(enqueue не блокирует и не обращается к БД). Фоновый поток забирает
+записи и сохраняет их через bulk_create, как только накопится
+USAGE_LOG_BATCH_SIZE записей или пройдет USAGE_LOG_FLUSH_INTERVAL секунд.
+
+Вместе с логами обновляются дневные агрегаты APIUsageDaily, поэтому
+дашборды читают готовые счетчики, а не считают строки APIUsageLog.
+При переполнении очереди записи отбрасываются (запрос важнее лога).
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_queue = None
+_flusher = None
+_start_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {'enqueued': 0, 'dropped': 0, 'written': 0}
+
+
+def enqueue(entry: Dict) -> bool:
+    """Добавляет запись в очередь; False, если очередь переполнена."""
+    _ensure_started()
+    try:
+        _queue.put_nowait(entry)
+    except queue.Full:
+        _count('dropped')
+        return False
+    _count('enqueued')
+    return True
+
+
+def get_stats() -> Dict[str, int]:
+    """Счетчики очереди логов."""
+    with _stats_lock:
+        stats = dict(_stats)
+    return {**stats, 'pending': _queue.qsize() if _queue else 0}
+
+
+def write_entries(entries: List[Dict]) -> int:
+    """Сохраняет пачку записей и обновляет дневные агрегаты."""
+    from .models import APIUsageLog
+
+    if not entries:
+        return 0
+
+    APIUsageLog.objects.bulk_create(
+        [APIUsageLog(**entry) for entry in entries],
+        batch_size=getattr(settings, 'USAGE_LOG_BATCH_SIZE', 500)
+    )
+    _update_daily_counters(Counter(
+        (entry['user_id'], timezone.localdate(entry['created_at'])) for entry in entries
+    ))
+    _count('written', len(entries))
+    return len(entries)
+
+
+def flush(timeout: float = 0) -> int:
+    """Синхронно записывает все, что сейчас лежит в очереди."""
+    entries = _drain(timeout)
+    return write_entries(entries)
+
+
+def _count(name: str, amount: int = 1) -> None:
+    """Увеличивает счетчик очереди (enqueue вызывается из разных потоков)."""
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _update_daily_counters(counts: Counter) -> None:
+    """Атомарно прибавляет количество запросов к дневным агрегатам."""
+    from .models import APIUsageDaily
+
+    for (user_id, date), count in counts.items():
+        daily = APIUsageDaily.objects.filter(user_id=user_id, date=date)
+        if daily.update(requests_count=F('requests_count') + count):
+            continue
+        try:
+            with transaction.atomic():
+                APIUsageDaily.objects.create(user_id=user_id, date=date, requests_count=count)
+        except IntegrityError:
+            # Строку успел создать другой процесс
+            daily.update(requests_count=F('requests_count') + count)
+
+
+def _drain(timeout: float) -> List[Dict]:
+    """Забирает из очереди до USAGE_LOG_BATCH_SIZE записей."""
+    if _queue is None:
+        return []
+
+    batch_size = getattr(settings, 'USAGE_LOG_BATCH_SIZE', 500)
+    deadline = time.monotonic() + timeout
+    entries = []
+    while len(entries) < batch_size:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining > 0:
+                entries.append(_queue.get(timeout=remaining))
+            else:
+                entries.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return entries
+
+
+def _run() -> None:
+    """Цикл фонового потока записи."""
+    interval = getattr(settings, 'USAGE_LOG_FLUSH_INTERVAL', 5)
+    while True:
+        entries = _drain(interval)
+        if not entries:
+            continue
+        close_old_connections()
+        try:
+            write_entries(entries)
+        except Exception as e:
+            logger.error(f"Ошибка записи {len(entries)} логов API: {e}")
+
+
+def _ensure_started() -> None:
+    """Лениво создает очередь и запускает поток записи в текущем процессе."""
+    global _queue, _flusher
+
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _start_lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        if _queue is None:
+            _queue = queue.Queue(maxsize=getattr(settings, 'USAGE_LOG_QUEUE_SIZE', 10000))
+        _flusher = threading.Thread(target=_run, name='usage-log-flusher', daemon=True)
+        _flusher.start()
+
+
+@atexit.register
+def _flush_on_exit() -> None:
+    """Дописывает остаток очереди при остановке процесса."""
+    try:
+        while _queue is not None and not _queue.empty():
+            flush()
+    except Exception as e:
+        logger.error(f"Не удалось записать логи API при завершении: {e}")
@@ -3,20 +3,23 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from django.conf import settings
 from django.contrib.auth import login, logout
 from django.utils import timezone
-from django.db.models import Count, Q
+from django.db.models import Q
 from datetime import datetime, timedelta
 
+from . import dashboard, favorites, quota
+from .entitlements import get_entitlements
 from .models import (
     User, UserProfile, SubscriptionPlan, UserSubscription,
-    UserFavoriteArticle, APIUsageLog, UsageTracking, PaymentMethod, PaymentHistory
+    UserFavoriteArticle, PaymentMethod, PaymentHistory
 )
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserSerializer,
     UserProfileSerializer, PasswordChangeSerializer, SubscriptionPlanSerializer,
     UserSubscriptionSerializer, UserFavoriteArticleSerializer, UserStatsSerializer,
-    UsageStatsSerializer, SubscriptionDashboardSerializer, PaymentIntentSerializer,
+    UsageStatsSerializer, PaymentIntentSerializer,
     PaymentMethodSerializer, PaymentHistorySerializer
 )
 
@@ -140,7 +143,10 @@ class UserFavoriteArticleListView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return UserFavoriteArticle.objects.filter(user=self.request.user)
+        # Сериализатор читает статью и ее источник - без select_related это N+1
+        return UserFavoriteArticle.objects.filter(user=self.request.user).select_related(
+            'article', 'article__source'
+        )
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -162,29 +168,19 @@ def user_stats(request):
     """Статистика пользователя."""
     user = request.user
     
-    # Получаем активную подписку
-    active_subscription = UserSubscription.objects.filter(
-        user=user,
-        status='active',
-        end_date__gt=timezone.now()
-    ).first()
-    
-    # Считаем API запросы за сегодня
-    today = timezone.now().date()
-    api_requests_today = APIUsageLog.objects.filter(
-        user=user,
-        created_at__date=today
-    ).count()
+    entitlements = get_entitlements(user)
+    summary = dashboard.get_user_summary(user)
+    profile = getattr(summary['user'], 'profile', None)
     
     stats_data = {
-        'articles_read': user.profile.articles_read if hasattr(user, 'profile') else 0,
-        'favorite_articles_count': user.favorite_articles.count(),
-        'custom_sources_count': user.custom_sources.count(),
-        'subscription_status': active_subscription.plan.name if active_subscription else 'Бесплатный',
-        'subscription_days_remaining': active_subscription.days_remaining if active_subscription else 0,
-        'api_requests_today': api_requests_today,
+        'articles_read': profile.articles_read if profile else 0,
+        'favorite_articles_count': summary['favorites_count'],
+        'custom_sources_count': summary['custom_sources_count'],
+        'subscription_status': entitlements.plan_name,
+        'subscription_days_remaining': entitlements.days_remaining,
+        'api_requests_today': summary['api_requests_today'],
         'registration_date': user.created_at,
-        'last_activity': user.profile.last_activity if hasattr(user, 'profile') else user.created_at,
+        'last_activity': profile.last_activity if profile else user.created_at,
     }
     
     serializer = UserStatsSerializer(stats_data)
@@ -228,71 +224,59 @@ def toggle_favorite_article(request, article_id):
 @permission_classes([permissions.IsAuthenticated])
 def check_favorite_article(request, article_id):
     """Проверить, находится ли статья в избранном."""
-    is_favorite = UserFavoriteArticle.objects.filter(
-        user=request.user,
-        article_id=article_id
-    ).exists()
+    is_favorite = article_id in favorites.get_favorite_ids(request.user.id)
     
     return Response({
         'is_favorite': is_favorite
     })
 
 
-@api_view(['GET'])
+@api_view(['GET', 'POST'])
 @permission_classes([permissions.IsAuthenticated])
-def dashboard_data(request):
-    """Данные для дашборда пользователя."""
-    user = request.user
+def favorite_status(request):
+    """
+    Статус "в избранном" для нескольких статей одним запросом.
+    
+    GET ?ids=1,2,3 или POST {"article_ids": [1, 2, 3]}.
+    """
+    if request.method == 'POST':
+        raw_ids = request.data.get('article_ids', [])
+    else:
+        raw_ids = [value for value in request.query_params.get('ids', '').split(',') if value.strip()]
     
-    # Активная подписка
-    active_subscription = UserSubscription.objects.filter(
-        user=user,
-        status='active',
-        end_date__gt=timezone.now()
-    ).first()
+    try:
+        article_ids = [int(value) for value in raw_ids]
+    except (TypeError, ValueError):
+        return Response({
+            'error': 'ID статей должны быть целыми числами'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Последние избранные статьи
-    recent_favorites = UserFavoriteArticle.objects.filter(
-        user=user
-    ).select_related('article', 'article__source').order_by('-created_at')[:5]
-    
-    # API использование за последние 7 дней
-    week_ago = timezone.now() - timedelta(days=7)
-    api_usage_week = APIUsageLog.objects.filter(
-        user=user,
-        created_at__gte=week_ago
-    ).extra(
-        select={'day': 'date(created_at)'}
-    ).values('day').annotate(
-        requests_count=Count('id')
-    ).order_by('day')
+    max_ids = getattr(settings, 'FAVORITE_STATUS_MAX_IDS', 100)
+    if len(article_ids) > max_ids:
+        return Response({
+            'error': f'Не больше {max_ids} статей за запрос'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
+    statuses = favorites.favorite_status(request.user.id, article_ids)
     return Response({
-        'user': UserSerializer(user).data,
-        'subscription': UserSubscriptionSerializer(active_subscription).data if active_subscription else None,
-        'recent_favorites': UserFavoriteArticleSerializer(recent_favorites, many=True).data,
-        'api_usage_week': list(api_usage_week),
-        'stats': {
-            'total_favorites': user.favorite_articles.count(),
-            'total_custom_sources': user.custom_sources.count(),
-            'api_requests_today': APIUsageLog.objects.filter(
-                user=user,
-                created_at__date=timezone.now().date()
-            ).count()
-        }
+        'favorites': {str(article_id): value for article_id, value in statuses.items()}
     })
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def dashboard_data(request):
+    """Данные для дашборда пользователя."""
+    return Response(dashboard.get_dashboard_data(request.user))
+
+
 # Subscription Views
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def current_subscription(request):
     """Получить текущую подписку пользователя."""
-    subscription = UserSubscription.objects.filter(
-        user=request.user,
-        status='active'
-    ).select_related('plan').first()
+    subscription = get_entitlements(request.user).subscription
     
     if subscription:
         return Response(UserSubscriptionSerializer(subscription).data)
@@ -304,36 +288,7 @@ def current_subscription(request):
 @permission_classes([permissions.IsAuthenticated])
 def usage_stats(request):
     """Получить статистику использования пользователя."""
-    user = request.user
-    
-    # Получаем или создаем tracking объект
-    usage_tracking, created = UsageTracking.objects.get_or_create(user=user)
-    
-    # Сбрасываем лимиты если нужно
-    usage_tracking.reset_daily_limits()
-    usage_tracking.reset_monthly_limits()
-    
-    # Получаем текущую подписку для лимитов
-    subscription = UserSubscription.objects.filter(
-        user=user,
-        status='active'
-    ).select_related('plan').first()
-    
-    # Формируем данные для фронтенда
-    stats_data = {
-        'daily_articles_read': usage_tracking.daily_articles_read,
-        'daily_articles_limit': subscription.plan.daily_articles_limit if subscription else 10,
-        'favorites_count': usage_tracking.total_favorites,
-        'favorites_limit': subscription.plan.favorites_limit if subscription else 10,
-        'exports_count': usage_tracking.monthly_exports,
-        'exports_limit': subscription.plan.exports_limit if subscription else 0,
-        'api_calls_count': usage_tracking.daily_api_calls,
-        'api_calls_limit': subscription.plan.api_calls_limit if subscription else 0,
-        'reset_date': timezone.datetime.combine(
-            timezone.now().date() + timedelta(days=1),
-            timezone.datetime.min.time()
-        ).isoformat()
-    }
+    stats_data = dashboard.get_usage_stats(request.user)
     
     serializer = UsageStatsSerializer(stats_data)
     return Response(serializer.data)
@@ -343,54 +298,7 @@ def usage_stats(request):
 @permission_classes([permissions.IsAuthenticated])
 def subscription_dashboard(request):
     """Получить все данные для дашборда подписки."""
-    user = request.user
-    
-    # Текущая подписка
-    subscription = UserSubscription.objects.filter(
-        user=user,
-        status='active'
-    ).select_related('plan').first()
-    
-    # Статистика использования
-    usage_tracking, created = UsageTracking.objects.get_or_create(user=user)
-    usage_tracking.reset_daily_limits()
-    usage_tracking.reset_monthly_limits()
-    
-    # Доступные планы
-    plans = SubscriptionPlan.objects.filter(is_active=True).order_by('price')
-    
-    # Способы оплаты
-    payment_methods = PaymentMethod.objects.filter(user=user, is_active=True)
-    
-    # Последние платежи
-    recent_payments = PaymentHistory.objects.filter(user=user).order_by('-created_at')[:5]
-    
-    # Формируем статистику для фронтенда
-    usage_stats = {
-        'daily_articles_read': usage_tracking.daily_articles_read,
-        'daily_articles_limit': subscription.plan.daily_articles_limit if subscription else 10,
-        'favorites_count': usage_tracking.total_favorites,
-        'favorites_limit': subscription.plan.favorites_limit if subscription else 10,
-        'exports_count': usage_tracking.monthly_exports,
-        'exports_limit': subscription.plan.exports_limit if subscription else 0,
-        'api_calls_count': usage_tracking.daily_api_calls,
-        'api_calls_limit': subscription.plan.api_calls_limit if subscription else 0,
-        'reset_date': timezone.datetime.combine(
-            timezone.now().date() + timedelta(days=1),
-            timezone.datetime.min.time()
-        ).isoformat()
-    }
-    
-    dashboard_data = {
-        'subscription': subscription,
-        'usage': usage_stats,
-        'plans': plans,
-        'payment_methods': payment_methods,
-        'recent_payments': recent_payments
-    }
-    
-    serializer = SubscriptionDashboardSerializer(dashboard_data)
-    return Response(serializer.data)
+    return Response(dashboard.get_subscription_dashboard(request.user))
 
 
 @api_view(['POST'])
@@ -518,39 +426,11 @@ def cancel_subscription(request):
 @permission_classes([permissions.IsAuthenticated])
 def check_limit(request, feature):
     """Проверить лимит для определенной функции."""
-    user = request.user
-    
-    # Получаем tracking
-    usage_tracking, created = UsageTracking.objects.get_or_create(user=user)
-    usage_tracking.reset_daily_limits()
-    usage_tracking.reset_monthly_limits()
+    if feature not in quota.FEATURES:
+        return Response({'allowed': True})
     
-    # Получаем подписку
-    subscription = UserSubscription.objects.filter(
-        user=user,
-        status='active'
-    ).select_related('plan').first()
-    
-    allowed = True
-    
-    if feature == 'articles':
-        limit = subscription.plan.daily_articles_limit if subscription else 10
-        if limit is not None:
-            allowed = usage_tracking.daily_articles_read < limit
-    elif feature == 'favorites':
-        limit = subscription.plan.favorites_limit if subscription else 10
-        if limit is not None:
-            allowed = usage_tracking.total_favorites < limit
-    elif feature == 'exports':
-        limit = subscription.plan.exports_limit if subscription else 0
-        if limit is not None:
-            allowed = usage_tracking.monthly_exports < limit
-    elif feature == 'api':
-        limit = subscription.plan.api_calls_limit if subscription else 0
-        if limit is not None:
-            allowed = usage_tracking.daily_api_calls < limit
-    
-    return Response({'allowed': allowed})
+    limit = get_entitlements(request.user).limits[feature]
+    return Response({'allowed': quota.is_allowed(request.user.id, feature, limit)})
 
 
 @api_view(['GET'])
@@ -0,0 +1,146 @@
+"""
+Версионированный кэш ответов для read-only эндпоинтов API.
+
+Ключ кэша строится из имени эндпоинта, нормализованных query-параметров
+и текущего поколения данных. Любая запись статей или источников
+(сохранение при парсинге, анализ, правки в админке) увеличивает
+поколение — старые ключи просто перестают использоваться и вытесняются
+по TTL, поэтому явная очистка кэша не нужна. Одиночные сохранения
+увеличивают его через сигналы (api/signals.py); массовые UPDATE сигналов
+не вызывают, поэтому пакетный анализ, seed_dataset и массовые действия
+админки (core.admin.bulk_update) вызывают bump_generation() сами.
+
+Поколение и счетчики попаданий хранятся в быстром хранилище
+(core.kvstore, FAST_STORE_URL), а не в кэше Django: при Redis их видят
+все процессы, и сохранение статьи в Celery-воркере сбрасывает кэш
+веб-процессов, даже если сами ответы лежат в локальном LocMemCache.
+
+TTL задаются для каждого эндпоинта в RESPONSE_CACHE_TTLS, статистика
+попаданий доступна через get_cache_stats().
+"""
+
+import hashlib
+import logging
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from core.kvstore import get_store
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'resp:generation'
+STATS_KEY = 'resp:stats'
+
+DEFAULT_TTLS = {
+    'articles_stats': 300,
+    'sources_stats': 300,
+    'trending_articles': 60,
+    'article_list': 30,
+}
+
+
+def get_generation() -> int:
+    """Текущее поколение данных."""
+    value = get_store().get(GENERATION_KEY)
+    return int(value) if value is not None else 1
+
+
+def bump_generation() -> None:
+    """Инвалидирует все закэшированные ответы (во всех процессах)."""
+    store = get_store()
+    store.set_if_absent(GENERATION_KEY, '1')
+    store.incr_with_limit(GENERATION_KEY, 1, None)
+
+
+def get_ttl(endpoint: str) -> int:
+    """TTL ответа эндпоинта в секундах."""
+    ttls = {**DEFAULT_TTLS, **getattr(settings, 'RESPONSE_CACHE_TTLS', {})}
+    return ttls.get(endpoint, 60)
+
+
+def normalize_params(query_params) -> str:
+    """Приводит query-параметры к каноническому виду (порядок не важен)."""
+    items = []
+    for key in sorted(query_params.keys()):
+        values = sorted(value for value in query_params.getlist(key) if value != '')
+        items.extend((key, value) for value in values)
+    return urlencode(items)
+
+
+def build_cache_key(endpoint: str, request) -> str:
+    """Ключ ответа для запроса с учетом поколения данных."""
+    renderer = getattr(request, 'accepted_renderer', None)
+    raw = f"{getattr(renderer, 'format', '')}?{normalize_params(request.query_params)}"
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'resp:v{get_generation()}:{endpoint}:{digest}'
+
+
+def get_or_build_response(endpoint: str, request, build) -> Response:
+    """
+    Возвращает ответ из кэша или строит его через build() и кэширует.
+
+    Кэшируются только успешные GET-ответы; сохраняются данные ответа
+    и его ETag, а не отрендеренный JSON, поэтому content negotiation
+    работает как обычно. Если закэшированный ETag совпадает с
+    If-None-Match, сразу возвращается 304.
+    """
+    if request.method != 'GET' or not getattr(settings, 'RESPONSE_CACHE_ENABLED', True):
+        return build()
+
+    from .conditional import etag_matches, not_modified
+
+    key = build_cache_key(endpoint, request)
+    entry = cache.get(key)
+    if entry is not None:
+        _record(endpoint, 'hits')
+        etag = entry.get('etag')
+        if etag and etag_matches(request, etag):
+            return not_modified(etag)
+        return Response(entry['data'], headers={'ETag': etag} if etag else None)
+
+    _record(endpoint, 'misses')
+    response = build()
+    if response.status_code == 200:
+        cache.set(key, {'data': response.data, 'etag': response.get('ETag')}, get_ttl(endpoint))
+    return response
+
+
+def cached_response(endpoint: str):
+    """Декоратор для function-based views (ставится под @api_view)."""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            return get_or_build_response(
+                endpoint, request, lambda: view_func(request, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
+
+
+def _record(endpoint: str, outcome: str) -> None:
+    """Увеличивает счетчик попаданий/промахов эндпоинта."""
+    get_store().hincrby(STATS_KEY, f'{endpoint}:{outcome}', 1)
+
+
+def get_cache_stats() -> dict:
+    """Статистика попаданий в кэш по эндпоинтам."""
+    counters = get_store().hgetall(STATS_KEY)
+    endpoints = {}
+    for endpoint in sorted({**DEFAULT_TTLS, **getattr(settings, 'RESPONSE_CACHE_TTLS', {})}):
+        hits = counters.get(f'{endpoint}:hits', 0)
+        misses = counters.get(f'{endpoint}:misses', 0)
+        total = hits + misses
+        endpoints[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+            'ttl': get_ttl(endpoint),
+        }
+    return {
+        'generation': get_generation(),
+        'endpoints': endpoints,
+    }
@@ -0,0 +1,104 @@
+"""
+Условные GET-запросы (ETag / If-None-Match) для эндпоинтов статей и источников.
+
+ETag списка вычисляется одним агрегатным запросом по отфильтрованному
+queryset (максимальный updated_at и количество строк) с учетом
+query-параметров, ETag объекта — по его updated_at. Если клиент
+присылает совпадающий If-None-Match, возвращается 304 без сериализации.
+
+Счетчик просмотров read_count обновляется пакетно через F() и не меняет
+updated_at. ETag детального ответа от него не зависит, а в ETag списка
+статей сумма read_count входит, когда список отсортирован по нему
+(ArticleListCreateView.get_list_etag_parts).
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts) -> str:
+    """Слабый ETag из произвольных значений."""
+    raw = '|'.join(str(part) for part in parts)
+    return 'W/' + quote_etag(hashlib.md5(raw.encode('utf-8')).hexdigest())
+
+
+def etag_matches(request, etag: str) -> bool:
+    """Совпадает ли ETag с заголовком If-None-Match (слабое сравнение)."""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header or not etag:
+        return False
+    candidates = parse_etags(header)
+    if '*' in candidates:
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    return any((candidate[2:] if candidate.startswith('W/') else candidate) == bare
+               for candidate in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    """Пустой ответ 304 с ETag."""
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+
+def conditional_response(request, etag: str, build) -> Response:
+    """Отдает 304 при совпадении ETag, иначе строит ответ и добавляет ETag."""
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response = build()
+    if response.status_code == status.HTTP_200_OK:
+        response['ETag'] = etag
+    return response
+
+
+class ConditionalListMixin:
+    """Поддержка ETag/304 для списковых generic views."""
+
+    def get_list_etag_parts(self, queryset):
+        """Значения, от которых зависит содержимое списка."""
+        summary = queryset.order_by().aggregate(last_updated=Max('updated_at'), total=Count('id'))
+        return [summary['last_updated'], summary['total']]
+
+    def get_list_etag(self, request) -> str:
+        from .cache import normalize_params
+
+        queryset = self.filter_queryset(self.get_queryset())
+        renderer = getattr(request, 'accepted_renderer', None)
+        return make_etag(
+            self.__class__.__name__,
+            getattr(renderer, 'format', ''),
+            normalize_params(request.query_params),
+            *self.get_list_etag_parts(queryset)
+        )
+
+    def list(self, request, *args, **kwargs):
+        return conditional_response(
+            request, self.get_list_etag(request), lambda: super(ConditionalListMixin, self).list(request, *args, **kwargs)
+        )
+
+
+class ConditionalRetrieveMixin:
+    """Поддержка ETag/304 для детальных generic views."""
+
+    def get_object_etag_parts(self, instance):
+        """Значения, от которых зависит представление объекта."""
+        return [instance.updated_at]
+
+    def get_object_etag(self, request, instance) -> str:
+        renderer = getattr(request, 'accepted_renderer', None)
+        return make_etag(
+            self.__class__.__name__,
+            getattr(renderer, 'format', ''),
+            instance.pk,
+            *self.get_object_etag_parts(instance)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.get_object_etag(request, instance)
+        return conditional_response(
+            request, etag, lambda: Response(self.get_serializer(instance).data)
+        )
@@ -0,0 +1,266 @@
+"""
+Массовая выгрузка статей (NDJSON, CSV, Parquet).
+
+Фильтры, поиск и сортировка те же, что у списка статей
+(ArticleListCreateView), поэтому любой запрос к /api/articles/ можно
+выгрузить целиком, заменив путь. Строки читаются серверным курсором
+(.iterator(chunk_size=...)) в виде кортежей колонок, без создания
+моделей, и сразу отдаются клиенту - память не зависит от объема выгрузки.
+
+NDJSON и CSV отдаются потоком (StreamingHttpResponse), Parquet
+собирается фоновой задачей export_articles_parquet в файл (модель
+ArticleExport) пакетами по EXPORT_CHUNK_SIZE строк.
+
+Квота выгрузок расходуется до начала потока; если поток обрывается
+ошибкой на стороне сервера, она возвращается (refund_on_error).
+"""
+
+import csv
+import importlib.util
+import logging
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from rest_framework.request import Request
+
+from .projection import parse_fields
+
+# pyarrow нужен только воркеру, собирающему Parquet; импорт тяжелый,
+# поэтому здесь лишь проверяется, что пакет установлен
+PARQUET_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+logger = logging.getLogger(__name__)
+
+# Поле выгрузки -> колонка модели
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'title': 'title',
+    'url': 'url',
+    'source_id': 'source_id',
+    'source_name': 'source__name',
+    'published_at': 'published_at',
+    'topic': 'topic',
+    'tags': 'tags',
+    'locations': 'locations',
+    'summary': 'summary',
+    'content': 'content',
+    'is_featured': 'is_featured',
+    'read_count': 'read_count',
+    'is_analyzed': 'is_analyzed',
+    'created_at': 'created_at',
+}
+
+LIST_FIELDS = {'tags', 'locations'}
+
+# Параметры выгрузки, не относящиеся к фильтрам списка
+SERVICE_PARAMS = {'fields', 'page', 'page_size', 'view', 'with_favorites'}
+
+# Начало ячейки, которое Excel/LibreOffice считают формулой
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def get_chunk_size() -> int:
+    """Размер пакета серверного курсора и группы строк Parquet."""
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def export_fields(query_params) -> list:
+    """Поля выгрузки из параметра fields= (по умолчанию - все)."""
+    return parse_fields(query_params.get('fields', ''), EXPORT_COLUMNS) or list(EXPORT_COLUMNS)
+
+
+def filter_params(query_params) -> QueryDict:
+    """Query-параметры без служебных (пагинация, проекция)."""
+    params = query_params.copy()
+    for name in SERVICE_PARAMS:
+        params.pop(name, None)
+    return params
+
+
+def filtered_articles(query_params):
+    """
+    Queryset статей с фильтрами, поиском и сортировкой списка статей.
+
+    query_params - QueryDict из запроса или восстановленный из
+    ArticleExport.params в фоновой задаче.
+    """
+    from .views import ArticleListCreateView
+
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = filter_params(query_params)
+
+    view = ArticleListCreateView()
+    view.request = Request(http_request)
+    view.args, view.kwargs, view.format_kwarg = (), {}, None
+    return view.filter_queryset(view.get_queryset())
+
+
+def iter_rows(queryset, fields):
+    """Кортежи значений полей, читаемые серверным курсором."""
+    columns = [EXPORT_COLUMNS[name] for name in fields]
+    return queryset.values_list(*columns).iterator(chunk_size=get_chunk_size())
+
+
+def iter_ndjson(rows, fields):
+    """Строки NDJSON, сгруппированные по пакетам (меньше мелких записей в сокет)."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    batch = []
+    for row in rows:
+        batch.append(encoder.encode(dict(zip(fields, row))))
+        if len(batch) >= 500:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    if batch:
+        yield '\n'.join(batch) + '\n'
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def csv_cell(value):
+    """Значение ячейки CSV; текст, похожий на формулу, экранируется апострофом."""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(rows, fields):
+    """Строки CSV с заголовком; списки (теги, локации) через '|'."""
+    writer = csv.writer(_Echo())
+    list_positions = set(index for index, name in enumerate(fields) if name in LIST_FIELDS)
+    # BOM - чтобы Excel открывал UTF-8 без мастера импорта
+    yield '\ufeff' + writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            csv_cell('|'.join(value or []) if index in list_positions else value)
+            for index, value in enumerate(row)
+        ])
+
+
+def stream(queryset, fields, export_format: str):
+    """
+    Итератор содержимого потоковой выгрузки (ndjson или csv).
+
+    Queryset строится заранее (filtered_articles), чтобы ошибки фильтров
+    вернулись ответом 400, а не оборвали уже начатую выгрузку.
+    """
+    rows = iter_rows(queryset, fields)
+    if export_format == 'csv':
+        return iter_csv(rows, fields)
+    return iter_ndjson(rows, fields)
+
+
+def refund_on_error(chunks, refund):
+    """
+    Итератор потоковой выгрузки, вызывающий refund() при ошибке посреди потока.
+
+    Обрыв соединения клиентом (GeneratorExit) ошибкой не считается -
+    данные уже отдавались, квота остается израсходованной.
+    """
+    try:
+        yield from chunks
+    except Exception as e:
+        logger.error(f"Потоковая выгрузка прервана ошибкой: {e}")
+        try:
+            refund()
+        except Exception as refund_error:
+            logger.error(f"Не удалось вернуть квоту выгрузки: {refund_error}")
+        raise
+
+
+def download_name(export_format: str) -> str:
+    """Имя файла выгрузки для Content-Disposition."""
+    return f'articles-{timezone.now():%Y%m%d-%H%M%S}.{export_format}'
+
+
+def parquet_schema(fields):
+    """Схема Parquet для выбранных полей."""
+    import pyarrow as pa
+
+    types = {
+        'id': pa.int64(),
+        'source_id': pa.int64(),
+        'read_count': pa.int64(),
+        'is_featured': pa.bool_(),
+        'is_analyzed': pa.bool_(),
+        'published_at': pa.timestamp('us', tz='UTC'),
+        'created_at': pa.timestamp('us', tz='UTC'),
+        'tags': pa.list_(pa.string()),
+        'locations': pa.list_(pa.string()),
+    }
+    return pa.schema([(name, types.get(name, pa.string())) for name in fields])
+
+
+def write_parquet(export) -> None:
+    """
+    Собирает файл Parquet для ArticleExport.
+
+    Строки пишутся группами по EXPORT_CHUNK_SIZE: в памяти находится
+    не больше одной группы. Файл собирается во временном каталоге
+    и затем сохраняется в хранилище (MEDIA_ROOT/exports/).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    query_params = QueryDict(mutable=True)
+    for name, values in export.params.items():
+        query_params.setlist(name, values)
+
+    fields = export_fields(query_params)
+    schema = parquet_schema(fields)
+    chunk_size = get_chunk_size()
+    compression = getattr(settings, 'EXPORT_PARQUET_COMPRESSION', 'zstd')
+    rows = iter_rows(filtered_articles(query_params), fields)
+
+    total = 0
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'articles.parquet')
+        with pq.ParquetWriter(path, schema, compression=compression) as writer:
+            batch = []
+            for row in rows:
+                batch.append(dict(zip(fields, row)))
+                if len(batch) >= chunk_size:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    total += len(batch)
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                total += len(batch)
+
+        with open(path, 'rb') as f:
+            export.file.save(f'articles-{export.pk}.parquet', File(f), save=False)
+        export.size_bytes = os.path.getsize(path)
+
+    export.rows = total
+    logger.info(f"Выгрузка #{export.pk}: {total} статей, {export.size_bytes} байт")
+
+
+def prune(days: int = None) -> int:
+    """Удаляет выгрузки старше EXPORT_RETENTION_DAYS дней вместе с файлами."""
+    from core.models import ArticleExport
+
+    days = days if days is not None else getattr(settings, 'EXPORT_RETENTION_DAYS', 7)
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = 0
+    for export in ArticleExport.objects.filter(created_at__lt=cutoff).iterator():
+        if export.file:
+            export.file.delete(save=False)
+        export.delete()
+        deleted += 1
+    return deleted
@@ -0,0 +1,100 @@
+"""
+Проекция полей для списков статей.
+
+Параметры запроса:
+- view=compact — облегченное представление без content/summary,
+  превью текста вычисляется в SQL (см. with_preview)
+- fields=id,title,url — только перечисленные поля сериализатора
+
+Обе формы превращаются в .only() на queryset, поэтому из БД читаются
+только нужные колонки, а тяжелый content не передается и не сериализуется.
+"""
+
+from django.db.models import Case, F, IntegerField, Q, TextField, Value, When
+from django.db.models.functions import Concat, Left, Length
+
+PREVIEW_LENGTH = 200
+
+SOURCE_COLUMNS = [
+    'source__id', 'source__name', 'source__url', 'source__type',
+    'source__is_active', 'source__articles_count', 'source__last_parsed',
+]
+
+# Поле сериализатора -> колонки модели, необходимые для его вычисления
+ARTICLE_FIELD_COLUMNS = {
+    'id': ['id'],
+    'title': ['title'],
+    'url': ['url'],
+    'source': SOURCE_COLUMNS,
+    'published_at': ['published_at'],
+    'topic': ['topic'],
+    'topic_display': ['topic'],
+    'tags': ['tags'],
+    'locations': ['locations'],
+    'short_content': ['summary', 'content'],
+    'summary': ['summary'],
+    'content': ['content'],
+    'preview': [],
+    'is_featured': ['is_featured'],
+    'read_count': ['read_count'],
+    'is_analyzed': ['is_analyzed'],
+}
+
+COMPACT_FIELDS = [
+    'id', 'title', 'url', 'source', 'published_at', 'topic', 'topic_display',
+    'tags', 'locations', 'preview', 'is_featured', 'read_count', 'is_analyzed',
+]
+
+
+def parse_fields(raw: str, allowed) -> list:
+    """Разбирает параметр fields=, оставляя только допустимые поля (id всегда включен)."""
+    requested = [name.strip() for name in raw.split(',') if name.strip()]
+    fields = [name for name in requested if name in allowed]
+    if fields and 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields
+
+
+def columns_for(fields) -> list:
+    """Колонки модели, нужные для набора полей сериализатора."""
+    columns = []
+    for name in fields:
+        for column in ARTICLE_FIELD_COLUMNS.get(name, []):
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def with_preview(queryset):
+    """
+    Добавляет аннотацию preview: краткое содержание или начало текста,
+    обрезанные до PREVIEW_LENGTH символов на стороне PostgreSQL.
+    """
+    def truncated(field):
+        return Case(
+            When(**{f'{field}_length__gt': PREVIEW_LENGTH},
+                 then=Concat(Left(field, PREVIEW_LENGTH), Value('...'))),
+            default=F(field),
+            output_field=TextField(),
+        )
+
+    return queryset.annotate(
+        summary_length=Length('summary', output_field=IntegerField()),
+        content_length=Length('content', output_field=IntegerField()),
+    ).annotate(
+        preview=Case(
+            When(~Q(summary=''), then=truncated('summary')),
+            default=truncated('content'),
+            output_field=TextField(),
+        )
+    )
+
+
+def project_queryset(queryset, fields):
+    """Ограничивает выборку колонками, нужными для полей."""
+    if 'preview' in fields:
+        queryset = with_preview(queryset)
+    if 'source' not in fields:
+        # Источник не нужен - убираем JOIN, иначе .only() конфликтует с select_related
+        queryset = queryset.select_related(None)
+    return queryset.only(*columns_for(fields))
@@ -1,5 +1,35 @@
+from django.db.models import Prefetch
+from django.urls import reverse
 from rest_framework import serializers
-from core.models import Source, Article
+from core.models import Source, Article, ArticleExport
+
+RECENT_ARTICLES_LIMIT = 5
+
+
+def with_recent_articles(queryset):
+    """
+    Предзагрузка последних статей для SourceDetailSerializer (SourceDetailView).
+
+    Статьи всех источников queryset загружаются одним запросом (срез внутри
+    Prefetch выполняется оконной функцией). Источник статьи при этом
+    берется из самого объекта источника, без отдельных запросов.
+    """
+    return queryset.prefetch_related(Prefetch(
+        'articles',
+        queryset=Article.objects.filter(is_active=True).order_by('-published_at')[:RECENT_ARTICLES_LIMIT],
+        to_attr='recent_active_articles',
+    ))
+
+
+class DynamicFieldsMixin:
+    """Оставляет только поля из context['fields'] (если переданы)."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 
 class SourceListSerializer(serializers.ModelSerializer):
@@ -30,12 +60,14 @@ class SourceDetailSerializer(serializers.ModelSerializer):
         ]
     
     def get_recent_articles(self, obj):
-        """Получить последние 5 статей из источника."""
-        recent = obj.articles.filter(is_active=True)[:5]
+        """Последние статьи источника (предзагруженные через with_recent_articles)."""
+        recent = getattr(obj, 'recent_active_articles', None)
+        if recent is None:
+            recent = obj.articles.filter(is_active=True).order_by('-published_at')[:RECENT_ARTICLES_LIMIT]
         return ArticleListSerializer(recent, many=True).data
 
 
-class ArticleListSerializer(serializers.ModelSerializer):
+class ArticleListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для списка статей."""
     
     source = SourceListSerializer(read_only=True)
@@ -51,6 +83,27 @@ class ArticleListSerializer(serializers.ModelSerializer):
         ]
 
 
+class ArticleCompactSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Облегченный сериализатор для списка статей (view=compact).
+    
+    Вместо content/summary отдает preview, вычисленный в SQL
+    (см. api.projection.with_preview).
+    """
+    
+    source = SourceListSerializer(read_only=True)
+    topic_display = serializers.CharField(source='get_topic_display', read_only=True)
+    preview = serializers.CharField(read_only=True)
+    
+    class Meta:
+        model = Article
+        fields = [
+            'id', 'title', 'url', 'source', 'published_at',
+            'topic', 'topic_display', 'tags', 'locations',
+            'preview', 'is_featured', 'read_count', 'is_analyzed'
+        ]
+
+
 class ArticleDetailSerializer(serializers.ModelSerializer):
     """Детальный сериализатор статьи."""
     
@@ -127,4 +180,26 @@ class SourceStatsSerializer(serializers.Serializer):
     total_sources = serializers.IntegerField()
     active_sources = serializers.IntegerField()
     sources_by_type = serializers.DictField()
-    top_sources = serializers.ListField()
\ No newline at end of file
+    top_sources = serializers.ListField()
+
+
+class ArticleExportSerializer(serializers.ModelSerializer):
+    """Сериализатор фоновой выгрузки статей."""
+    
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ArticleExport
+        fields = [
+            'id', 'format', 'status', 'status_display', 'params', 'rows',
+            'size_bytes', 'error', 'created_at', 'finished_at', 'download_url'
+        ]
+    
+    def get_download_url(self, obj):
+        """Ссылка на файл (только для завершенной выгрузки)."""
+        if obj.status != 'done':
+            return None
+        url = reverse('api:article-export-download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.models import Source, Article
+from .cache import bump_generation
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=Source)
+@receiver(post_delete, sender=Source)
+def invalidate_response_cache(sender, **kwargs):
+    """Сбрасывает кэш ответов API при изменении статей или источников."""
+    bump_generation()
@@ -0,0 +1,96 @@
+"""
+Бюджет SQL-запросов эндпоинтов API для тестов.
+
+QueryBudgetMixin подмешивается к APITestCase:
+
+    class MyTests(QueryBudgetMixin, APITestCase):
+        def test_list(self):
+            self.assertEndpointBudget('api:article-list')
+
+assertEndpointBudget проверяет, что холодный (без кэша ответов) запрос
+укладывается в бюджет из ENDPOINT_QUERY_BUDGETS, assertQueriesConstant -
+что число запросов не растет вместе с числом строк (признак N+1).
+При превышении в сообщении перечисляются выполненные запросы.
+"""
+
+from contextlib import contextmanager
+
+from django.urls import reverse
+
+from core.query_budget import QueryCounter
+
+from .cache import bump_generation
+
+# Максимум SQL-запросов на холодный запрос анонимного пользователя
+# (для accounts:* - пользователя, авторизованного через force_authenticate)
+ENDPOINT_QUERY_BUDGETS = {
+    # ETag, count пагинации, страница
+    'api:article-list': 3,
+    'api:source-list': 3,
+    # источник, ETag, последние статьи
+    'api:source-detail': 3,
+    # статьи с источниками, источники
+    'api:search-everything': 2,
+    # рейтинг из хранилища или запасной вариант по просмотрам
+    'api:trending-articles': 2,
+    # счетчики, распределения, теги и локации
+    'api:articles-stats': 9,
+    # count пагинации, избранное со статьями и источниками
+    'accounts:favorites': 2,
+}
+
+
+class QueryBudgetMixin:
+    """Проверки количества SQL-запросов для тестов API."""
+
+    query_budgets = ENDPOINT_QUERY_BUDGETS
+
+    @contextmanager
+    def assertMaxQueries(self, budget: int, label: str = ''):
+        """Блок выполняет не больше budget запросов."""
+        with QueryCounter(keep_sql=True) as counter:
+            yield counter
+        if counter.count > budget:
+            queries = '\n'.join(f'{index}. {sql}' for index, sql in enumerate(counter.queries, 1))
+            self.fail(
+                f'{label or "Блок"}: {counter.count} SQL-запросов при бюджете {budget}\n{queries}'
+            )
+
+    def request_endpoint(self, url_name: str, *args, params=None, method: str = 'get', data=None):
+        """Холодный запрос к эндпоинту: кэш ответов сбрасывается сменой поколения."""
+        bump_generation()
+        url = reverse(url_name, args=args)
+        if method == 'get':
+            return self.client.get(url, params or {})
+        return getattr(self.client, method)(url, data, format='json')
+
+    def assertEndpointBudget(self, url_name: str, *args, params=None, method: str = 'get', data=None,
+                             budget: int = None):
+        """Запрос к эндпоинту укладывается в бюджет; возвращает ответ."""
+        if budget is None:
+            budget = self.query_budgets[url_name]
+        label = f'{method.upper()} {url_name}'
+        with self.assertMaxQueries(budget, label):
+            response = self.request_endpoint(url_name, *args, params=params, method=method, data=data)
+        self.assertLess(response.status_code, 400, f'{label}: ответ {response.status_code}')
+        return response
+
+    def assertQueriesConstant(self, url_name: str, grow, *args, params=None):
+        """
+        Число запросов к эндпоинту не меняется после grow().
+
+        grow() добавляет данные (статьи, источники, избранное), которые
+        попадают в ответ: при N+1 число запросов вырастет вместе с ними.
+        """
+        with QueryCounter(keep_sql=True) as before:
+            self.request_endpoint(url_name, *args, params=params)
+        grow()
+        with QueryCounter(keep_sql=True) as after:
+            self.request_endpoint(url_name, *args, params=params)
+
+        if after.count != before.count:
+            queries = '\n'.join(f'{index}. {sql}' for index, sql in enumerate(after.queries, 1))
+            self.fail(
+                f'{url_name}: {before.count} SQL-запросов до добавления данных, '
+                f'{after.count} после\n{queries}'
+            )
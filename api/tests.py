@@ -1,3 +1,441 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from accounts.models import SubscriptionPlan, User, UserFavoriteArticle, UserSubscription
+from core.kvstore import MemoryStore, reset_store
+from core.models import Article, ArticleExport, CrawlRun, Source
+
+from . import export
+from .cache import GENERATION_KEY
+from .serializers import SourceDetailSerializer
+from .testing import QueryBudgetMixin
+
+
+@override_settings(USAGE_LOG_ENABLED=False)
+class EndpointQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Бюджет SQL-запросов эндпоинтов и отсутствие N+1 в сериализаторах."""
+
+    def setUp(self):
+        cache.clear()
+        reset_store(MemoryStore())
+
+        self.sources = [
+            Source.objects.create(name=f'Источник {index}', url=f'https://source{index}.example.com', type='html')
+            for index in range(3)
+        ]
+        for source in self.sources:
+            self.add_articles(source, 8)
+
+    def add_articles(self, source, count, prefix='article'):
+        now = timezone.now()
+        return [
+            Article.objects.create(
+                title=f'Новости экономики {source.id}-{index}', url=f'{source.url}/{prefix}/{index}',
+                source=source, published_at=now - timedelta(hours=index), topic='economics',
+                tags=['экономика', 'рынок'], locations=['Москва'], is_analyzed=True
+            )
+            for index in range(count)
+        ]
+
+    def add_source(self):
+        source = Source.objects.create(name='Новый источник', url='https://new.example.com', type='rss')
+        self.add_articles(source, 8)
+
+    def test_article_list_budget(self):
+        response = self.assertEndpointBudget('api:article-list')
+        self.assertEqual(response.data['count'], 24)
+        self.assertEndpointBudget('api:article-list', params={'view': 'compact'})
+        self.assertEndpointBudget('api:article-list', params={'topic': 'economics', 'page': 2})
+
+    def test_article_list_queries_constant(self):
+        self.assertQueriesConstant('api:article-list', self.add_source)
+
+    def test_source_list_budget(self):
+        self.assertEndpointBudget('api:source-list')
+        self.assertQueriesConstant('api:source-list', self.add_source)
+
+    def test_source_detail_budget(self):
+        source = self.sources[0]
+        response = self.assertEndpointBudget('api:source-detail', source.id)
+        self.assertEqual(len(response.data['recent_articles']), 5)
+        self.assertQueriesConstant(
+            'api:source-detail', lambda: self.add_articles(source, 5, prefix='more'), source.id
+        )
+
+    def test_search_budget(self):
+        response = self.assertEndpointBudget('api:search-everything', params={'q': 'экономики'})
+        self.assertEqual(response.data['articles']['count'], 20)
+        self.assertQueriesConstant('api:search-everything', self.add_source, params={'q': 'Источник'})
+
+    def test_trending_budget(self):
+        self.assertEndpointBudget('api:trending-articles')
+        self.assertEndpointBudget('api:trending-articles', params={'source': self.sources[0].id})
+        self.assertQueriesConstant('api:trending-articles', self.add_source)
+
+    def test_articles_stats_budget(self):
+        response = self.assertEndpointBudget('api:articles-stats')
+        self.assertEqual(response.data['total_articles'], 24)
+        self.assertQueriesConstant('api:articles-stats', self.add_source)
+
+    def test_favorites_budget(self):
+        user = User.objects.create_user(email='reader@example.com', username='reader', password='secret-pass-123')
+        articles = list(Article.objects.all())
+        for article in articles[:5]:
+            UserFavoriteArticle.objects.create(user=user, article=article)
+        self.client.force_authenticate(user=user)
+
+        response = self.assertEndpointBudget('accounts:favorites')
+        self.assertEqual(response.data['count'], 5)
+
+        def add_favorites():
+            for article in articles[5:15]:
+                UserFavoriteArticle.objects.create(user=user, article=article)
+
+        self.assertQueriesConstant('accounts:favorites', add_favorites)
+
+    def test_source_detail_prefetches_recent_articles(self):
+        source = self.sources[0]
+        newest = self.add_articles(source, 1, prefix='hidden')[0]
+        newest.published_at = timezone.now() + timedelta(hours=1)
+        newest.is_active = False
+        newest.save()
+
+        with patch.object(SourceDetailSerializer, 'get_recent_articles',
+                          autospec=True, side_effect=SourceDetailSerializer.get_recent_articles) as get_recent:
+            response = self.client.get(reverse('api:source-detail', args=[source.id]))
+
+        # статьи предзагружены во view, а не запрошены сериализатором
+        self.assertTrue(hasattr(get_recent.call_args.args[1], 'recent_active_articles'))
+        recent = response.data['recent_articles']
+        self.assertEqual(len(recent), 5)
+        self.assertNotIn(newest.id, [item['id'] for item in recent])
+        published = [item['published_at'] for item in recent]
+        self.assertEqual(published, sorted(published, reverse=True))
+        self.assertEqual(recent[0]['source']['id'], source.id)
+
+    def test_with_favorites_flag(self):
+        user = User.objects.create_user(email='reader@example.com', username='reader', password='secret-pass-123')
+        UserFavoriteArticle.objects.create(user=user, article=Article.objects.order_by('-published_at').first())
+        self.client.force_authenticate(user=user)
+
+        for value in ('true', '1', 'yes'):
+            response = self.client.get(reverse('api:article-list'), {'with_favorites': value})
+            self.assertTrue(response.data['results'][0]['is_favorite'], value)
+        for value in ('false', '0', ''):
+            response = self.client.get(reverse('api:article-list'), {'with_favorites': value})
+            self.assertNotIn('is_favorite', response.data['results'][0], value)
+
+    @override_settings(QUERY_COUNT_HEADERS=True)
+    def test_query_count_headers(self):
+        response = self.client.get(reverse('api:source-list'))
+        self.assertLessEqual(int(response['X-Query-Count']), self.query_budgets['api:source-list'])
+        self.assertIn('X-Query-Time-Ms', response)
+
+    @override_settings(QUERY_COUNT_HEADERS=False)
+    def test_query_count_headers_disabled(self):
+        response = self.client.get(reverse('api:source-list'))
+        self.assertNotIn('X-Query-Count', response)
+
+
+class SharedMemoryStore(MemoryStore):
+    """Замена Redis в тестах: общее для всех "процессов" хранилище."""
+
+    is_shared = True
+
+
+@override_settings(USAGE_LOG_ENABLED=False, RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTests(APITestCase):
+    """Кэш ответов: ключи, TTL, инвалидация и статистика попаданий."""
+
+    def setUp(self):
+        cache.clear()
+        self.store = SharedMemoryStore()
+        reset_store(self.store)
+        self.source = Source.objects.create(name='Источник', url='https://example.com', type='html')
+        self.url = reverse('api:articles-stats')
+
+    def tearDown(self):
+        reset_store(None)
+
+    def add_article(self, index):
+        return Article.objects.create(
+            title=f'Статья {index}', url=f'https://example.com/{index}', source=self.source,
+            published_at=timezone.now(), topic='economics'
+        )
+
+    def endpoint_stats(self):
+        return self.client.get(reverse('api:cache-stats')).data['endpoints']['articles_stats']
+
+    def test_key_ignores_parameter_order(self):
+        self.client.get(self.url + '?topic=economics&source=1')
+        self.client.get(self.url + '?source=1&topic=economics')
+        self.client.get(self.url + '?topic=sports')
+        stats = self.endpoint_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    @override_settings(RESPONSE_CACHE_TTLS={'articles_stats': 0})
+    def test_endpoint_ttl(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        stats = self.endpoint_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (0, 2))
+        self.assertEqual(stats['ttl'], 0)
+
+    def test_write_in_other_process_invalidates_cache(self):
+        self.assertEqual(self.client.get(self.url).data['total_articles'], 0)
+        generation = int(self.store.get(GENERATION_KEY))
+
+        # Celery-воркер: свой кэш Django, общее быстрое хранилище
+        with patch('api.cache.cache', LocMemCache('worker-process', {})):
+            self.add_article(1)
+
+        self.assertEqual(self.client.get(self.url).data['total_articles'], 1)
+        self.assertEqual(int(self.store.get(GENERATION_KEY)), generation + 1)
+
+    def test_admin_bulk_action_invalidates_cache(self):
+        from django.contrib import admin
+        from core.admin import ArticleAdmin
+
+        self.add_article(1)
+        self.assertEqual(self.client.get(self.url).data['total_articles'], 1)
+
+        model_admin = ArticleAdmin(Article, admin.site)
+        with patch.object(model_admin, 'message_user'):
+            model_admin.deactivate_articles(None, Article.objects.all())
+
+        self.assertEqual(self.client.get(self.url).data['total_articles'], 0)
+
+    def test_hit_ratio(self):
+        for _ in range(4):
+            self.client.get(self.url)
+        stats = self.endpoint_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (3, 1))
+        self.assertEqual(stats['hit_ratio'], 0.75)
+        self.assertEqual(
+            self.client.get(reverse('api:cache-stats')).data['generation'], int(self.store.get(GENERATION_KEY))
+        )
+
+
+@override_settings(USAGE_LOG_ENABLED=False, RESPONSE_CACHE_ENABLED=False,
+                   USE_SPACY_ANALYZER=False, ANALYSIS_CACHE_ENABLED=False)
+class ConditionalRequestTests(APITestCase):
+    """ETag списка и статьи меняются после анализа и сброса просмотров."""
+
+    def setUp(self):
+        source = Source.objects.create(name='Источник', url='https://example.com', type='html')
+        self.articles = [
+            Article.objects.create(
+                title=f'Статья {index}', url=f'https://example.com/{index}', source=source,
+                content='Центральный банк повысил ключевую ставку.', published_at=timezone.now()
+            )
+            for index in range(3)
+        ]
+        self.list_url = reverse('api:article-list')
+
+    def assert_modified(self, url):
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        return etag
+
+    def test_list_changes_after_pool_analysis(self):
+        from core.analysis_executor import save_results
+
+        etag = self.assert_modified(self.list_url)
+        result = {'topic': 'economics', 'tags': ['ставка'], 'locations': [], 'analyzer_version': 'legacy-test'}
+        save_results([(self.articles[0].id, result, None)])
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][-1]['topic'], 'economics')
+
+    def test_detail_changes_after_task_analysis(self):
+        from scraper import tasks
+
+        url = reverse('api:article-detail', args=[self.articles[0].id])
+        etag = self.assert_modified(url)
+        self.assertEqual(tasks.analyze_article_text.run(self.articles[0].id)['status'], 'success')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_analyzed'])
+
+    def test_read_count_ordering_changes_after_view_flush(self):
+        url = self.list_url + '?ordering=-read_count'
+        etag = self.assert_modified(url)
+        plain_etag = self.assert_modified(self.list_url)
+        Article.objects.filter(id=self.articles[-1].id).update(read_count=F('read_count') + 5)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=plain_etag).status_code, 304)
+
+
+@override_settings(USAGE_LOG_ENABLED=False, EXPORT_CHUNK_SIZE=3)
+class ArticleExportTests(APITestCase):
+    """Потоковые и фоновые выгрузки статей."""
+
+    def setUp(self):
+        cache.clear()
+        reset_store(MemoryStore())
+
+        self.user = User.objects.create_user(email='analyst@example.com', username='analyst', password='secret-pass-123')
+        plan = SubscriptionPlan.objects.create(
+            name='Премиум', slug='premium', plan_type='premium', description='Премиум план',
+            price=Decimal('9.99'), exports_limit=2
+        )
+        UserSubscription.objects.create(
+            user=self.user, plan=plan, status='active', start_date=timezone.now(),
+            end_date=timezone.now() + timedelta(days=30), amount_paid=plan.price
+        )
+        source = Source.objects.create(name='Источник', url='https://example.com', type='html')
+        for index in range(10):
+            Article.objects.create(
+                title=f'Статья {index}', url=f'https://example.com/{index}', source=source,
+                published_at=timezone.now() - timedelta(hours=index),
+                topic='economics' if index % 2 else 'sports', tags=['рынок', 'нефть']
+            )
+        self.client.force_authenticate(user=self.user)
+
+    def test_ndjson_export_streams_filtered_articles(self):
+        response = self.client.get(
+            reverse('api:articles-export', args=['ndjson']), {'topic': 'economics', 'fields': 'title,tags'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(set(rows[0]), {'id', 'title', 'tags'})
+        self.assertEqual(rows[0]['tags'], ['рынок', 'нефть'])
+
+    def test_csv_export_has_header_and_all_rows(self):
+        response = self.client.get(reverse('api:articles-export', args=['csv']), {'fields': 'title,tags'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        rows = list(csv.reader(b''.join(response.streaming_content).decode('utf-8-sig').splitlines()))
+        self.assertEqual(rows[0], ['id', 'title', 'tags'])
+        self.assertEqual(len(rows), 11)
+        self.assertEqual(rows[1][2], 'рынок|нефть')
+
+    def test_csv_escapes_formulas(self):
+        Article.objects.filter(title='Статья 0').update(title='=HYPERLINK("http://evil")', tags=['@cmd', 'нефть'])
+        response = self.client.get(
+            reverse('api:articles-export', args=['csv']), {'fields': 'title,tags', 'ordering': '-published_at'}
+        )
+        rows = list(csv.reader(b''.join(response.streaming_content).decode('utf-8-sig').splitlines()))
+        self.assertEqual(rows[1][1:], ['\'=HYPERLINK("http://evil")', "'@cmd|нефть"])
+        self.assertEqual(rows[2][1], 'Статья 1')
+
+    def test_quota_refunded_when_stream_fails(self):
+        from accounts import quota
+
+        def broken_stream(rows, fields):
+            yield '{}\n'
+            raise RuntimeError('db gone')
+
+        url = reverse('api:articles-export', args=['ndjson'])
+        with patch.object(export, 'iter_ndjson', broken_stream):
+            response = self.client.get(url)
+            with self.assertRaises(RuntimeError):
+                b''.join(response.streaming_content)
+        self.assertEqual(quota.get_usage(self.user.id)['exports'], 0)
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(quota.get_usage(self.user.id)['exports'], 1)
+
+    def test_export_requires_quota(self):
+        url = reverse('api:articles-export', args=['ndjson'])
+        for _ in range(2):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.data['limit'], 2)
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse('api:articles-export', args=['xml']))
+        self.assertEqual(response.status_code, 404)
+
+    @skipUnless(export.PARQUET_AVAILABLE, 'pyarrow не установлен')
+    def test_parquet_export_job(self):
+        import pyarrow.parquet as pq
+        from scraper.tasks import export_articles_parquet
+
+        with TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            with patch('api.views.export_articles_parquet.delay') as delay:
+                response = self.client.post(
+                    reverse('api:article-exports') + '?topic=sports&fields=title,published_at,tags'
+                )
+            self.assertEqual(response.status_code, 202)
+            delay.assert_called_once_with(response.data['id'])
+
+            result = export_articles_parquet(response.data['id'])
+            self.assertEqual(result['status'], 'done')
+
+            detail = self.client.get(reverse('api:article-export-detail', args=[response.data['id']]))
+            self.assertEqual(detail.data['rows'], 5)
+            self.assertIsNotNone(detail.data['download_url'])
+
+            download = self.client.get(reverse('api:article-export-download', args=[response.data['id']]))
+            table = pq.read_table(io.BytesIO(b''.join(download.streaming_content)))
+            self.assertEqual(table.column_names, ['id', 'title', 'published_at', 'tags'])
+            self.assertEqual(table.num_rows, 5)
+
+    def test_export_of_other_user_is_hidden(self):
+        other = User.objects.create_user(email='other@example.com', username='other', password='secret-pass-123')
+        article_export = ArticleExport.objects.create(user=other, status='done')
+        response = self.client.get(reverse('api:article-export-detail', args=[article_export.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(USAGE_LOG_ENABLED=False, CRAWL_STATS_DEFAULT_DAYS=7)
+class CrawlStatsEndpointTests(APITestCase):
+    """Эндпоинт метрик парсинга."""
+
+    def setUp(self):
+        cache.clear()
+        reset_store(MemoryStore())
+        self.source = Source.objects.create(name='Источник', url='https://example.com', type='html')
+        now = timezone.now()
+        CrawlRun.objects.bulk_create([
+            CrawlRun(source=self.source, status='success', started_at=now, fetch_ms=120,
+                     containers_found=4, articles_found=3, new_articles=3),
+            CrawlRun(source=self.source, status='success', fetch_outcome='cached', started_at=now,
+                     containers_found=0, articles_found=3),
+        ])
+
+    def test_all_sources(self):
+        response = self.client.get(reverse('api:crawl-stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['period_days'], 7)
+        self.assertNotIn('trend', response.data)
+
+        source = response.data['sources'][0]
+        self.assertEqual(source['runs'], 2)
+        self.assertEqual(source['extraction_yield'], 0.75)
+        self.assertEqual(source['new_ratio'], 0.5)
+
+    def test_single_source_with_trend(self):
+        response = self.client.get(reverse('api:crawl-stats'), {'source': self.source.id, 'days': 30})
+        self.assertEqual(response.data['period_days'], 30)
+        self.assertEqual([item['source_id'] for item in response.data['sources']], [self.source.id])
+        self.assertEqual(len(response.data['trend']), 1)
+        self.assertEqual(response.data['trend'][0]['extraction_yield'], 0.75)
+
+    def test_invalid_params(self):
+        response = self.client.get(reverse('api:crawl-stats'), {'days': 'week'})
+        self.assertEqual(response.status_code, 400)
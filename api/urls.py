@@ -8,6 +8,12 @@ urlpatterns = [
     path('articles/', views.ArticleListCreateView.as_view(), name='article-list'),
     path('articles/<int:pk>/', views.ArticleDetailView.as_view(), name='article-detail'),
     path('articles/<int:pk>/toggle-featured/', views.toggle_article_featured, name='toggle-article-featured'),
+    path('articles/export/<str:export_format>/', views.export_articles, name='articles-export'),
+    
+    # Фоновые выгрузки
+    path('exports/', views.article_exports, name='article-exports'),
+    path('exports/<int:pk>/', views.article_export_detail, name='article-export-detail'),
+    path('exports/<int:pk>/download/', views.article_export_download, name='article-export-download'),
     
     # Источники
     path('sources/', views.SourceListCreateView.as_view(), name='source-list'),
@@ -24,6 +30,8 @@ urlpatterns = [
     # Статистика
     path('stats/articles/', views.articles_stats, name='articles-stats'),
     path('stats/sources/', views.sources_stats, name='sources-stats'),
+    path('stats/cache/', views.cache_stats, name='cache-stats'),
+    path('stats/crawl/', views.crawl_stats, name='crawl-stats'),
     
     # Поиск и рекомендации
     path('search/', views.search_everything, name='search-everything'),
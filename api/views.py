@@ -1,9 +1,12 @@
-from rest_framework import generics, filters, status
-from rest_framework.decorators import api_view
+from rest_framework import generics, filters, permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.fields import BooleanField
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Q
+from django.db.models import Count, Max, Q, Sum
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from datetime import timedelta
 from collections import Counter
@@ -13,13 +16,20 @@ from drf_spectacular.types import OpenApiTypes
 
 logger = logging.getLogger(__name__)
 
-from core.models import Source, Article
-from scraper.tasks import parse_source as parse_source_task, parse_all_sources as parse_all_sources_task, analyze_unanalyzed_articles
+from core.models import Source, Article, ArticleExport
+from core import trending, view_counter
+from scraper.tasks import parse_source as parse_source_task, parse_all_sources as parse_all_sources_task, analyze_unanalyzed_articles, export_articles_parquet
 from celery.result import AsyncResult
+from .cache import cached_response, get_or_build_response, get_cache_stats
+from . import export
+from .conditional import (
+    ConditionalListMixin, ConditionalRetrieveMixin, conditional_response, etag_matches, make_etag, not_modified
+)
+from .projection import COMPACT_FIELDS, parse_fields, project_queryset
 from .serializers import (
     SourceListSerializer, SourceDetailSerializer, SourceCreateUpdateSerializer,
-    ArticleListSerializer, ArticleDetailSerializer, ArticleCreateUpdateSerializer,
-    ArticleStatsSerializer, SourceStatsSerializer
+    ArticleListSerializer, ArticleCompactSerializer, ArticleDetailSerializer, ArticleCreateUpdateSerializer,
+    ArticleStatsSerializer, SourceStatsSerializer, ArticleExportSerializer, with_recent_articles
 )
 
 
@@ -51,8 +61,27 @@ class StandardResultsSetPagination(PageNumberPagination):
         - За неделю: `this_week=true`
         
         **Сортировка**: используйте параметр `ordering` с значениями `published_at`, `created_at`, `read_count`
+        
+        **Избранное**: `with_favorites=true` добавляет к статьям поле `is_favorite`
+        для авторизованного пользователя
+        
+        **Проекция**: `view=compact` отдает превью вместо полного текста,
+        `fields=id,title,url` - только перечисленные поля
         """,
         parameters=[
+            OpenApiParameter(
+                name='view',
+                description='Представление списка: compact - без полного текста статьи',
+                required=False,
+                type=OpenApiTypes.STR,
+                enum=['compact'],
+            ),
+            OpenApiParameter(
+                name='fields',
+                description='Список полей через запятую (например, id,title,url)',
+                required=False,
+                type=OpenApiTypes.STR,
+            ),
             OpenApiParameter(
                 name='search',
                 description='Поиск по заголовку, контенту и краткому содержанию',
@@ -125,7 +154,7 @@ class StandardResultsSetPagination(PageNumberPagination):
         description="Создает новую статью с проверкой уникальности URL."
     )
 )
-class ArticleListCreateView(generics.ListCreateAPIView):
+class ArticleListCreateView(ConditionalListMixin, generics.ListCreateAPIView):
     """
     Список статей с поиском и фильтрацией + создание новых статей.
     
@@ -155,11 +184,69 @@ class ArticleListCreateView(generics.ListCreateAPIView):
     ordering_fields = ['published_at', 'created_at', 'read_count']
     ordering = ['-published_at']  # По умолчанию сортируем по дате публикации
     
+    def get_list_etag_parts(self, queryset):
+        parts = super().get_list_etag_parts(queryset)
+        # Просмотры не меняют updated_at, но меняют порядок при ordering=read_count
+        if 'read_count' in self.request.query_params.get('ordering', ''):
+            parts.append(queryset.order_by().aggregate(views=Sum('read_count'))['views'])
+        return parts
+    
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return ArticleCreateUpdateSerializer
+        if self.request.query_params.get('view') == 'compact':
+            return ArticleCompactSerializer
         return ArticleListSerializer
     
+    def get_projected_fields(self):
+        """Поля ответа согласно параметрам view= и fields= (None - все поля)."""
+        if self.request.method != 'GET':
+            return None
+        compact = self.request.query_params.get('view') == 'compact'
+        allowed = COMPACT_FIELDS if compact else ArticleListSerializer.Meta.fields
+        fields = parse_fields(self.request.query_params.get('fields', ''), allowed)
+        return fields or (COMPACT_FIELDS if compact else None)
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_projected_fields()
+        return context
+    
+    def list(self, request, *args, **kwargs):
+        """Первая страница списка отдается из кэша ответов (вместе с ETag)."""
+        if request.query_params.get('page', '1') != '1':
+            response = super().list(request, *args, **kwargs)
+        else:
+            response = get_or_build_response(
+                'article_list', request, lambda: super(ArticleListCreateView, self).list(request, *args, **kwargs)
+            )
+        
+        with_favorites = request.query_params.get('with_favorites', '') in BooleanField.TRUE_VALUES
+        if with_favorites and request.user.is_authenticated:
+            response = self.add_favorite_flags(request, response)
+        return response
+    
+    def add_favorite_flags(self, request, response):
+        """
+        Добавляет is_favorite к статьям уже готового (возможно, общего) ответа.
+        
+        Флаги берутся из кэша избранного пользователя, а ETag ответа
+        учитывает их, чтобы 304 не вернул чужое состояние избранного.
+        """
+        from accounts import favorites
+        
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        
+        data = dict(response.data)
+        data['results'] = favorites.annotate_items(request.user.id, data.get('results', []))
+        
+        flags = [item['id'] for item in data['results'] if item.get('is_favorite')]
+        etag = make_etag(response.get('ETag', ''), request.user.id, *flags)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        return Response(data, headers={'ETag': etag})
+    
     def get_queryset(self):
         queryset = super().get_queryset()
         
@@ -205,6 +292,11 @@ class ArticleListCreateView(generics.ListCreateAPIView):
             for location in location_list:
                 q_objects |= Q(locations__icontains=location)
             queryset = queryset.filter(q_objects)
+        
+        # Читаем из БД только колонки, нужные запрошенным полям
+        fields = self.get_projected_fields()
+        if fields:
+            queryset = project_queryset(queryset, fields)
             
         return queryset
 
@@ -231,7 +323,7 @@ class ArticleListCreateView(generics.ListCreateAPIView):
         description="Удаляет статью из базы данных."
     )
 )
-class ArticleDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ArticleDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Детальная информация о статье + редактирование + удаление.
     """
@@ -246,12 +338,17 @@ class ArticleDetailView(generics.RetrieveUpdateDestroyAPIView):
         """Получение статьи с увеличением счетчика просмотров."""
         instance = self.get_object()
         
-        # Увеличиваем счетчик просмотров
-        instance.read_count += 1
-        instance.save(update_fields=['read_count'])
+        # Просмотр попадает в буфер и сбрасывается в БД пакетно
+        view_counter.record_view(instance.id)
+        trending.record_view(instance.id)
         
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        def build():
+            pending = view_counter.get_pending_counts([instance.id])
+            instance.read_count += pending.get(instance.id, 0)
+            return Response(self.get_serializer(instance).data)
+        
+        # Просмотр засчитывается и при ответе 304
+        return conditional_response(request, self.get_object_etag(request, instance), build)
 
 
 @extend_schema_view(
@@ -266,7 +363,7 @@ class ArticleDetailView(generics.RetrieveUpdateDestroyAPIView):
         description="Создает новый источник с проверкой уникальности URL."
     )
 )
-class SourceListCreateView(generics.ListCreateAPIView):
+class SourceListCreateView(ConditionalListMixin, generics.ListCreateAPIView):
     """
     Список источников + создание новых источников.
     
@@ -296,6 +393,16 @@ class SourceListCreateView(generics.ListCreateAPIView):
         if self.request.method == 'POST':
             return SourceCreateUpdateSerializer
         return SourceListSerializer
+    
+    def get_list_etag_parts(self, queryset):
+        # articles_count и last_parsed сохраняются через update_fields без updated_at
+        summary = queryset.order_by().aggregate(
+            last_updated=Max('updated_at'),
+            last_parsed=Max('last_parsed'),
+            articles=Sum('articles_count'),
+            total=Count('id')
+        )
+        return [summary['last_updated'], summary['last_parsed'], summary['articles'], summary['total']]
 
 
 @extend_schema_view(
@@ -320,16 +427,29 @@ class SourceListCreateView(generics.ListCreateAPIView):
         description="Удаляет источник из базы данных."
     )
 )
-class SourceDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SourceDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Детальная информация об источнике + редактирование + удаление.
     """
     queryset = Source.objects.all()
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            queryset = with_recent_articles(queryset)
+        return queryset
+    
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return SourceCreateUpdateSerializer
         return SourceDetailSerializer
+    
+    def get_object_etag_parts(self, instance):
+        # Ответ включает последние статьи источника
+        last_article = instance.articles.filter(is_active=True).aggregate(
+            last_updated=Max('updated_at')
+        )['last_updated']
+        return [instance.updated_at, instance.last_parsed, instance.articles_count, last_article]
 
 
 @extend_schema(
@@ -348,6 +468,7 @@ class SourceDetailView(generics.RetrieveUpdateDestroyAPIView):
     responses=ArticleStatsSerializer
 )
 @api_view(['GET'])
+@cached_response('articles_stats')
 def articles_stats(request):
     """Статистика по статьям."""
     
@@ -429,6 +550,7 @@ def articles_stats(request):
     responses=SourceStatsSerializer
 )
 @api_view(['GET'])
+@cached_response('sources_stats')
 def sources_stats(request):
     """Статистика по источникам."""
     
@@ -466,6 +588,76 @@ def sources_stats(request):
     })
 
 
+@extend_schema(
+    tags=['stats'],
+    summary="Статистика кэша ответов",
+    description="""
+    Возвращает текущее поколение данных и статистику кэша ответов
+    по эндпоинтам: попадания, промахи, доля попаданий и TTL.
+    """,
+)
+@api_view(['GET'])
+def cache_stats(request):
+    """Статистика кэша ответов."""
+    return Response(get_cache_stats())
+
+
+@extend_schema(
+    tags=['stats'],
+    summary="Метрики парсинга источников",
+    description="""
+    Возвращает метрики парсинга источников за период по телеметрии CrawlRun:
+    - Количество парсингов, ошибок и пустых результатов
+    - p50/p95 времени загрузки и разбора страницы (мс)
+    - Средний размер страницы
+    - Выход извлечения (статьи / найденные контейнеры) и доля новых статей
+    
+    Источники отсортированы от самого медленного по p95 загрузки.
+    Для одного источника (`source`) дополнительно возвращается тренд по дням.
+    """,
+    parameters=[
+        OpenApiParameter(
+            name='days',
+            description='Период в днях (по умолчанию 7)',
+            required=False,
+            type=OpenApiTypes.INT,
+        ),
+        OpenApiParameter(
+            name='source',
+            description='Метрики и тренд одного источника (ID)',
+            required=False,
+            type=OpenApiTypes.INT,
+        ),
+    ],
+)
+@api_view(['GET'])
+def crawl_stats(request):
+    """Метрики парсинга источников."""
+    from django.conf import settings
+    from core import crawl_telemetry
+    
+    days = request.query_params.get('days', '')
+    source_id = request.query_params.get('source', '')
+    if (days and not days.isdigit()) or (source_id and not source_id.isdigit()):
+        return Response(
+            {'error': 'Параметры days и source должны быть числами'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    days = min(int(days), getattr(settings, 'CRAWL_RUN_RETENTION_DAYS', 90)) if days else \
+        getattr(settings, 'CRAWL_STATS_DEFAULT_DAYS', 7)
+    source_id = int(source_id) if source_id else None
+    
+    response = {
+        'period_days': days,
+        'sources': crawl_telemetry.source_metrics(days=days, source_id=source_id),
+    }
+    if source_id is not None:
+        response['trend'] = crawl_telemetry.yield_trend(source_id, days=days)
+    
+    return Response(response)
+
+
 @extend_schema(
     tags=['search'],
     summary="Универсальный поиск",
@@ -544,22 +736,55 @@ def search_everything(request):
     tags=['search'],
     summary="Популярные статьи",
     description="""
-    Возвращает список популярных статей за последнюю неделю,
-    отсортированных по количеству просмотров.
+    Возвращает список популярных статей за последнюю неделю.
+    
+    Рейтинг строится по экспоненциально затухающей скорости просмотров
+    (свежие просмотры весят больше старых) и заранее материализуется
+    фоновой задачей для общего списка, каждой темы и каждого источника.
+    Пока рейтинг не собран, статьи сортируются по количеству просмотров.
     
     Ограничено 20 статьями.
     """,
+    parameters=[
+        OpenApiParameter(
+            name='topic',
+            description='Тренды внутри темы',
+            required=False,
+            type=OpenApiTypes.STR,
+        ),
+        OpenApiParameter(
+            name='source',
+            description='Тренды внутри источника (ID)',
+            required=False,
+            type=OpenApiTypes.INT,
+        ),
+    ],
 )
 @api_view(['GET'])
+@cached_response('trending_articles')
 def trending_articles(request):
     """Популярные статьи за последнюю неделю."""
     
-    week_ago = timezone.now() - timedelta(days=7)
+    topic = request.query_params.get('topic') or None
+    source_id = request.query_params.get('source')
+    source_id = int(source_id) if source_id and source_id.isdigit() else None
     
-    articles = Article.objects.filter(
-        is_active=True,
-        published_at__gte=week_ago
-    ).select_related('source').order_by('-read_count')[:20]
+    trending_ids = trending.get_trending_ids(topic=topic, source_id=source_id)
+    if trending_ids is None:
+        # Рейтинг еще не материализован (холодный старт или без общего хранилища)
+        articles = _trending_by_read_count(topic, source_id)
+    elif trending_ids:
+        # Готовый список: выборка по первичному ключу, порядок из рейтинга
+        articles_by_id = Article.objects.filter(
+            id__in=trending_ids, is_active=True
+        ).select_related('source').in_bulk()
+        articles = [articles_by_id[pk] for pk in trending_ids if pk in articles_by_id]
+        pending = view_counter.get_pending_counts(articles_by_id.keys())
+        for article in articles:
+            article.read_count += pending.get(article.id, 0)
+    else:
+        # Материализованный рейтинг пуст - в БД за ним не ходим
+        articles = []
     
     serializer = ArticleListSerializer(articles, many=True)
     
@@ -569,6 +794,33 @@ def trending_articles(request):
     })
 
 
+def _trending_by_read_count(topic=None, source_id=None):
+    """Запасной рейтинг по количеству просмотров (холодный старт)."""
+    week_ago = timezone.now() - timedelta(days=7)
+    
+    queryset = Article.objects.filter(
+        is_active=True,
+        published_at__gte=week_ago
+    ).select_related('source')
+    if topic:
+        queryset = queryset.filter(topic=topic)
+    if source_id:
+        queryset = queryset.filter(source_id=source_id)
+    articles = list(queryset.order_by('-read_count')[:20])
+    
+    # Учитываем просмотры, еще не сброшенные из буфера в БД
+    pending = view_counter.get_all_pending_counts()
+    if pending:
+        hot_ids = sorted(pending, key=pending.get, reverse=True)[:100]
+        loaded_ids = {article.id for article in articles}
+        articles.extend(queryset.filter(id__in=hot_ids).exclude(id__in=loaded_ids))
+        for article in articles:
+            article.read_count += pending.get(article.id, 0)
+        articles = sorted(articles, key=lambda a: a.read_count, reverse=True)[:20]
+    
+    return articles
+
+
 @extend_schema(
     tags=['articles'],
     summary="Переключить статус избранного",
@@ -826,3 +1078,162 @@ def analyze_articles(request):
         return Response({
             'error': f'Ошибка при запуске анализа: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _consume_export_quota(request):
+    """Расходует выгрузку из месячного лимита плана; при превышении - ответ 429."""
+    from accounts import quota
+    from accounts.entitlements import get_entitlements
+    
+    limit = get_entitlements(request.user).limits['exports']
+    result = quota.consume(request.user.id, 'exports', limit)
+    if result.allowed:
+        return None
+    return Response({
+        'error': 'Лимит выгрузок на этот месяц исчерпан',
+        'used': result.used,
+        'limit': result.limit,
+    }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+EXPORT_PARAMETERS = [
+    OpenApiParameter(
+        name='fields',
+        description='Поля через запятую: ' + ', '.join(export.EXPORT_COLUMNS),
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+]
+
+
+@extend_schema(
+    tags=['articles'],
+    summary="Выгрузка статей (NDJSON/CSV)",
+    description="""
+    Потоковая выгрузка всех статей, подходящих под фильтры списка статей
+    (`search`, `topic`, `source`, `tags`, `locations`, `today`, `ordering` и др.),
+    без пагинации.
+    
+    Формат задается в пути: `ndjson` (одна статья в строке) или `csv`
+    (теги и локации через `|`; значения, начинающиеся с `=`, `+`, `-`, `@`,
+    экранируются апострофом). Каждая выгрузка расходует единицу месячного
+    лимита выгрузок плана; если выгрузка прервалась ошибкой сервера,
+    единица возвращается.
+    """,
+    parameters=EXPORT_PARAMETERS,
+    responses={200: OpenApiTypes.BINARY, 429: OpenApiResponse(description="Лимит выгрузок исчерпан")},
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_articles(request, export_format):
+    """Потоковая выгрузка отфильтрованных статей."""
+    if export_format not in export.STREAM_FORMATS:
+        return Response({
+            'error': f'Неизвестный формат: {export_format}. Доступны: {", ".join(export.STREAM_FORMATS)}; '
+                     f'Parquet - через POST /api/exports/'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    fields = export.export_fields(request.query_params)
+    queryset = export.filtered_articles(request.query_params)
+    
+    denied = _consume_export_quota(request)
+    if denied:
+        return denied
+    
+    from accounts import quota
+    
+    user_id = request.user.id
+    response = StreamingHttpResponse(
+        export.refund_on_error(
+            export.stream(queryset, fields, export_format),
+            lambda: quota.release(user_id, 'exports')
+        ),
+        content_type=export.STREAM_FORMATS[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export.download_name(export_format)}"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@extend_schema(
+    tags=['articles'],
+    summary="Фоновые выгрузки статей (Parquet)",
+    description="""
+    GET - последние выгрузки пользователя.
+    
+    POST - ставит в очередь выгрузку в Parquet. Фильтры и `fields` передаются
+    query-параметрами, как для списка статей. Статус выгрузки доступен по
+    `/api/exports/{id}/`, готовый файл - по `download_url`. Каждая выгрузка
+    расходует единицу месячного лимита выгрузок плана.
+    """,
+    parameters=EXPORT_PARAMETERS,
+    responses={200: ArticleExportSerializer(many=True), 202: ArticleExportSerializer},
+)
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated])
+def article_exports(request):
+    """Список и создание фоновых выгрузок."""
+    if request.method == 'GET':
+        exports = ArticleExport.objects.filter(user=request.user)[:20]
+        return Response(ArticleExportSerializer(exports, many=True, context={'request': request}).data)
+    
+    if not export.PARQUET_AVAILABLE:
+        return Response({
+            'error': 'Выгрузка в Parquet недоступна: не установлен pyarrow'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    # Проверяем фильтры сразу, а не в фоновой задаче
+    export.filtered_articles(request.query_params)
+    
+    denied = _consume_export_quota(request)
+    if denied:
+        return denied
+    
+    article_export = ArticleExport.objects.create(
+        user=request.user,
+        format='parquet',
+        params=dict(request.query_params.lists()),
+    )
+    export_articles_parquet.delay(article_export.id)
+    
+    return Response(
+        ArticleExportSerializer(article_export, context={'request': request}).data,
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
+@extend_schema(
+    tags=['articles'],
+    summary="Статус фоновой выгрузки",
+    responses=ArticleExportSerializer,
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def article_export_detail(request, pk):
+    """Статус фоновой выгрузки пользователя."""
+    article_export = get_object_or_404(ArticleExport, pk=pk, user=request.user)
+    return Response(ArticleExportSerializer(article_export, context={'request': request}).data)
+
+
+@extend_schema(
+    tags=['articles'],
+    summary="Скачать файл выгрузки",
+    responses={200: OpenApiTypes.BINARY, 409: OpenApiResponse(description="Выгрузка еще не готова")},
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def article_export_download(request, pk):
+    """Файл завершенной выгрузки (отдается потоком с диска)."""
+    article_export = get_object_or_404(ArticleExport, pk=pk, user=request.user)
+    if article_export.status != 'done' or not article_export.file:
+        return Response({
+            'error': 'Выгрузка еще не готова',
+            'status': article_export.status,
+        }, status=status.HTTP_409_CONFLICT)
+    
+    return FileResponse(
+        article_export.file.open('rb'),
+        as_attachment=True,
+        filename=f'articles-{article_export.pk}.{article_export.format}',
+        content_type='application/vnd.apache.parquet',
+    )
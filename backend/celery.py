@@ -1,6 +1,7 @@
 # backend/celery.py
 
 import os
+from datetime import timedelta
 from celery import Celery
 from celery.schedules import crontab
 
@@ -19,12 +20,62 @@ app.autodiscover_tasks()
 # Явный импорт задач для обеспечения их регистрации
 app.autodiscover_tasks(['scraper'])
 
+# Очереди, маршруты и приоритеты задач (scraper/queues.py)
+from scraper.queues import PRIORITY_NORMAL, QUEUE_DEFAULT, TASK_QUEUES, TASK_ROUTES
+
+app.conf.task_queues = TASK_QUEUES
+app.conf.task_routes = TASK_ROUTES
+app.conf.task_default_queue = QUEUE_DEFAULT
+app.conf.task_default_priority = PRIORITY_NORMAL
+
+
+# Метрики Prometheus: файлы завершившихся процессов prefork-воркера (core/metrics.py)
+from celery.signals import worker_process_shutdown
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    from core.metrics import mark_process_dead
+    mark_process_dead(pid or os.getpid())
+
 # Настройка периодических задач
 app.conf.beat_schedule = {
     'parse-all-sources': {
         'task': 'scraper.tasks.parse_all_sources',
         'schedule': crontab(minute='*/30'),  # Каждые 30 минут
     },
+    'schedule-custom-sources': {
+        'task': 'scraper.tasks.schedule_custom_sources',
+        'schedule': crontab(minute='*/5'),  # Пользовательские источники
+    },
+    'flush-article-views': {
+        'task': 'scraper.tasks.flush_article_views',
+        'schedule': timedelta(seconds=15),  # Сброс буфера просмотров
+    },
+    'materialize-trending': {
+        'task': 'scraper.tasks.materialize_trending',
+        'schedule': timedelta(seconds=60),  # Пересчет трендов
+    },
+    'persist-usage-counters': {
+        'task': 'scraper.tasks.persist_usage_counters',
+        'schedule': timedelta(seconds=60),  # Сохранение счетчиков квот
+    },
+    'reanalyze-stale-articles': {
+        'task': 'scraper.tasks.reanalyze_stale_articles',
+        'schedule': timedelta(minutes=10),  # Повторный анализ после смены версии
+    },
+    'maintain-usage-partitions': {
+        'task': 'scraper.tasks.maintain_usage_partitions',
+        'schedule': crontab(hour=3, minute=0),  # Секции логов API
+    },
+    'prune-crawl-runs': {
+        'task': 'scraper.tasks.prune_crawl_runs',
+        'schedule': crontab(hour=3, minute=30),  # Очистка телеметрии парсинга
+    },
+    'prune-article-exports': {
+        'task': 'scraper.tasks.prune_article_exports',
+        'schedule': crontab(hour=4, minute=0),  # Очистка старых выгрузок статей
+    },
 }
 
 @app.task(bind=True)
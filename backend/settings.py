@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,12 +51,15 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.QueryCountMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'accounts.middleware.APIUsageLogMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -154,6 +158,49 @@ CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 
+# Приоритеты внутри очереди Redis (0 - высший, 9 - низший) и выдача
+# задач воркеру по одной: долгие задачи не блокируют короткие
+# (очереди и маршруты задаются в backend/celery.py)
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'queue_order_strategy': 'priority',
+    'priority_steps': list(range(10)),
+    'sep': ':',
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Переопределение concurrency/prefetch воркеров по очередям (scraper/queues.py),
+# например {'crawl': {'concurrency': 8}}
+WORKER_PROFILES = {}
+
+# =============================================================================
+# CACHE CONFIGURATION
+# =============================================================================
+
+# В разработке - память процесса. Альтернативы:
+# - файловый кэш: 'django.core.cache.backends.filebased.FileBasedCache',
+#   'LOCATION': BASE_DIR / '.cache'
+# - production: 'django.core.cache.backends.redis.RedisCache',
+#   'LOCATION': 'redis://localhost:6379/2'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mediascope-default',
+        'TIMEOUT': 300,
+    }
+}
+
+# Кэш ответов read-only эндпоинтов API (api/cache.py).
+# Поколение данных и счетчики попаданий хранятся в FAST_STORE_URL
+RESPONSE_CACHE_ENABLED = True
+
+# TTL ответов по эндпоинтам (сек)
+RESPONSE_CACHE_TTLS = {
+    'articles_stats': 300,
+    'sources_stats': 300,
+    'trending_articles': 60,
+    'article_list': 30,
+}
+
 # =============================================================================
 # REST FRAMEWORK CONFIGURATION
 # =============================================================================
@@ -249,6 +296,137 @@ SPACY_MODEL_NAME = 'ru_core_news_sm'
 # Fallback to legacy analyzer if spaCy fails
 SPACY_FALLBACK_ENABLED = True
 
+# Параллельный анализ статей (core/analysis_executor.py): число процессов
+# (None - по числу ядер) и размер пачки статей на одну передачу в процесс.
+# Пул один на процесс воркера; в prefork-пуле Celery дочерние процессы
+# запрещены, и анализ идет в самом воркере (для пула: --pool=threads или solo)
+ANALYSIS_WORKERS = None
+ANALYSIS_CHUNK_SIZE = 25
+
+# Кэш результатов анализа по хэшу текста (core/analysis_cache.py):
+# LRU в памяти процесса + SQLite-файл (None - только память)
+ANALYSIS_CACHE_ENABLED = True
+ANALYSIS_CACHE_SIZE = 5000
+ANALYSIS_CACHE_PATH = BASE_DIR / '.analysis_cache.sqlite3'
+ANALYSIS_CACHE_DISK_MAX_ENTRIES = 200000
+
+# Повторный анализ статей после смены версии анализатора (core/reanalysis.py):
+# размер пачки за запуск, "свежие" статьи анализируются первыми, запуск
+# пропускается, пока новых непроанализированных статей не меньше порога
+REANALYSIS_ENABLED = True
+REANALYSIS_BATCH_SIZE = 200
+REANALYSIS_RECENT_DAYS = 7
+REANALYSIS_MAX_PENDING_NEW = 100
+
+# Через сколько часов повторять анализ статей, для которых spaCy откатился
+# на legacy-анализатор (ошибка модели на тексте)
+REANALYSIS_FALLBACK_RETRY_HOURS = 24
+
+# =============================================================================
+# FAST STORE / COUNTERS CONFIGURATION
+# =============================================================================
+
+# Быстрое хранилище для счетчиков и буферов (core/kvstore.py)
+# 'memory://' - в памяти процесса (dev), 'redis://localhost:6379/1' - production
+FAST_STORE_URL = 'memory://'
+
+# Как часто (сек) процесс сам сбрасывает буфер просмотров статей в БД
+# (только для memory://; с Redis буфер сбрасывает задача flush_article_views)
+VIEW_COUNTER_FLUSH_INTERVAL = 10
+
+# Тренды (core/trending.py): период полураспада веса просмотра, окно публикации,
+# размер материализуемых списков и время их жизни (сек)
+TRENDING_HALF_LIFE_HOURS = 6
+TRENDING_WINDOW_DAYS = 7
+TRENDING_TOP_N = 20
+TRENDING_CANDIDATES = 1000
+TRENDING_MATERIALIZE_TTL = 300
+
+# Квоты тарифных планов (accounts/quota.py): как часто (сек) процесс сам
+# сохраняет измененные счетчики в UsageTracking, если FAST_STORE_URL не общий
+# (memory://); с Redis их сохраняет задача persist_usage_counters
+QUOTA_PERSIST_INTERVAL = 30
+
+# Время жизни (сек) кэша прав пользователя - подписка, план и лимиты
+# (accounts/entitlements.py); сбрасывается сигналами при изменениях
+ENTITLEMENTS_CACHE_TTL = 300
+
+# Время жизни (сек) кэша ответов дашбордов пользователя (accounts/dashboard.py)
+DASHBOARD_CACHE_TTL = 30
+
+# Кэш множества избранных статей пользователя (accounts/favorites.py) и
+# максимум статей в одном запросе статуса избранного
+FAVORITES_CACHE_TTL = 300
+FAVORITE_STATUS_MAX_IDS = 100
+
+# Парсинг пользовательских источников (scraper/custom_sources.py):
+# переопределение лимитов планов, например {'premium': {'min_interval': 10}}
+# (min_interval - минуты между парсингами, concurrency - одновременные парсинги),
+# максимум постановок за запуск планировщика и срок блокировки источника (сек)
+CUSTOM_CRAWL_PLAN_LIMITS = {}
+CUSTOM_CRAWL_BATCH_SIZE = 50
+CUSTOM_CRAWL_LEASE = 900
+
+# Объединение загрузок одного URL (scraper/fetch_coalescer.py): сколько
+# хранится результат разбора, срок блокировки загрузки и максимальное
+# ожидание чужой загрузки (сек)
+FETCH_COALESCE_ENABLED = True
+FETCH_RESULT_TTL = 120
+FETCH_LOCK_TTL = 60
+FETCH_WAIT_TIMEOUT = 45
+
+# Телеметрия парсинга источников (core/crawl_telemetry.py): срок хранения
+# записей CrawlRun (дни) и период метрик по умолчанию для /api/stats/crawl/
+CRAWL_RUN_RETENTION_DAYS = 90
+CRAWL_STATS_DEFAULT_DAYS = 7
+
+# Выгрузка статей (api/export.py): размер пакета серверного курсора и
+# группы строк Parquet, сжатие Parquet и срок хранения файлов (дни)
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_PARQUET_COMPRESSION = 'zstd'
+EXPORT_RETENTION_DAYS = 7
+
+# Метрики Prometheus (core/metrics.py): эндпоинт /metrics, токен доступа
+# из переменной окружения METRICS_AUTH_TOKEN (Authorization: Bearer <token>;
+# без токена /metrics открыт только при DEBUG) и префиксы путей,
+# для которых пишется время ответа. Для Celery prefork и gunicorn задайте
+# переменную окружения PROMETHEUS_MULTIPROC_DIR
+METRICS_ENABLED = True
+METRICS_AUTH_TOKEN = os.environ.get('METRICS_AUTH_TOKEN', '')
+METRICS_PATH_PREFIXES = ('/api/',)
+
+# Профилирование по запросу (core/profiling.py): источники (ID или имена)
+# и задачи, которые профилируются всегда, профилировщик (cprofile,
+# pyinstrument или None - только этапы), порог сохранения отчета (мс),
+# число строк отчета cProfile и максимум хранимых отчетов
+PROFILING_SOURCES = []
+PROFILING_TASKS = []
+PROFILING_ENGINE = 'cprofile'
+PROFILING_SLOW_THRESHOLD_MS = 5000
+PROFILING_TOP_FUNCTIONS = 40
+PROFILING_MAX_REPORTS = 200
+
+# Подсчет SQL-запросов на запрос к API (core/middleware.py): заголовки
+# X-Query-Count / X-Query-Time-Ms и порог, выше которого запрос пишется
+# в лог (None - не писать)
+QUERY_COUNT_HEADERS = DEBUG
+QUERY_COUNT_WARN_THRESHOLD = 30
+
+# Логи использования API (accounts/usage_log.py): размер очереди процесса,
+# размер пачки bulk_create и максимальная задержка записи (сек)
+USAGE_LOG_ENABLED = True
+USAGE_LOG_PATH_PREFIXES = ['/api/']
+USAGE_LOG_QUEUE_SIZE = 10000
+USAGE_LOG_BATCH_SIZE = 500
+USAGE_LOG_FLUSH_INTERVAL = 5
+
+# Секции APIUsageLog (accounts/partitions.py, команда manage_usage_partitions):
+# сколько месяцев создавать заранее, срок хранения логов в месяцах и
+# каталог для выгрузки секций перед удалением (None - удалять без архива)
+API_USAGE_LOG_PARTITIONS_AHEAD = 3
+API_USAGE_LOG_RETENTION_MONTHS = 12
+API_USAGE_LOG_ARCHIVE_DIR = None
+
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
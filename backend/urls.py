@@ -20,10 +20,13 @@ from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
+from core.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),  
     path('api/auth/', include('accounts.urls')),  # API аутентификации
+    path('metrics', metrics_view, name='metrics'),  # Метрики Prometheus
     
     # OpenAPI документация
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
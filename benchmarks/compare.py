@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Сравнение двух файлов результатов бенчмарков (--benchmark-json).
+
+    python benchmarks/compare.py benchmarks/results/a1b2c3d.json benchmarks/results/e4f5a6b.json
+
+Сравниваются медианы сценариев. Код возврата 1, если хотя бы один
+сценарий стал медленнее больше чем на --threshold процентов.
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    medians = {bench['fullname']: bench['stats']['median'] for bench in data['benchmarks']}
+    commit = (data.get('commit_info') or {}).get('id', '')[:8] or path
+    return medians, commit, data.get('fixtures_digest')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сравнение результатов бенчмарков')
+    parser.add_argument('baseline', help='Файл результатов базового коммита')
+    parser.add_argument('current', help='Файл результатов проверяемого коммита')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Допустимое замедление медианы, %% (по умолчанию: 10)')
+    args = parser.parse_args()
+
+    baseline, baseline_commit, baseline_fixtures = load(args.baseline)
+    current, current_commit, current_fixtures = load(args.current)
+
+    if baseline_fixtures != current_fixtures:
+        print('Внимание: записанные страницы различаются, сравнение может быть некорректным')
+
+    print(f'{"Сценарий":<60} {baseline_commit:>12} {current_commit:>12} {"Изменение":>10}')
+    regressions = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            status = 'новый' if name in current else 'удален'
+            print(f'{name:<60} {"":>12} {"":>12} {status:>10}')
+            continue
+        change = (current[name] - baseline[name]) / baseline[name] * 100
+        marker = ' !' if change > args.threshold else ''
+        print(f'{name:<60} {baseline[name] * 1000:>10.3f}мс {current[name] * 1000:>10.3f}мс {change:>+9.1f}%{marker}')
+        if change > args.threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f'\nЗамедление больше {args.threshold:.0f}%: {len(regressions)} сценариев')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
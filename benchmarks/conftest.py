@@ -0,0 +1,139 @@
+"""
+Общие фикстуры бенчмарков: Django, записанные страницы и локальный сервер.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+# Кэш анализа только в памяти, чтобы прогоны не зависели от файла на диске
+settings.ANALYSIS_CACHE_PATH = None
+
+MANIFEST = json.loads((FIXTURES / 'manifest.json').read_text(encoding='utf-8'))
+SITES = sorted(MANIFEST['listings'])
+ARTICLES = sorted(MANIFEST['articles'])
+
+
+def load_listing(site: str) -> str:
+    return (FIXTURES / MANIFEST['listings'][site]['file']).read_text(encoding='utf-8')
+
+
+def load_article(name: str):
+    """Заголовок (первая строка) и текст записанной статьи."""
+    title, _, content = (FIXTURES / MANIFEST['articles'][name]['file']).read_text(encoding='utf-8').partition('\n')
+    return title.strip(), content.strip()
+
+
+def listing_source(site: str, url: str = None) -> SimpleNamespace:
+    """Объект источника для парсера (SourceProtocol)."""
+    return SimpleNamespace(id=None, name=site, url=url or MANIFEST['listings'][site]['url'])
+
+
+def fixtures_digest() -> str:
+    """Хэш набора записанных страниц: результаты на разных наборах несравнимы."""
+    digest = hashlib.sha1()
+    for path in sorted(FIXTURES.rglob('*')):
+        if path.is_file():
+            digest.update(path.relative_to(FIXTURES).as_posix().encode('utf-8'))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+@pytest.fixture(autouse=True)
+def memory_store():
+    """Отдельное быстрое хранилище в памяти для каждого сценария."""
+    from core.kvstore import MemoryStore, reset_store
+
+    reset_store(MemoryStore())
+    yield
+    reset_store(None)
+
+
+@pytest.fixture(scope='session')
+def stub_server():
+    """
+    Локальный HTTP-сервер, отдающий записанные страницы по адресу /<site>.
+
+    Возвращает базовый URL сервера.
+    """
+    from aiohttp import web
+
+    pages = {site: load_listing(site) for site in SITES}
+
+    async def handle(request):
+        page = pages.get(request.match_info['site'])
+        if page is None:
+            raise web.HTTPNotFound()
+        return web.Response(text=page, content_type='text/html', charset='utf-8')
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    runner = None
+
+    def serve():
+        nonlocal runner
+        asyncio.set_event_loop(loop)
+        app = web.Application()
+        app.router.add_get('/{site}', handle)
+        runner = web.AppRunner(app, access_log=None)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port).start())
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    ready.wait(10)
+
+    yield f'http://127.0.0.1:{port}'
+
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+
+
+@pytest.fixture
+def database():
+    """БД для сценария сохранения: изменения откатываются, без PostgreSQL сценарий пропускается."""
+    from django.db import connection, transaction
+
+    try:
+        connection.ensure_connection()
+    except Exception as e:
+        pytest.skip(f'БД недоступна: {e}')
+
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    """Добавляет в файл результатов хэш страниц (см. compare.py) и список синтетических."""
+    output_json['fixtures_digest'] = fixtures_digest()
+    output_json['synthetic_listings'] = sorted(
+        site for site, listing in MANIFEST['listings'].items() if listing.get('synthetic')
+    )
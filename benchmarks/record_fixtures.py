@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Перезапись страниц бенчмарков с живых сайтов.
+
+    python benchmarks/record_fixtures.py            # все сайты из manifest.json
+    python benchmarks/record_fixtures.py lenta rt   # только указанные
+
+Страница загружается тем же UniversalNewsParser, что и в продакшене,
+сохраняется в fixtures/listings/, а min_articles в manifest.json
+обновляется по текущему числу извлеченных статей, флаг synthetic
+снимается. После перезаписи результаты бенчмарков несравнимы
+с прежними (см. fixtures_digest).
+"""
+
+import asyncio
+import json
+import sys
+
+from conftest import FIXTURES, MANIFEST, listing_source
+from scraper.parsers.universal_parser import UniversalNewsParser, parse_listing
+
+
+async def record(site: str) -> int:
+    listing = MANIFEST['listings'][site]
+    async with UniversalNewsParser() as parser:
+        html = await parser.fetch_page(listing['url'])
+    if not html:
+        print(f'{site}: не удалось загрузить {listing["url"]}')
+        return 0
+
+    (FIXTURES / listing['file']).write_text(html, encoding='utf-8')
+    articles = parse_listing(html, listing_source(site))
+    listing['min_articles'] = len(articles)
+    listing['synthetic'] = False
+    print(f'{site}: {len(html)} символов, {len(articles)} статей')
+    return len(articles)
+
+
+def main():
+    sites = sys.argv[1:] or sorted(MANIFEST['listings'])
+    unknown = [site for site in sites if site not in MANIFEST['listings']]
+    if unknown:
+        print(f'Неизвестные сайты: {", ".join(unknown)}')
+        return 1
+
+    for site in sites:
+        asyncio.run(record(site))
+
+    if not any(listing.get('synthetic') for listing in MANIFEST['listings'].values()):
+        MANIFEST.pop('note', None)
+    (FIXTURES / 'manifest.json').write_text(
+        json.dumps(MANIFEST, ensure_ascii=False, indent=2) + '\n', encoding='utf-8'
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
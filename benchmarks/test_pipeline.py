@@ -0,0 +1,133 @@
+"""
+Бенчмарки конвейера парсинга на записанных страницах.
+
+Сценарии: загрузка (через локальный сервер), разбор HTML, извлечение
+статей, дедупликация, сохранение и анализ. Запуск и сравнение
+результатов между коммитами - см. benchmarks/README.md.
+"""
+
+import asyncio
+import itertools
+
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import ARTICLES, MANIFEST, SITES, listing_source, load_article, load_listing
+from core.text_analyzer import TextAnalyzer
+from scraper.fetch_coalescer import coalesce, url_digest
+from scraper.parsers.universal_parser import UniversalNewsParser, extract_articles, parse_listing
+
+
+@pytest.fixture(scope='module')
+def extracted():
+    """Статьи, извлеченные из всех записанных страниц."""
+    return {site: parse_listing(load_listing(site), listing_source(site)) for site in SITES}
+
+
+@pytest.mark.parametrize('site', SITES)
+def test_fetch(benchmark, stub_server, site):
+    async def fetch():
+        async with UniversalNewsParser() as parser:
+            return await parser.fetch_page(f'{stub_server}/{site}')
+
+    html = benchmark(lambda: asyncio.run(fetch()))
+    assert html == load_listing(site)
+
+
+@pytest.mark.parametrize('site', SITES)
+def test_parse(benchmark, site):
+    html = load_listing(site)
+    parser = UniversalNewsParser()
+
+    containers = benchmark(lambda: parser.find_article_containers(BeautifulSoup(html, 'html.parser')))
+    assert containers
+
+
+@pytest.mark.parametrize('site', SITES)
+def test_extract(benchmark, site):
+    parser = UniversalNewsParser()
+    containers = parser.find_article_containers(BeautifulSoup(load_listing(site), 'html.parser'))
+
+    articles = benchmark(extract_articles, parser, containers, listing_source(site))
+    assert len(articles) >= MANIFEST['listings'][site]['min_articles']
+
+
+def test_dedup_url_digest(benchmark, extracted):
+    urls = [article['url'] for articles in extracted.values() for article in articles]
+
+    digests = benchmark(lambda: {url_digest(url) for url in urls})
+    assert len(digests) <= len(urls)
+
+
+def test_dedup_coalesced_fetch(benchmark, extracted):
+    """Повторная загрузка тех же страниц отдается из результата первой."""
+    listings = [(MANIFEST['listings'][site]['url'], extracted[site]) for site in SITES]
+    for url, articles in listings:
+        coalesce(url, lambda articles=articles: articles)
+
+    def refetch():
+        return [coalesce(url, lambda: pytest.fail('страница загружена повторно')) for url, _ in listings]
+
+    results = benchmark(refetch)
+    assert [len(result) for result in results] == [len(articles) for _, articles in listings]
+
+
+def test_save(benchmark, database, monkeypatch, extracted):
+    from core.models import Article, Source
+    from scraper import tasks
+
+    monkeypatch.setattr(tasks.analyze_article_text, 'delay', lambda *args, **kwargs: None)
+    source = Source.objects.create(name='benchmark', url='https://benchmark.invalid/save', is_active=False)
+    # Ссылка может встретиться на странице дважды - сохраняется только первая
+    batch = list({article['url']: article for article in extracted['lenta']}.values())
+    rounds = itertools.count()
+
+    def setup():
+        # Каждый раунд сохраняет новые URL, иначе измерялась бы проверка дубликата
+        round_number = next(rounds)
+        return ([
+            {**article, 'url': f"{article['url']}?round={round_number}", 'source_id': source.id}
+            for article in batch
+        ],), {}
+
+    def save(articles):
+        return [tasks.save_article.run(article)['status'] for article in articles]
+
+    statuses = benchmark.pedantic(save, setup=setup, rounds=10)
+    assert statuses.count('created') == len(batch)
+    # С --benchmark-disable pedantic выполняет один раунд вместо десяти
+    assert Article.objects.filter(source=source).count() == len(batch) * next(rounds)
+
+
+@pytest.mark.parametrize('name', ARTICLES)
+def test_analyze(benchmark, name):
+    title, content = load_article(name)
+    analyzer = TextAnalyzer()
+
+    result = benchmark(analyzer._analyze, title, content, '')
+    assert result['topic']
+
+
+@pytest.mark.parametrize('name', ARTICLES)
+def test_analyze_cached(benchmark, name):
+    title, content = load_article(name)
+    analyzer = TextAnalyzer()
+    analyzer.analyze_text(title, content)
+
+    result = benchmark(analyzer.analyze_text, title, content)
+    assert result['topic']
+
+
+@pytest.mark.parametrize('name', ARTICLES)
+def test_analyze_spacy(benchmark, name):
+    pytest.importorskip('spacy')
+    from core.spacy_analyzer import SpacyTextAnalyzer
+
+    try:
+        analyzer = SpacyTextAnalyzer()
+    except OSError as e:
+        pytest.skip(f'Модель spaCy не установлена: {e}')
+    title, content = load_article(name)
+
+    result = benchmark(analyzer._analyze_spacy, title, content, '')
+    assert result is not None
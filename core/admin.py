@@ -1,7 +1,32 @@
+from datetime import timedelta
+
 from django.contrib import admin
-from django.utils.html import format_html
+from django.db.models import Avg, Count, Q
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
 from django.utils import timezone
-from .models import Source, Article
+from .models import Source, Article, ArticleExport, CrawlRun, ProfileReport
+from .profiling import download_name
+
+# Период сводки парсинга в списке источников (дни)
+CRAWL_HEALTH_DAYS = 7
+
+
+def bulk_update(queryset, **fields) -> int:
+    """
+    Массовое изменение полей из действия админки.
+
+    queryset.update() не вызывает post_save, поэтому поколение кэша
+    ответов API увеличивается здесь явно.
+    """
+    from api.cache import bump_generation
+
+    count = queryset.update(**fields)
+    if count:
+        bump_generation()
+    return count
 
 
 @admin.register(Source)
@@ -10,11 +35,11 @@ class SourceAdmin(admin.ModelAdmin):
     
     list_display = [
         'name', 'type_badge', 'is_active_badge', 'articles_count', 
-        'last_parsed_display', 'created_at'
+        'last_parsed_display', 'crawl_health', 'avg_fetch_display', 'created_at'
     ]
     list_filter = ['type', 'is_active', 'created_at']
     search_fields = ['name', 'url', 'description']
-    readonly_fields = ['created_at', 'updated_at', 'articles_count']
+    readonly_fields = ['created_at', 'updated_at', 'articles_count', 'crawl_metrics']
     
     fieldsets = (
         ('Основная информация', {
@@ -27,6 +52,9 @@ class SourceAdmin(admin.ModelAdmin):
             'fields': ('articles_count', 'last_parsed'),
             'classes': ('collapse',)
         }),
+        ('Парсинг', {
+            'fields': ('crawl_metrics',),
+        }),
         ('Метаданные', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -35,6 +63,15 @@ class SourceAdmin(admin.ModelAdmin):
     
     actions = ['activate_sources', 'deactivate_sources']
 
+    def get_queryset(self, request):
+        """Сводка парсинга за CRAWL_HEALTH_DAYS дней одним запросом для всего списка."""
+        recent = Q(crawl_runs__started_at__gte=timezone.now() - timedelta(days=CRAWL_HEALTH_DAYS))
+        return super().get_queryset(request).annotate(
+            crawl_runs_recent=Count('crawl_runs', filter=recent),
+            crawl_errors_recent=Count('crawl_runs', filter=recent & Q(crawl_runs__status='error')),
+            avg_fetch_ms=Avg('crawl_runs__fetch_ms', filter=recent),
+        )
+
     def type_badge(self, obj):
         """Цветной бейдж типа источника."""
         colors = {
@@ -82,15 +119,58 @@ class SourceAdmin(admin.ModelAdmin):
         return "Никогда"
     last_parsed_display.short_description = 'Последний парсинг'
 
+    def crawl_health(self, obj):
+        """Доля неудачных парсингов за период со ссылкой на историю."""
+        runs = getattr(obj, 'crawl_runs_recent', 0)
+        if not runs:
+            return "—"
+        errors = obj.crawl_errors_recent
+        color = '#28a745' if not errors else '#ffc107' if errors * 2 < runs else '#dc3545'
+        url = reverse('admin:core_crawlrun_changelist') + f'?source__id__exact={obj.pk}'
+        return format_html(
+            '<a href="{}" style="color: {};">{} ошибок / {}</a>', url, color, errors, runs
+        )
+    crawl_health.short_description = f'Парсинги за {CRAWL_HEALTH_DAYS} дн.'
+    crawl_health.admin_order_field = 'crawl_errors_recent'
+
+    def avg_fetch_display(self, obj):
+        """Среднее время загрузки страницы за период."""
+        avg_fetch_ms = getattr(obj, 'avg_fetch_ms', None)
+        return f"{avg_fetch_ms:.0f} мс" if avg_fetch_ms is not None else "—"
+    avg_fetch_display.short_description = 'Загрузка'
+    avg_fetch_display.admin_order_field = 'avg_fetch_ms'
+
+    def crawl_metrics(self, obj):
+        """p50/p95 загрузки и разбора, выход извлечения и доля новых статей."""
+        if not obj.pk:
+            return "—"
+        from .crawl_telemetry import source_metrics
+
+        metrics = source_metrics(days=CRAWL_HEALTH_DAYS, source_id=obj.pk)
+        if not metrics:
+            return "Нет данных"
+        item = metrics[0]
+        return format_html(
+            'Парсингов: {} (ошибок: {}, пустых: {})<br>'
+            'Загрузка p50/p95: {} / {} мс<br>'
+            'Разбор p50/p95: {} / {} мс<br>'
+            'Выход извлечения: {} · Доля новых: {}',
+            item['runs'], item['errors'], item['empty_runs'],
+            item['fetch_ms']['p50'], item['fetch_ms']['p95'],
+            item['parse_ms']['p50'], item['parse_ms']['p95'],
+            _percent(item['extraction_yield']), _percent(item['new_ratio']),
+        )
+    crawl_metrics.short_description = f'Метрики за {CRAWL_HEALTH_DAYS} дн.'
+
     def activate_sources(self, request, queryset):
         """Активировать выбранные источники."""
-        count = queryset.update(is_active=True)
+        count = bulk_update(queryset, is_active=True)
         self.message_user(request, f"Активировано {count} источников.")
     activate_sources.short_description = "Активировать выбранные источники"
 
     def deactivate_sources(self, request, queryset):
         """Деактивировать выбранные источники."""
-        count = queryset.update(is_active=False)
+        count = bulk_update(queryset, is_active=False)
         self.message_user(request, f"Деактивировано {count} источников.")
     deactivate_sources.short_description = "Деактивировать выбранные источники"
 
@@ -108,7 +188,7 @@ class ArticleAdmin(admin.ModelAdmin):
         'source', 'published_at', 'created_at'
     ]
     search_fields = ['title', 'content', 'summary', 'tags', 'locations']
-    readonly_fields = ['created_at', 'updated_at', 'read_count']
+    readonly_fields = ['created_at', 'updated_at', 'read_count', 'analyzer_version', 'analyzed_at']
     date_hierarchy = 'published_at'
     
     fieldsets = (
@@ -119,7 +199,7 @@ class ArticleAdmin(admin.ModelAdmin):
             'fields': ('summary', 'content'),
         }),
         ('Автоматический анализ', {
-            'fields': ('topic', 'tags', 'locations', 'is_analyzed'),
+            'fields': ('topic', 'tags', 'locations', 'is_analyzed', 'analyzer_version', 'analyzed_at'),
             'description': 'Поля заполняются автоматически при анализе текста'
         }),
         ('Настройки', {
@@ -197,43 +277,196 @@ class ArticleAdmin(admin.ModelAdmin):
 
     def mark_as_featured(self, request, queryset):
         """Отметить как рекомендуемые."""
-        count = queryset.update(is_featured=True)
+        count = bulk_update(queryset, is_featured=True)
         self.message_user(request, f"Отмечено как рекомендуемые {count} статей.")
     mark_as_featured.short_description = "Отметить как рекомендуемые"
 
     def unmark_as_featured(self, request, queryset):
         """Убрать из рекомендуемых."""
-        count = queryset.update(is_featured=False)
+        count = bulk_update(queryset, is_featured=False)
         self.message_user(request, f"Убрано из рекомендуемых {count} статей.")
     unmark_as_featured.short_description = "Убрать из рекомендуемых"
 
     def activate_articles(self, request, queryset):
         """Активировать выбранные статьи."""
-        count = queryset.update(is_active=True)
+        count = bulk_update(queryset, is_active=True)
         self.message_user(request, f"Активировано {count} статей.")
     activate_articles.short_description = "Активировать выбранные статьи"
 
     def deactivate_articles(self, request, queryset):
         """Деактивировать выбранные статьи."""
-        count = queryset.update(is_active=False)
+        count = bulk_update(queryset, is_active=False)
         self.message_user(request, f"Деактивировано {count} статей.")
     deactivate_articles.short_description = "Деактивировать выбранные статьи"
 
     def analyze_articles(self, request, queryset):
         """Запустить анализ для выбранных статей."""
+        from scraper.queues import PRIORITY_NORMAL
         from scraper.tasks import analyze_article_text
         
         count = 0
         for article in queryset:
             if not article.is_analyzed:
-                analyze_article_text.delay(article.id)
+                # Ниже приоритетом, чем только что собранные статьи
+                analyze_article_text.apply_async((article.id,), priority=PRIORITY_NORMAL)
                 count += 1
         
         self.message_user(request, f"Запущен анализ для {count} статей.")
     analyze_articles.short_description = "Анализировать выбранные статьи"
 
 
+@admin.register(CrawlRun)
+class CrawlRunAdmin(admin.ModelAdmin):
+    """Админка для телеметрии парсинга."""
+    
+    list_display = [
+        'source', 'tier', 'status_badge', 'http_status', 'fetch_ms', 'parse_ms',
+        'containers_found', 'articles_found', 'new_articles', 'fetch_outcome', 'started_at'
+    ]
+    list_filter = ['status', 'tier', 'fetch_outcome', 'source', 'started_at']
+    search_fields = ['source__name', 'error']
+    list_select_related = ['source']
+    date_hierarchy = 'started_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def status_badge(self, obj):
+        """Цветной бейдж статуса парсинга."""
+        colors = {
+            'success': '#28a745',
+            'no_articles': '#ffc107',
+            'error': '#dc3545',
+        }
+        return format_html(
+            '<span style="color: {};">{}</span>',
+            colors.get(obj.status, '#6c757d'), obj.get_status_display()
+        )
+    status_badge.short_description = 'Статус'
+    status_badge.admin_order_field = 'status'
+
+
+@admin.register(ProfileReport)
+class ProfileReportAdmin(admin.ModelAdmin):
+    """Админка для профилей медленных запусков."""
+    
+    list_display = ['target', 'kind', 'source', 'duration_ms', 'engine', 'top_span', 'download_link', 'created_at']
+    list_filter = ['kind', 'engine', 'source', 'created_at']
+    search_fields = ['target']
+    list_select_related = ['source']
+    exclude = ['raw']
+    readonly_fields = ['kind', 'target', 'source', 'duration_ms', 'engine', 'spans_table', 'download_link',
+                       'report_text', 'created_at']
+    fields = readonly_fields
+
+    def get_queryset(self, request):
+        # Файл профиля нужен только при скачивании
+        return super().get_queryset(request).defer('raw', 'report')
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='core_profilereport_download',
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        """Скачивание файла профиля (.prof для cProfile, HTML для pyinstrument)."""
+        if not self.has_view_permission(request):
+            raise Http404
+        report = get_object_or_404(ProfileReport, pk=pk)
+        if not report.raw:
+            raise Http404("Профиль сохранен без профилировщика")
+        content_type = 'text/html' if report.engine == 'pyinstrument' else 'application/octet-stream'
+        response = HttpResponse(bytes(report.raw), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{download_name(report)}"'
+        return response
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def top_span(self, obj):
+        """Самый долгий этап."""
+        if not obj.spans:
+            return "—"
+        span = obj.spans[0]
+        return f"{span['name']}: {span['ms']:.0f} мс"
+    top_span.short_description = 'Самый долгий этап'
+
+    def download_link(self, obj):
+        """Ссылка на скачивание файла профиля."""
+        if not obj.engine:
+            return "—"
+        url = reverse('admin:core_profilereport_download', args=[obj.pk])
+        return format_html('<a href="{}">Скачать</a>', url)
+    download_link.short_description = 'Профиль'
+
+    def spans_table(self, obj):
+        """Этапы запуска от самого долгого."""
+        if not obj.spans:
+            return "—"
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td>{}</td></tr>',
+            ((span['name'], f"{span['ms']:.1f} мс", span['count']) for span in obj.spans)
+        )
+        return format_html(
+            '<table><tr><th>Этап</th><th>Время</th><th>Вызовов</th></tr>{}</table>', rows
+        )
+    spans_table.short_description = 'Этапы'
+
+    def report_text(self, obj):
+        """Текстовый отчет профилировщика."""
+        if not obj.report:
+            return "—"
+        return format_html('<pre style="max-height: 600px; overflow: auto;">{}</pre>', obj.report)
+    report_text.short_description = 'Отчет'
+
+
+def _percent(value):
+    return f"{value:.0%}" if value is not None else "—"
+
+
 # Кастомизация заголовков админки
 admin.site.site_header = "MediaScope - Админ-панель"
 admin.site.site_title = "MediaScope"
 admin.site.index_title = "Управление новостной платформой"
+
+
+@admin.register(ArticleExport)
+class ArticleExportAdmin(admin.ModelAdmin):
+    """Админка для фоновых выгрузок статей."""
+    
+    list_display = ['id', 'user', 'format', 'status_badge', 'rows', 'size_bytes', 'created_at', 'finished_at']
+    list_filter = ['status', 'format', 'created_at']
+    search_fields = ['user__email', 'error']
+    list_select_related = ['user']
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def status_badge(self, obj):
+        """Цветной бейдж статуса выгрузки."""
+        colors = {
+            'pending': '#6c757d',
+            'running': '#17a2b8',
+            'done': '#28a745',
+            'error': '#dc3545',
+        }
+        return format_html(
+            '<span style="color: {};">{}</span>',
+            colors.get(obj.status, '#6c757d'), obj.get_status_display()
+        )
+    status_badge.short_description = 'Статус'
+    status_badge.admin_order_field = 'status'
@@ -0,0 +1,251 @@
+"""
+Кэш результатов анализа текста по хэшу содержимого.
+
+Ключ - sha256(title + summary + content) вместе с именем и версией
+анализатора, поэтому повторный анализ (--force, действие в админке,
+тот же текст под другим URL) не запускает NLP-конвейер заново, а смена
+версии анализатора автоматически делает старые записи недействительными.
+
+Два уровня:
+- LRU в памяти процесса, не больше ANALYSIS_CACHE_SIZE записей
+- SQLite-файл ANALYSIS_CACHE_PATH, общий для процессов и переживающий
+  перезапуск; старые записи вытесняются по времени последнего использования
+  при превышении ANALYSIS_CACHE_DISK_MAX_ENTRIES
+
+Чтение с диска не пишет в SQLite: время использования попаданий копится
+в памяти и записывается одним UPDATE каждые TOUCH_EVERY попаданий или
+перед вытеснением, поэтому читатели не захватывают блокировку записи.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+# Как часто (в записях) проверять размер дискового кэша
+PRUNE_EVERY = 500
+
+# Сколько попаданий в дисковый кэш копить перед записью used_at
+TOUCH_EVERY = 200
+
+
+def _setting(name: str, default):
+    """Настройка Django или значение по умолчанию (в т.ч. вне Django)."""
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def content_hash(title: str, summary: str = "", content: str = "") -> str:
+    """Хэш анализируемого текста статьи."""
+    raw = '\x1f'.join(part or '' for part in (title, summary, content))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """Двухуровневый кэш результатов анализа (LRU в памяти + SQLite)."""
+
+    def __init__(self, max_entries: int = 5000, path: Optional[str] = None,
+                 disk_max_entries: int = 200000):
+        self.max_entries = max_entries
+        self.path = path
+        self.disk_max_entries = disk_max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+        self._touched = {}
+        self._disk_hits = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, namespace: str, digest: str) -> Optional[Dict[str, Any]]:
+        """Результат анализа или None."""
+        key = f'{namespace}:{digest}'
+        with self._lock:
+            raw = self._memory.get(key)
+            if raw is not None:
+                self._memory.move_to_end(key)
+            else:
+                raw = self._disk_get(key)
+                if raw is not None:
+                    self._remember(key, raw)
+
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        # Каждый вызов получает свою копию - вызывающий код может менять результат
+        return json.loads(raw)
+
+    def set(self, namespace: str, digest: str, result: Dict[str, Any]) -> None:
+        """Сохраняет результат анализа."""
+        key = f'{namespace}:{digest}'
+        raw = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, raw)
+            self._disk_set(key, raw)
+
+    def clear(self) -> None:
+        """Очищает оба уровня кэша."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            conn = self._connection()
+            if conn is not None:
+                conn.execute("DELETE FROM analysis_cache")
+                conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else None,
+            'memory_entries': len(self._memory),
+        }
+
+    def _remember(self, key: str, raw: str) -> None:
+        self._memory[key] = raw
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _connection(self):
+        """Соединение с SQLite (создается лениво; None - диск отключен)."""
+        if not self.path:
+            return None
+        if self._conn is None:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                    "key TEXT PRIMARY KEY, result TEXT NOT NULL, used_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS analysis_cache_used_at ON analysis_cache (used_at)")
+                conn.commit()
+                self._conn = conn
+            except sqlite3.Error as e:
+                logger.warning(f"Дисковый кэш анализа недоступен ({self.path}): {e}")
+                self.path = None
+                return None
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        conn = self._connection()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute("SELECT result FROM analysis_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = time.time()
+            self._disk_hits += 1
+            if self._disk_hits % TOUCH_EVERY == 0:
+                self._flush_touches(conn)
+                conn.commit()
+            return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Ошибка чтения дискового кэша анализа: {e}")
+            return None
+
+    def _flush_touches(self, conn) -> None:
+        """Записывает накопленное время использования попаданий (без commit)."""
+        if not self._touched:
+            return
+        touched, self._touched = self._touched, {}
+        conn.executemany(
+            "UPDATE analysis_cache SET used_at = ? WHERE key = ?",
+            [(used_at, key) for key, used_at in touched.items()]
+        )
+
+    def _disk_set(self, key: str, raw: str) -> None:
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, result, used_at) VALUES (?, ?, ?)",
+                (key, raw, time.time())
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._flush_touches(conn)
+                conn.execute(
+                    "DELETE FROM analysis_cache WHERE key IN ("
+                    "SELECT key FROM analysis_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,)
+                )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Ошибка записи дискового кэша анализа: {e}")
+
+
+_cache = None
+_cache_pid = None
+
+
+def get_cache() -> Optional[AnalysisCache]:
+    """Кэш текущего процесса (None, если кэш выключен)."""
+    global _cache, _cache_pid
+
+    if not _setting('ANALYSIS_CACHE_ENABLED', True):
+        return None
+    # После fork (пул анализа, воркеры Celery) соединение SQLite нельзя переиспользовать
+    if _cache is None or _cache_pid != os.getpid():
+        path = _setting('ANALYSIS_CACHE_PATH', None)
+        _cache = AnalysisCache(
+            max_entries=_setting('ANALYSIS_CACHE_SIZE', 5000),
+            path=str(path) if path else None,
+            disk_max_entries=_setting('ANALYSIS_CACHE_DISK_MAX_ENTRIES', 200000),
+        )
+        _cache_pid = os.getpid()
+    return _cache
+
+
+def lookup(namespace: str, title: str, summary: str, content: str) -> Optional[Dict[str, Any]]:
+    """Результат из кэша без вычисления (None - нет в кэше или кэш выключен)."""
+    cache = get_cache()
+    if cache is None:
+        return None
+    return cache.get(namespace, content_hash(title, summary, content))
+
+
+def cached_analysis(namespace: str, title: str, summary: str, content: str,
+                    compute: Callable[[], Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Возвращает результат из кэша или вычисляет его через compute().
+
+    Если compute() вернул None, результат считается некэшируемым
+    (например, fallback-анализ) - тогда вызывающий код решает сам.
+    """
+    cache = get_cache()
+    if cache is None:
+        return compute()
+
+    digest = content_hash(title, summary, content)
+    result = cache.get(namespace, digest)
+    if result is not None:
+        metrics.DEDUP_HITS.labels(kind='analysis_cache').inc()
+        return result
+
+    result = compute()
+    if result is not None:
+        cache.set(namespace, digest, result)
+    return result
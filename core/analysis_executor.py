@@ -0,0 +1,228 @@
+"""
+Параллельный анализ статей в пуле процессов.
+
+Анализ - CPU-bound (регулярные выражения legacy-анализатора, конвейер
+spaCy), поэтому в потоках он упирается в GIL. Исполнитель распределяет
+статьи по процессам:
+- анализатор (legacy или spaCy, см. analyzer_spec) создается один раз
+  в каждом дочернем процессе (initializer) - модель spaCy загружается
+  при старте процесса, а не на каждую статью
+- статьи передаются пачками по ANALYSIS_CHUNK_SIZE в виде кортежей
+  (id, title, summary, content) - без экземпляров моделей и ORM
+- результаты возвращаются как (id, result, error); result содержит
+  analyzer_version - версию анализатора, который действительно отработал
+
+Если пул создать нельзя (например, внутри демонического процесса - так
+работает prefork-пул Celery) или workers=1, анализ выполняется в текущем
+процессе тем же кодом.
+
+Задачи Celery используют один пул на процесс воркера
+(get_shared_executor), management-команды - свой пул на время запуска.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from core.text_analyzer import TextAnalyzer
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_FIELDS = ('id', 'title', 'summary', 'content')
+# updated_at - bulk_update не заполняет auto_now, а от него зависят ETag статей
+ANALYSIS_FIELDS = ['topic', 'tags', 'locations', 'is_analyzed', 'analyzer_version', 'analyzed_at', 'updated_at']
+
+DEFAULT_CHUNK_SIZE = 25
+
+LEGACY_SPEC = ('legacy', None)
+
+_analyzer = None
+_analyzer_spec = None
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def analyzer_spec() -> Tuple[str, Optional[str]]:
+    """Анализатор по настройкам: ('spacy', модель) или ('legacy', None)."""
+    from django.conf import settings
+
+    if getattr(settings, 'USE_SPACY_ANALYZER', False):
+        try:
+            from core.spacy_analyzer import SpacyTextAnalyzer
+        except ImportError as e:
+            logger.warning(f"spaCy недоступен, анализ legacy-анализатором: {e}")
+            return LEGACY_SPEC
+        return 'spacy', getattr(settings, 'SPACY_MODEL_NAME', SpacyTextAnalyzer.DEFAULT_MODEL)
+    return LEGACY_SPEC
+
+
+def _create_analyzer(spec):
+    """Создает анализатор; если модель spaCy не загружается - legacy."""
+    kind, model_name = spec
+    if kind == 'spacy':
+        try:
+            from core.spacy_analyzer import SpacyTextAnalyzer
+            return SpacyTextAnalyzer(model_name)
+        except Exception as e:
+            logger.error(f"Не удалось создать spaCy анализатор, используется legacy: {e}")
+    return TextAnalyzer()
+
+
+def _init_worker(spec=LEGACY_SPEC) -> None:
+    """Создает анализатор один раз на дочерний процесс."""
+    global _analyzer, _analyzer_spec
+    _analyzer = _create_analyzer(spec)
+    _analyzer_spec = spec
+
+
+def _analyze_one(payload, spec=LEGACY_SPEC) -> Tuple[int, Optional[dict], Optional[str]]:
+    if _analyzer is None or _analyzer_spec != spec:
+        _init_worker(spec)
+
+    article_id, title, summary, content = payload
+    try:
+        result = dict(_analyzer.analyze_text(title=title, content=content, summary=summary))
+    except Exception as e:
+        return article_id, None, str(e)
+    result.setdefault('analyzer_version', _analyzer.cache_namespace)
+    return article_id, result, None
+
+
+def _analyze_chunk(chunk, spec=LEGACY_SPEC) -> List[Tuple[int, Optional[dict], Optional[str]]]:
+    return [_analyze_one(payload, spec) for payload in chunk]
+
+
+def _chunked(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class AnalysisExecutor:
+    """Пул процессов для анализа статей (используется как контекстный менеджер)."""
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: Optional[int] = None, spec=None):
+        from django.conf import settings
+
+        self.workers = max(1, workers or getattr(settings, 'ANALYSIS_WORKERS', None) or os.cpu_count() or 1)
+        self.chunk_size = chunk_size or getattr(settings, 'ANALYSIS_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        self.spec = spec or analyzer_spec()
+        self.pid = os.getpid()
+        self._pool = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self) -> 'AnalysisExecutor':
+        if self.workers > 1:
+            try:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker, initargs=(self.spec,)
+                )
+            except (AssertionError, OSError) as e:
+                logger.warning(f"Пул процессов недоступен, анализ в текущем процессе: {e}")
+                self._pool = None
+        return self
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @property
+    def parallel(self) -> bool:
+        return self._pool is not None
+
+    def map(self, payloads: Iterable[tuple]) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+        """Анализирует payload-кортежи; порядок результатов совпадает со входом."""
+        chunks = list(_chunked(payloads, self.chunk_size))
+        done = 0
+        if self._pool is not None:
+            try:
+                for results in self._pool.map(_analyze_chunk, chunks, [self.spec] * len(chunks)):
+                    done += 1
+                    yield from results
+                return
+            except Exception as e:
+                # Например, запрет на дочерние процессы обнаруживается только при запуске
+                logger.warning(f"Ошибка пула процессов, продолжаем в текущем процессе: {e}")
+                self.close()
+
+        for chunk in chunks[done:]:
+            yield from _analyze_chunk(chunk, self.spec)
+
+
+def get_shared_executor() -> AnalysisExecutor:
+    """
+    Пул, общий для всех задач анализа в текущем процессе.
+
+    Создается при первом вызове и живет до завершения процесса; после
+    fork или смены анализатора в настройках создается заново.
+    """
+    global _shared
+    with _shared_lock:
+        spec = analyzer_spec()
+        if _shared is None or _shared.pid != os.getpid() or _shared.spec != spec:
+            if _shared is not None and _shared.pid == os.getpid():
+                _shared.close()
+            _shared = AnalysisExecutor(spec=spec).start()
+        return _shared
+
+
+@atexit.register
+def close_shared_executor() -> None:
+    """Останавливает общий пул (при завершении процесса)."""
+    global _shared
+    with _shared_lock:
+        if _shared is not None and _shared.pid == os.getpid():
+            _shared.close()
+        _shared = None
+
+
+def payloads_for(queryset) -> List[tuple]:
+    """Минимальные данные статей для передачи в дочерние процессы."""
+    return list(queryset.values_list(*PAYLOAD_FIELDS))
+
+
+def save_results(results: Iterable[Tuple[int, Optional[dict], Optional[str]]]) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Сохраняет результаты анализа одним bulk_update.
+
+    Возвращает (количество сохраненных, [(id, ошибка), ...]).
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from core.models import Article
+
+    analyzed_at = timezone.now()
+    updates = []
+    failures = []
+    for article_id, result, error in results:
+        if error:
+            failures.append((article_id, error))
+            continue
+        updates.append(Article(
+            id=article_id,
+            topic=result['topic'],
+            tags=result['tags'],
+            locations=result['locations'],
+            is_analyzed=True,
+            analyzer_version=result.get('analyzer_version') or TextAnalyzer.namespace(),
+            analyzed_at=analyzed_at,
+            updated_at=analyzed_at,
+        ))
+
+    with transaction.atomic():
+        Article.objects.bulk_update(updates, ANALYSIS_FIELDS)
+    return len(updates), failures
@@ -0,0 +1,184 @@
+"""
+Телеметрия парсинга источников.
+
+Каждый парсинг источника (scraper.tasks._crawl_source) записывает строку
+CrawlRun: время загрузки и разбора, размер страницы, HTTP статус, число
+найденных контейнеров, извлеченных и новых статей. По этим строкам
+строятся метрики источников за период - p50/p95 времени загрузки
+и разбора, доля ошибок, выход извлечения (статьи / контейнеры) и доля
+новых статей, - чтобы быстро находить медленные и сломанные источники.
+
+Выход извлечения считается только по запускам, которые сами разбирали
+страницу (YIELD_OUTCOMES): у объединенных и взятых из кэша загрузок
+контейнеры не считаются, а статьи есть.
+
+Старые записи удаляются задачей prune_crawl_runs (CRAWL_RUN_RETENTION_DAYS).
+"""
+
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import Aggregate, Avg, Count, FloatField, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import CrawlRun
+
+logger = logging.getLogger(__name__)
+
+# Поля CrawlRun, которые заполняются из словаря stats парсера
+STATS_FIELDS = (
+    'http_status', 'bytes_fetched', 'fetch_ms', 'parse_ms', 'containers_found', 'fetch_outcome',
+)
+
+# Запуски, в которых парсер сам разбирал страницу и считал контейнеры
+YIELD_OUTCOMES = ('fetched', 'direct')
+
+
+class Percentile(Aggregate):
+    """Перцентиль PostgreSQL (percentile_cont); NULL значения не учитываются."""
+
+    function = 'PERCENTILE_CONT'
+    name = 'percentile'
+    output_field = FloatField()
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=percentile, **extra)
+
+
+def record_run(
+    source,
+    *,
+    tier: str,
+    started_at,
+    status: str,
+    stats: Optional[Dict[str, Any]] = None,
+    articles_found: int = 0,
+    new_articles: int = 0,
+    error: str = '',
+) -> Optional[CrawlRun]:
+    """Сохраняет телеметрию парсинга. Ошибка записи не прерывает парсинг."""
+    stats = stats or {}
+    try:
+        return CrawlRun.objects.create(
+            source=source,
+            tier=tier,
+            status=status,
+            started_at=started_at,
+            duration_ms=int((timezone.now() - started_at).total_seconds() * 1000),
+            articles_found=articles_found,
+            new_articles=new_articles,
+            error=error[:2000],
+            **{field: stats[field] for field in STATS_FIELDS if stats.get(field) is not None},
+        )
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить телеметрию парсинга {source.name}: {e}")
+        return None
+
+
+def source_metrics(days: int = 7, source_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Метрики источников за последние days дней.
+
+    Источники отсортированы от самого медленного по p95 загрузки.
+    """
+    runs = CrawlRun.objects.filter(started_at__gte=timezone.now() - timedelta(days=days))
+    if source_id is not None:
+        runs = runs.filter(source_id=source_id)
+
+    rows = runs.values('source_id', 'source__name', 'source__url').annotate(
+        runs=Count('id'),
+        errors=Count('id', filter=Q(status='error')),
+        empty=Count('id', filter=Q(status='no_articles')),
+        fetch_p50=Percentile('fetch_ms', 0.5),
+        fetch_p95=Percentile('fetch_ms', 0.95),
+        parse_p50=Percentile('parse_ms', 0.5),
+        parse_p95=Percentile('parse_ms', 0.95),
+        avg_bytes=Avg('bytes_fetched'),
+        containers=Sum('containers_found'),
+        articles=Sum('articles_found'),
+        new=Sum('new_articles'),
+        **_yield_aggregates(),
+        last_run=Max('started_at'),
+    )
+
+    metrics = [_with_ratios({
+        'source_id': row['source_id'],
+        'source_name': row['source__name'],
+        'source_url': row['source__url'],
+        'runs': row['runs'],
+        'errors': row['errors'],
+        'empty_runs': row['empty'],
+        'fetch_ms': {'p50': _round(row['fetch_p50']), 'p95': _round(row['fetch_p95'])},
+        'parse_ms': {'p50': _round(row['parse_p50']), 'p95': _round(row['parse_p95'])},
+        'avg_bytes': _round(row['avg_bytes']),
+        'containers_found': row['containers'] or 0,
+        'articles_found': row['articles'] or 0,
+        'new_articles': row['new'] or 0,
+        'last_run': row['last_run'],
+    }, row) for row in rows]
+
+    metrics.sort(key=lambda item: item['fetch_ms']['p95'] or 0, reverse=True)
+    return metrics
+
+
+def yield_trend(source_id: int, days: int = 30) -> List[Dict[str, Any]]:
+    """Выход извлечения и доля новых статей источника по дням."""
+    rows = CrawlRun.objects.filter(
+        source_id=source_id,
+        started_at__gte=timezone.now() - timedelta(days=days)
+    ).annotate(day=TruncDate('started_at')).values('day').annotate(
+        runs=Count('id'),
+        errors=Count('id', filter=Q(status='error')),
+        fetch_p95=Percentile('fetch_ms', 0.95),
+        containers=Sum('containers_found'),
+        articles=Sum('articles_found'),
+        new=Sum('new_articles'),
+        **_yield_aggregates(),
+    ).order_by('day')
+
+    return [_with_ratios({
+        'date': row['day'],
+        'runs': row['runs'],
+        'errors': row['errors'],
+        'fetch_p95_ms': _round(row['fetch_p95']),
+        'containers_found': row['containers'] or 0,
+        'articles_found': row['articles'] or 0,
+        'new_articles': row['new'] or 0,
+    }, row) for row in rows]
+
+
+def prune(days: Optional[int] = None) -> int:
+    """Удаляет записи старше CRAWL_RUN_RETENTION_DAYS дней."""
+    days = days or getattr(settings, 'CRAWL_RUN_RETENTION_DAYS', 90)
+    deleted, _ = CrawlRun.objects.filter(started_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
+
+
+def _yield_aggregates() -> Dict[str, Sum]:
+    """Контейнеры и статьи запусков, по которым считается выход извлечения."""
+    parsed = Q(fetch_outcome__in=YIELD_OUTCOMES)
+    return {
+        'yield_containers': Sum('containers_found', filter=parsed),
+        'yield_articles': Sum('articles_found', filter=parsed),
+    }
+
+
+def _with_ratios(item: Dict[str, Any], row: Dict[str, Any]) -> Dict[str, Any]:
+    """Добавляет долю ошибок, выход извлечения и долю новых статей."""
+    runs = item['runs']
+    item['error_rate'] = round(item['errors'] / runs, 3) if runs else None
+    item['extraction_yield'] = (
+        round((row['yield_articles'] or 0) / row['yield_containers'], 3) if row['yield_containers'] else None
+    )
+    item['new_ratio'] = (
+        round(item['new_articles'] / item['articles_found'], 3) if item['articles_found'] else None
+    )
+    return item
+
+
+def _round(value) -> Optional[int]:
+    return int(round(value)) if value is not None else None
@@ -0,0 +1,288 @@
+"""
+Быстрое key-value хранилище для счетчиков, буферов и рейтингов.
+
+Используется подсистемами, которым нужна атомарная запись без обращения
+к PostgreSQL (write-behind счетчики просмотров, рейтинг трендов, квоты).
+
+Поддерживаемые бэкенды (настройка FAST_STORE_URL):
+- memory:// — потокобезопасное хранилище внутри процесса (dev, тесты)
+- redis://host:port/db — общий Redis для всех воркеров (production)
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryStore:
+    """
+    Хранилище в памяти процесса.
+
+    Повторяет подмножество команд Redis, поэтому может использоваться
+    как его замена в dev-окружении и тестах. Данные не разделяются
+    между процессами.
+    """
+
+    is_shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, Dict[str, int]] = {}
+        self._zsets: Dict[str, Dict[str, float]] = {}
+        self._values: Dict[str, Tuple[str, Optional[float]]] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        """Возвращает строковое значение или None (с учетом TTL)."""
+        with self._lock:
+            return self._get_locked(key)
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        """Сохраняет строковое значение с необязательным TTL (сек)."""
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._values[key] = (value, expires_at)
+
+    def set_if_absent(self, key: str, value: str, ttl: Optional[int] = None) -> bool:
+        """Сохраняет значение, только если ключа нет (SET NX)."""
+        with self._lock:
+            if self._get_locked(key) is not None:
+                return False
+            self._values[key] = (value, time.monotonic() + ttl if ttl else None)
+            return True
+
+    def delete(self, key: str) -> None:
+        """Удаляет строковое значение."""
+        with self._lock:
+            self._values.pop(key, None)
+
+    def mget(self, keys: Iterable[str]) -> List[Optional[str]]:
+        """Возвращает значения нескольких ключей."""
+        with self._lock:
+            return [self._get_locked(key) for key in keys]
+
+    def incr_with_limit(self, key: str, amount: int, limit: Optional[int],
+                        ttl: Optional[int] = None) -> Tuple[bool, int]:
+        """
+        Атомарно увеличивает счетчик, если не будет превышен limit.
+
+        Возвращает (разрешено, значение после операции). limit=None - без лимита.
+        TTL выставляется при создании ключа.
+        """
+        with self._lock:
+            raw = self._get_locked(key)
+            current = int(raw) if raw is not None else 0
+            if limit is not None and current + amount > limit:
+                return False, current
+            expires_at = self._values[key][1] if raw is not None else (
+                time.monotonic() + ttl if ttl else None
+            )
+            self._values[key] = (str(current + amount), expires_at)
+            return True, current + amount
+
+    def _get_locked(self, key: str) -> Optional[str]:
+        """get() для вызова под уже захваченной блокировкой."""
+        item = self._values.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        """Увеличивает поле хеша и возвращает новое значение."""
+        with self._lock:
+            bucket = self._hashes.setdefault(key, {})
+            bucket[field] = bucket.get(field, 0) + amount
+            return bucket[field]
+
+    def hmget(self, key: str, fields: Iterable[str]) -> Dict[str, int]:
+        """Возвращает значения указанных полей хеша (отсутствующие пропускаются)."""
+        with self._lock:
+            bucket = self._hashes.get(key, {})
+            return {field: bucket[field] for field in fields if field in bucket}
+
+    def hgetall(self, key: str) -> Dict[str, int]:
+        """Возвращает копию всего хеша."""
+        with self._lock:
+            return dict(self._hashes.get(key, {}))
+
+    def hpop_all(self, key: str) -> Dict[str, int]:
+        """Атомарно забирает весь хеш и удаляет его."""
+        with self._lock:
+            return self._hashes.pop(key, {})
+
+    def zlogaddexp(self, key: str, member: str, value: float) -> float:
+        """
+        Атомарно обновляет счет элемента как log(exp(old) + exp(value)).
+
+        Используется для forward-decay рейтингов: счет хранится в
+        логарифмической шкале и не переполняется со временем.
+        """
+        with self._lock:
+            zset = self._zsets.setdefault(key, {})
+            old = zset.get(member)
+            zset[member] = value if old is None else _logaddexp(old, value)
+            return zset[member]
+
+    def zrevrange(self, key: str, start: int, stop: int) -> List[Tuple[str, float]]:
+        """Возвращает элементы с наибольшим счетом (stop включительно, как в Redis)."""
+        with self._lock:
+            items = sorted(self._zsets.get(key, {}).items(), key=lambda item: item[1], reverse=True)
+        return items[start:stop + 1]
+
+    def zremrangebyscore(self, key: str, min_score: float, max_score: float) -> int:
+        """Удаляет элементы со счетом в диапазоне [min_score, max_score]."""
+        with self._lock:
+            zset = self._zsets.get(key, {})
+            doomed = [member for member, score in zset.items() if min_score <= score <= max_score]
+            for member in doomed:
+                del zset[member]
+            return len(doomed)
+
+
+class RedisStore:
+    """Хранилище на основе Redis, общее для всех процессов."""
+
+    is_shared = True
+
+    # log(exp(old) + exp(value)) без переполнения, атомарно на стороне Redis
+    ZLOGADDEXP_SCRIPT = """
+        local value = tonumber(ARGV[2])
+        local old = redis.call('ZSCORE', KEYS[1], ARGV[1])
+        local new = value
+        if old then
+            old = tonumber(old)
+            local m = math.max(old, value)
+            new = m + math.log(math.exp(old - m) + math.exp(value - m))
+        end
+        redis.call('ZADD', KEYS[1], new, ARGV[1])
+        return tostring(new)
+    """
+
+    # Проверка лимита и увеличение счетчика одной атомарной операцией
+    INCR_WITH_LIMIT_SCRIPT = """
+        local amount = tonumber(ARGV[1])
+        local limit = tonumber(ARGV[2])
+        local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+        if limit >= 0 and current + amount > limit then
+            return {0, current}
+        end
+        local new = redis.call('INCRBY', KEYS[1], amount)
+        if tonumber(ARGV[3]) > 0 and redis.call('TTL', KEYS[1]) < 0 then
+            redis.call('EXPIRE', KEYS[1], ARGV[3])
+        end
+        return {1, new}
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self._zlogaddexp = self.client.register_script(self.ZLOGADDEXP_SCRIPT)
+        self._incr_with_limit = self.client.register_script(self.INCR_WITH_LIMIT_SCRIPT)
+
+    def get(self, key: str) -> Optional[str]:
+        """Возвращает строковое значение или None."""
+        return self.client.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        """Сохраняет строковое значение с необязательным TTL (сек)."""
+        self.client.set(key, value, ex=ttl)
+
+    def set_if_absent(self, key: str, value: str, ttl: Optional[int] = None) -> bool:
+        """Сохраняет значение, только если ключа нет (SET NX)."""
+        return bool(self.client.set(key, value, ex=ttl, nx=True))
+
+    def delete(self, key: str) -> None:
+        """Удаляет строковое значение."""
+        self.client.delete(key)
+
+    def mget(self, keys: Iterable[str]) -> List[Optional[str]]:
+        """Возвращает значения нескольких ключей."""
+        keys = list(keys)
+        return self.client.mget(keys) if keys else []
+
+    def incr_with_limit(self, key: str, amount: int, limit: Optional[int],
+                        ttl: Optional[int] = None) -> Tuple[bool, int]:
+        """Атомарно увеличивает счетчик, если не будет превышен limit."""
+        allowed, value = self._incr_with_limit(
+            keys=[key], args=[amount, -1 if limit is None else limit, ttl or 0]
+        )
+        return bool(allowed), int(value)
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        """Увеличивает поле хеша и возвращает новое значение."""
+        return self.client.hincrby(key, field, amount)
+
+    def hmget(self, key: str, fields: Iterable[str]) -> Dict[str, int]:
+        """Возвращает значения указанных полей хеша (отсутствующие пропускаются)."""
+        fields = list(fields)
+        if not fields:
+            return {}
+        values = self.client.hmget(key, fields)
+        return {field: int(value) for field, value in zip(fields, values) if value is not None}
+
+    def hgetall(self, key: str) -> Dict[str, int]:
+        """Возвращает весь хеш."""
+        return {field: int(value) for field, value in self.client.hgetall(key).items()}
+
+    def hpop_all(self, key: str) -> Dict[str, int]:
+        """Атомарно забирает весь хеш и удаляет его (MULTI/EXEC)."""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hgetall(key)
+        pipe.delete(key)
+        data, _ = pipe.execute()
+        return {field: int(value) for field, value in data.items()}
+
+    def zlogaddexp(self, key: str, member: str, value: float) -> float:
+        """Атомарно обновляет счет элемента как log(exp(old) + exp(value))."""
+        return float(self._zlogaddexp(keys=[key], args=[member, value]))
+
+    def zrevrange(self, key: str, start: int, stop: int) -> List[Tuple[str, float]]:
+        """Возвращает элементы с наибольшим счетом (stop включительно)."""
+        return self.client.zrevrange(key, start, stop, withscores=True)
+
+    def zremrangebyscore(self, key: str, min_score: float, max_score: float) -> int:
+        """Удаляет элементы со счетом в диапазоне [min_score, max_score]."""
+        return self.client.zremrangebyscore(key, min_score, max_score)
+
+
+def _logaddexp(a: float, b: float) -> float:
+    """Численно устойчивый log(exp(a) + exp(b))."""
+    m = max(a, b)
+    return m + math.log(math.exp(a - m) + math.exp(b - m))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Возвращает хранилище, сконфигурированное через FAST_STORE_URL."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                url = getattr(settings, 'FAST_STORE_URL', 'memory://')
+                if url.startswith('redis://') or url.startswith('rediss://'):
+                    _store = RedisStore(url)
+                    logger.info(f"Быстрое хранилище: Redis ({url})")
+                else:
+                    _store = MemoryStore()
+                    logger.info("Быстрое хранилище: память процесса")
+    return _store
+
+
+def reset_store(store: Optional[object] = None):
+    """Подменяет хранилище (например, MemoryStore в тестах)."""
+    global _store
+    with _store_lock:
+        _store = store
@@ -1,12 +1,24 @@
 """
 Django management команда для анализа текста статей.
+
+Статьи выбираются пачками по возрастанию id (keyset-пагинация без OFFSET),
+анализируются параллельно в пуле процессов (core/analysis_executor.py)
+и сохраняются одним bulk_update на пачку. После каждой пачки прогресс
+записывается в файл контрольной точки, поэтому прерванный запуск
+продолжается с места остановки. Итоговая статистика считается
+агрегатными запросами.
 """
 
+import json
+import logging
+import os
+
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db.models import Count, Q
+
+from core.analysis_executor import AnalysisExecutor, payloads_for, save_results
 from core.models import Article
-from core.text_analyzer import analyze_article_content
-import logging
 
 logger = logging.getLogger(__name__)
 
@@ -24,12 +36,13 @@ class Command(BaseCommand):
         parser.add_argument(
             '--only-unanalyzed',
             action='store_true',
-            help='Анализировать только непроанализированные статьи',
+            help='Оставлен для совместимости и ни на что не влияет: без --force '
+                 'непроанализированные статьи выбираются и так',
         )
         parser.add_argument(
             '--force',
             action='store_true',
-            help='Принудительно перезаписать результаты анализа',
+            help='Анализировать и уже проанализированные статьи (по умолчанию они пропускаются)',
         )
         parser.add_argument(
             '--source-id',
@@ -41,6 +54,22 @@ class Command(BaseCommand):
             type=int,
             help='Анализировать только конкретную статью',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Количество процессов анализа (по умолчанию: ANALYSIS_WORKERS или число ядер)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=getattr(settings, 'ANALYSIS_CHECKPOINT_PATH',
+                            os.path.join(settings.BASE_DIR, '.analyze_articles.checkpoint.json')),
+            help='Файл контрольной точки для продолжения прерванного запуска',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Игнорировать контрольную точку и начать сначала',
+        )
         parser.add_argument(
             '--dry-run',
             action='store_true',
@@ -49,32 +78,43 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         batch_size = options['batch_size']
-        only_unanalyzed = options['only_unanalyzed']
         force = options['force']
         source_id = options['source_id']
         article_id = options['article_id']
+        workers = options['workers']
+        checkpoint_path = options['checkpoint']
         dry_run = options['dry_run']
 
+        if batch_size <= 0:
+            raise CommandError('--batch-size должен быть больше 0')
+
         # Строим запрос для получения статей
         queryset = Article.objects.filter(is_active=True)
 
         if article_id:
             # Анализируем конкретную статью
             queryset = queryset.filter(id=article_id)
-        else:
-            # Фильтры для множественного анализа
-            if source_id:
-                queryset = queryset.filter(source_id=source_id)
-            
-            if only_unanalyzed and not force:
-                queryset = queryset.filter(is_analyzed=False)
+        elif source_id:
+            queryset = queryset.filter(source_id=source_id)
 
-        total_articles = queryset.count()
+        # Без --force проанализированные статьи пропускаются
+        if not force:
+            queryset = queryset.filter(is_analyzed=False)
+
+        run_key = {'source_id': source_id, 'article_id': article_id, 'force': force}
+        checkpoint = None if options['restart'] else self.load_checkpoint(checkpoint_path, run_key)
+        last_id = checkpoint['last_id'] if checkpoint else 0
+        processed = checkpoint['processed'] if checkpoint else 0
+        successful = checkpoint['successful'] if checkpoint else 0
+        errors = checkpoint['errors'] if checkpoint else 0
+
+        total_articles = queryset.filter(id__gt=last_id).count()
 
         if total_articles == 0:
             self.stdout.write(
                 self.style.WARNING('Нет статей для анализа с указанными критериями')
             )
+            self.remove_checkpoint(checkpoint_path)
             return
 
         if dry_run:
@@ -83,76 +123,72 @@ class Command(BaseCommand):
             )
             return
 
+        if checkpoint:
+            self.stdout.write(f'Продолжаем с контрольной точки: id > {last_id}')
         self.stdout.write(
             self.style.SUCCESS(f'Начинаем анализ {total_articles} статей...')
         )
 
-        processed = 0
-        successful = 0
-        errors = 0
+        with AnalysisExecutor(workers=workers) as executor:
+            batch_number = 0
+            while True:
+                batch = payloads_for(
+                    queryset.filter(id__gt=last_id).order_by('id')[:batch_size]
+                )
+                if not batch:
+                    break
+                batch_number += 1
 
-        # Обрабатываем статьи батчами
-        for offset in range(0, total_articles, batch_size):
-            batch = queryset[offset:offset + batch_size]
-            
-            self.stdout.write(
-                f'Обрабатываем батч {offset // batch_size + 1}: '
-                f'статьи {offset + 1}-{min(offset + batch_size, total_articles)}'
-            )
+                self.stdout.write(
+                    f'Обрабатываем батч {batch_number}: статьи {batch[0][0]}-{batch[-1][0]}'
+                )
 
-            for article in batch:
-                try:
-                    # Проверяем, нужно ли анализировать
-                    if article.is_analyzed and not force:
-                        self.stdout.write(
-                            f'  - Пропускаем статью {article.id} (уже проанализирована)'
-                        )
-                        processed += 1
-                        continue
-
-                    # Выполняем анализ
-                    result = analyze_article_content(article)
-
-                    # Сохраняем результаты в транзакции
-                    with transaction.atomic():
-                        article.topic = result['topic']
-                        article.tags = result['tags']
-                        article.locations = result['locations']
-                        article.is_analyzed = True
-                        article.save(update_fields=['topic', 'tags', 'locations', 'is_analyzed'])
-
-                    successful += 1
-                    processed += 1
-
-                    # Выводим прогресс
-                    if successful % 10 == 0:
-                        self.stdout.write(
-                            f'  ✓ Обработано {successful} статей...'
-                        )
-
-                    # Выводим детали анализа
-                    if options['verbosity'] >= 2:
-                        self.stdout.write(
-                            f'  ✓ Статья {article.id}: '
-                            f'тема={result["topic"]}, '
-                            f'тегов={len(result["tags"])}, '
-                            f'локаций={len(result["locations"])}'
-                        )
-
-                except Exception as e:
-                    errors += 1
-                    processed += 1
-                    logger.error(f"Ошибка анализа статьи {article.id}: {str(e)}")
+                results = list(executor.map(batch))
+
+                # Сохраняем результаты пачки одним UPDATE
+                saved, failures = save_results(results)
+
+                for result_id, error in failures:
+                    logger.error(f"Ошибка анализа статьи {result_id}: {error}")
                     self.stdout.write(
-                        self.style.ERROR(
-                            f'  ✗ Ошибка при анализе статьи {article.id}: {str(e)}'
-                        )
+                        self.style.ERROR(f'  ✗ Ошибка при анализе статьи {result_id}: {error}')
                     )
 
+                # Выводим детали анализа
+                if options['verbosity'] >= 2:
+                    for result_id, result, error in results:
+                        if result:
+                            self.stdout.write(
+                                f'  ✓ Статья {result_id}: '
+                                f'тема={result["topic"]}, '
+                                f'тегов={len(result["tags"])}, '
+                                f'локаций={len(result["locations"])}'
+                            )
+
+                successful += saved
+                errors += len(failures)
+                processed += len(batch)
+                last_id = batch[-1][0]
+                self.save_checkpoint(checkpoint_path, {
+                    **run_key,
+                    'last_id': last_id,
+                    'processed': processed,
+                    'successful': successful,
+                    'errors': errors,
+                })
+                self.stdout.write(f'  ✓ Обработано {processed} статей...')
+
+        self.remove_checkpoint(checkpoint_path)
+
+        if successful:
+            # bulk_update не вызывает сигналы - сбрасываем кэш ответов API вручную
+            from api.cache import bump_generation
+            bump_generation()
+
         # Итоговая статистика
         self.stdout.write('\n' + '='*50)
         self.stdout.write(
-            self.style.SUCCESS(f'Анализ завершен!')
+            self.style.SUCCESS('Анализ завершен!')
         )
         self.stdout.write(f'Всего обработано: {processed}')
         self.stdout.write(
@@ -165,25 +201,61 @@ class Command(BaseCommand):
 
         # Статистика по результатам анализа
         if successful > 0:
-            self.stdout.write('\nСтатистика анализа:')
-            
-            # Подсчет по темам
-            analyzed_articles = Article.objects.filter(is_analyzed=True, is_active=True)
-            topics_stats = {}
-            for article in analyzed_articles:
-                topic_display = article.get_topic_display()
-                topics_stats[topic_display] = topics_stats.get(topic_display, 0) + 1
-            
-            self.stdout.write('Распределение по темам:')
-            for topic, count in sorted(topics_stats.items(), key=lambda x: x[1], reverse=True):
-                self.stdout.write(f'  - {topic}: {count}')
-
-            # Общая статистика
-            total_analyzed = analyzed_articles.count()
-            total_with_tags = analyzed_articles.exclude(tags=[]).count()
-            total_with_locations = analyzed_articles.exclude(locations=[]).count()
-            
-            self.stdout.write(f'\nОбщая статистика:')
-            self.stdout.write(f'  - Всего проанализированных статей: {total_analyzed}')
-            self.stdout.write(f'  - Статей с тегами: {total_with_tags}')
-            self.stdout.write(f'  - Статей с локациями: {total_with_locations}') 
\ No newline at end of file
+            self.write_statistics()
+
+    def write_statistics(self):
+        """Распределение по темам и общие счетчики (агрегатные запросы)."""
+        self.stdout.write('\nСтатистика анализа:')
+
+        analyzed_articles = Article.objects.filter(is_analyzed=True, is_active=True)
+        topic_names = dict(Article.TOPIC_CHOICES)
+        topics_stats = analyzed_articles.order_by().values('topic').annotate(
+            count=Count('id')
+        ).order_by('-count')
+
+        self.stdout.write('Распределение по темам:')
+        for row in topics_stats:
+            self.stdout.write(f'  - {topic_names.get(row["topic"], row["topic"])}: {row["count"]}')
+
+        # Общая статистика
+        totals = analyzed_articles.aggregate(
+            total_analyzed=Count('id'),
+            total_with_tags=Count('id', filter=~Q(tags=[])),
+            total_with_locations=Count('id', filter=~Q(locations=[])),
+        )
+
+        self.stdout.write('\nОбщая статистика:')
+        self.stdout.write(f'  - Всего проанализированных статей: {totals["total_analyzed"]}')
+        self.stdout.write(f'  - Статей с тегами: {totals["total_with_tags"]}')
+        self.stdout.write(f'  - Статей с локациями: {totals["total_with_locations"]}')
+
+    def load_checkpoint(self, path, run_key):
+        """Читает контрольную точку, если она от запуска с теми же параметрами."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать контрольную точку {path}: {e}")
+            return None
+
+        if any(checkpoint.get(key) != value for key, value in run_key.items()):
+            self.stdout.write(
+                self.style.WARNING('Контрольная точка от запуска с другими параметрами - начинаем сначала')
+            )
+            return None
+        return checkpoint
+
+    def save_checkpoint(self, path, data):
+        """Атомарно записывает контрольную точку."""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def remove_checkpoint(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
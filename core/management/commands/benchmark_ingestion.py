@@ -0,0 +1,151 @@
+"""
+Django management команда для замера задержки "сбор -> анализ" под нагрузкой бэклога.
+
+Сценарий (нужны запущенные брокер и воркеры, см. run_worker):
+1. создается бэклог из --backlog непроанализированных статей и ставится
+   задача analyze_unanalyzed_articles
+2. затем по одной отправляются --fresh "свежих" статей через save_article,
+   как это делает парсер
+3. для каждой свежей статьи измеряется время от постановки save_article
+   до записи результатов анализа (Article.analyzed_at)
+
+Все статьи создаются в служебном неактивном источнике и удаляются
+после замера (если не указан --keep).
+"""
+
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Article, Source
+
+BENCHMARK_SOURCE_URL = 'https://benchmark.invalid/'
+
+SAMPLE_TEXT = (
+    'Правительство обсудило бюджет и налоги на заседании в Москве. '
+    'Министр экономики рассказал об инфляции, курсе рубля и инвестициях. '
+    'Эксперты оценили влияние санкций на торговлю и экспорт. '
+)
+
+
+class Command(BaseCommand):
+    help = 'Измеряет задержку от сбора до анализа свежих статей при большом бэклоге'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backlog',
+            type=int,
+            default=1000,
+            help='Количество статей в бэклоге анализа (по умолчанию: 1000)',
+        )
+        parser.add_argument(
+            '--fresh',
+            type=int,
+            default=20,
+            help='Количество свежих статей для замера (по умолчанию: 20)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0.5,
+            help='Пауза между свежими статьями в секундах (по умолчанию: 0.5)',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=300,
+            help='Максимальное время ожидания анализа в секундах (по умолчанию: 300)',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Не удалять созданные статьи после замера',
+        )
+
+    def handle(self, *args, **options):
+        from scraper.tasks import analyze_unanalyzed_articles, save_article
+
+        if options['fresh'] <= 0:
+            raise CommandError('--fresh должен быть больше 0')
+
+        source, _ = Source.objects.get_or_create(
+            url=BENCHMARK_SOURCE_URL,
+            defaults={'name': 'Benchmark', 'type': 'html', 'is_active': False}
+        )
+        run_id = uuid.uuid4().hex[:8]
+
+        try:
+            if options['backlog'] > 0:
+                self.create_backlog(source, run_id, options['backlog'])
+                analyze_unanalyzed_articles.delay(batch_size=options['backlog'])
+                self.stdout.write(f'Бэклог: {options["backlog"]} статей поставлено в анализ')
+
+            sent_at = {}
+            for index in range(options['fresh']):
+                url = f'{BENCHMARK_SOURCE_URL}fresh/{run_id}/{index}'
+                sent_at[url] = timezone.now()
+                save_article.delay({
+                    'title': f'Свежая новость {index}: бюджет и выборы',
+                    'content': SAMPLE_TEXT * 5,
+                    'summary': SAMPLE_TEXT,
+                    'url': url,
+                    'published_at': None,
+                    'source_id': source.id,
+                })
+                time.sleep(options['interval'])
+
+            latencies = self.wait_for_analysis(sent_at, options['timeout'])
+            self.report(latencies, len(sent_at), source, run_id)
+        finally:
+            if not options['keep']:
+                deleted, _ = Article.objects.filter(source=source, url__contains=f'/{run_id}/').delete()
+                self.stdout.write(f'Удалено тестовых статей: {deleted}')
+
+    def create_backlog(self, source, run_id, count):
+        now = timezone.now()
+        Article.objects.bulk_create([
+            Article(
+                title=f'Статья бэклога {index}',
+                content=SAMPLE_TEXT * 20,
+                summary=SAMPLE_TEXT,
+                url=f'{BENCHMARK_SOURCE_URL}backlog/{run_id}/{index}',
+                source=source,
+                published_at=now,
+                is_analyzed=False,
+            )
+            for index in range(count)
+        ], batch_size=1000)
+
+    def wait_for_analysis(self, sent_at, timeout):
+        """Ждет анализа свежих статей; возвращает задержки в секундах."""
+        deadline = time.monotonic() + timeout
+        latencies = {}
+        while len(latencies) < len(sent_at) and time.monotonic() < deadline:
+            rows = Article.objects.filter(
+                url__in=[url for url in sent_at if url not in latencies],
+                analyzed_at__isnull=False
+            ).values_list('url', 'analyzed_at')
+            for url, analyzed_at in rows:
+                latencies[url] = (analyzed_at - sent_at[url]).total_seconds()
+            time.sleep(0.5)
+        return list(latencies.values())
+
+    def report(self, latencies, sent, source, run_id):
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(f'Свежих статей проанализировано: {len(latencies)} из {sent}')
+        if latencies:
+            latencies.sort()
+            p95_index = max(0, int(round(len(latencies) * 0.95)) - 1)
+            self.stdout.write(f'  p50: {statistics.median(latencies):.2f} c')
+            self.stdout.write(f'  p95: {latencies[p95_index]:.2f} c')
+            self.stdout.write(f'  max: {latencies[-1]:.2f} c')
+
+        backlog_left = Article.objects.filter(
+            source=source, url__contains=f'/backlog/{run_id}/', is_analyzed=False
+        ).count()
+        self.stdout.write(f'Статей бэклога еще не проанализировано: {backlog_left}')
+        if len(latencies) < sent:
+            self.stdout.write(self.style.WARNING('Не все свежие статьи проанализированы за отведенное время'))
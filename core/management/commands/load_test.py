@@ -0,0 +1,268 @@
+"""
+Django management команда для нагрузочного тестирования API.
+
+Асинхронный клиент (aiohttp) в --concurrency параллельных сессиях в течение
+--duration секунд отправляет запросы к запущенному серверу по взвешенному
+набору сценариев: список статей (страницы, фильтры, поиск, сортировка),
+универсальный поиск, статистика, тренды и избранное пользователя.
+Параметры запросов (темы, теги, слова заголовков, источники) берутся из БД, поэтому
+команду удобно запускать на наборе, созданном seed_dataset.
+
+По каждому сценарию выводятся количество запросов, ошибки, пропускная
+способность и задержки p50/p95/p99/max.
+
+    python manage.py seed_dataset --articles 1000000
+    python manage.py runserver --noreload
+    python manage.py load_test --duration 60 --concurrency 32
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+
+import aiohttp
+from django.core.management.base import BaseCommand, CommandError
+
+from core.management.commands.seed_dataset import SEED_PASSWORD, SEED_USER_PREFIX, TOPIC_WEIGHTS
+
+# Значения по умолчанию, если в БД нет данных
+FALLBACK_SAMPLE = {
+    'topics': list(TOPIC_WEIGHTS),
+    'tags': ['экономика', 'выборы', 'футбол', 'нефть', 'санкции'],
+    'words': ['бюджет', 'рынок', 'матч', 'исследование', 'Москва'],
+    'source_ids': [],
+}
+
+# Сценарий: (имя, вес, требуется авторизация)
+SCENARIOS = [
+    ('articles', 25, False),
+    ('articles_page', 8, False),
+    ('articles_topic', 10, False),
+    ('articles_tags', 5, False),
+    ('articles_search', 8, False),
+    ('articles_ordering', 5, False),
+    ('articles_with_favorites', 6, True),
+    ('search', 12, False),
+    ('stats_articles', 5, False),
+    ('trending', 8, False),
+    ('trending_filtered', 4, False),
+    ('favorites', 4, True),
+]
+
+
+def build_request(name: str, sample: dict, rng: random.Random):
+    """Путь и параметры запроса для сценария."""
+    topic = rng.choice(sample['topics'])
+    if name == 'articles':
+        return '/api/articles/', {}
+    if name == 'articles_page':
+        return '/api/articles/', {'page': rng.randint(2, 50)}
+    if name == 'articles_topic':
+        return '/api/articles/', {'topic': topic, 'view': 'compact'}
+    if name == 'articles_tags':
+        return '/api/articles/', {'tags': rng.choice(sample['tags'])}
+    if name == 'articles_search':
+        return '/api/articles/', {'search': rng.choice(sample['words'])}
+    if name == 'articles_ordering':
+        return '/api/articles/', {'ordering': rng.choice(['-read_count', 'published_at', '-created_at'])}
+    if name == 'articles_with_favorites':
+        return '/api/articles/', {'with_favorites': 1}
+    if name == 'search':
+        return '/api/search/', {'q': rng.choice(sample['words'] + sample['tags'])}
+    if name == 'stats_articles':
+        return '/api/stats/articles/', {}
+    if name == 'trending':
+        return '/api/trending/', {}
+    if name == 'trending_filtered':
+        if sample['source_ids'] and rng.random() < 0.5:
+            return '/api/trending/', {'source': rng.choice(sample['source_ids'])}
+        return '/api/trending/', {'topic': topic}
+    if name == 'favorites':
+        return '/api/auth/favorites/', {}
+    raise ValueError(f'Неизвестный сценарий: {name}')
+
+
+def percentile(values: list, q: float) -> float:
+    """Перцентиль по отсортированному списку (nearest-rank)."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(q / 100 * len(values))) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест API: пропускная способность и задержки p95/p99 по эндпоинтам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000',
+                            help='Адрес запущенного сервера (по умолчанию: http://127.0.0.1:8000)')
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Длительность теста в секундах (по умолчанию: 30)')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Количество параллельных клиентов (по умолчанию: 16)')
+        parser.add_argument('--timeout', type=float, default=30,
+                            help='Таймаут одного запроса в секундах (по умолчанию: 30)')
+        parser.add_argument('--email', default=f'{SEED_USER_PREFIX}0@seed.invalid',
+                            help='Email пользователя для сценариев с авторизацией')
+        parser.add_argument('--password', default=SEED_PASSWORD,
+                            help='Пароль пользователя для сценариев с авторизацией')
+        parser.add_argument('--scenarios', default='',
+                            help='Сценарии через запятую (по умолчанию: все)')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Seed генератора случайных чисел')
+        parser.add_argument('--json', action='store_true',
+                            help='Вывести результаты в формате JSON')
+
+    def handle(self, *args, **options):
+        if options['duration'] <= 0 or options['concurrency'] <= 0:
+            raise CommandError('--duration и --concurrency должны быть больше 0')
+
+        scenarios = SCENARIOS
+        if options['scenarios']:
+            names = {name.strip() for name in options['scenarios'].split(',') if name.strip()}
+            unknown = names - {name for name, _, _ in SCENARIOS}
+            if unknown:
+                raise CommandError(f'Неизвестные сценарии: {", ".join(sorted(unknown))}')
+            scenarios = [scenario for scenario in SCENARIOS if scenario[0] in names]
+
+        sample = self.load_sample()
+        results, elapsed, token = asyncio.run(self.run(options, scenarios, sample))
+        report = self.build_report(results, elapsed)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        if not token and any(auth for _, _, auth in scenarios):
+            self.stdout.write(self.style.WARNING(
+                'Авторизация не удалась, сценарии с авторизацией пропущены'
+            ))
+        self.print_report(report)
+
+    def load_sample(self) -> dict:
+        """Темы, теги, слова для поиска и ID источников из БД."""
+        sample = {key: list(values) for key, values in FALLBACK_SAMPLE.items()}
+        try:
+            from core.models import Article, Source
+
+            topics = list(Article.objects.exclude(topic='').values_list('topic', flat=True).distinct()[:20])
+            rows = list(Article.objects.order_by('-id').values_list('title', 'tags')[:500])
+            source_ids = list(Source.objects.order_by('id').values_list('id', flat=True)[:100])
+        except Exception as e:
+            self.stderr.write(f'Не удалось получить данные из БД, используются значения по умолчанию: {e}')
+            return sample
+
+        tags = sorted({tag for _, article_tags in rows for tag in (article_tags or []) if tag})
+        words = sorted({
+            word.strip('«»:,.()-') for title, _ in rows for word in title.split()
+            if len(word.strip('«»:,.()-')) > 5
+        })
+        if topics:
+            sample['topics'] = topics
+        if tags:
+            sample['tags'] = tags[:200]
+        if words:
+            sample['words'] = words[:200]
+        sample['source_ids'] = source_ids
+        return sample
+
+    async def run(self, options: dict, scenarios: list, sample: dict):
+        base_url = options['base_url'].rstrip('/')
+        timeout = aiohttp.ClientTimeout(total=options['timeout'])
+        connector = aiohttp.TCPConnector(limit=options['concurrency'])
+        results = defaultdict(lambda: {'latencies': [], 'errors': 0, 'statuses': defaultdict(int)})
+
+        async with aiohttp.ClientSession(base_url, timeout=timeout, connector=connector) as session:
+            token = await self.login(session, options['email'], options['password'])
+            if not token:
+                scenarios = [scenario for scenario in scenarios if not scenario[2]]
+            if not scenarios:
+                raise CommandError('Нет сценариев для запуска')
+
+            names = [name for name, _, _ in scenarios]
+            weights = [weight for _, weight, _ in scenarios]
+            auth = {name for name, _, requires_auth in scenarios if requires_auth}
+            headers = {'Authorization': f'Token {token}'} if token else {}
+
+            started = time.perf_counter()
+            deadline = started + options['duration']
+
+            async def worker(worker_id: int):
+                rng = random.Random(None if options['seed'] is None else options['seed'] + worker_id)
+                while time.perf_counter() < deadline:
+                    name = rng.choices(names, weights)[0]
+                    path, params = build_request(name, sample, rng)
+                    stats = results[name]
+                    request_started = time.perf_counter()
+                    try:
+                        async with session.get(path, params=params,
+                                               headers=headers if name in auth else None) as response:
+                            await response.read()
+                            status = response.status
+                    except (aiohttp.ClientError, asyncio.TimeoutError):
+                        status = 'error'
+                    stats['latencies'].append(time.perf_counter() - request_started)
+                    stats['statuses'][status] += 1
+                    if status == 'error' or status >= 400:
+                        stats['errors'] += 1
+
+            await asyncio.gather(*(worker(i) for i in range(options['concurrency'])))
+            elapsed = time.perf_counter() - started
+
+        return results, elapsed, token
+
+    async def login(self, session: aiohttp.ClientSession, email: str, password: str):
+        """Токен пользователя или None."""
+        try:
+            async with session.post('/api/auth/login/', json={'email': email, 'password': password}) as response:
+                if response.status != 200:
+                    return None
+                return (await response.json()).get('token')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise CommandError(f'Сервер недоступен: {e}')
+
+    def build_report(self, results: dict, elapsed: float) -> dict:
+        endpoints = {}
+        total = errors = 0
+        for name in sorted(results):
+            stats = results[name]
+            latencies = sorted(stats['latencies'])
+            total += len(latencies)
+            errors += stats['errors']
+            endpoints[name] = {
+                'requests': len(latencies),
+                'errors': stats['errors'],
+                'rps': round(len(latencies) / elapsed, 2),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+                'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+                'statuses': {str(key): value for key, value in stats['statuses'].items()},
+            }
+        return {
+            'duration_s': round(elapsed, 2),
+            'requests': total,
+            'errors': errors,
+            'rps': round(total / elapsed, 2) if elapsed else 0.0,
+            'endpoints': endpoints,
+        }
+
+    def print_report(self, report: dict):
+        self.stdout.write(
+            f'{"Сценарий":<26} {"Запросы":>8} {"Ошибки":>7} {"RPS":>8} '
+            f'{"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9} {"max, мс":>9}'
+        )
+        for name, row in report['endpoints'].items():
+            line = (
+                f'{name:<26} {row["requests"]:>8} {row["errors"]:>7} {row["rps"]:>8.1f} '
+                f'{row["p50_ms"]:>9.1f} {row["p95_ms"]:>9.1f} {row["p99_ms"]:>9.1f} {row["max_ms"]:>9.1f}'
+            )
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+
+        summary = (
+            f'\nВсего: {report["requests"]} запросов за {report["duration_s"]} с '
+            f'({report["rps"]} запросов/с), ошибок: {report["errors"]}'
+        )
+        self.stdout.write(self.style.WARNING(summary) if report['errors'] else self.style.SUCCESS(summary))
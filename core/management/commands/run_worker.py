@@ -0,0 +1,77 @@
+"""
+Django management команда для запуска воркера Celery на отдельной очереди.
+
+Concurrency и prefetch берутся из профиля очереди (scraper/queues.py,
+настройка WORKER_PROFILES), поэтому воркеры разных очередей не мешают
+друг другу: бэклог анализа не забирает процессы у свежих статей.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scraper.queues import get_worker_profiles
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркер Celery для указанной очереди с параметрами ее профиля'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'queue',
+            nargs='?',
+            help='Очередь для обработки (crawl, crawl_custom, ingest, analysis_fresh, analysis_backlog, maintenance, celery)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help='Переопределить количество процессов воркера',
+        )
+        parser.add_argument(
+            '--prefetch-multiplier',
+            type=int,
+            help='Переопределить prefetch multiplier воркера',
+        )
+        parser.add_argument(
+            '--loglevel',
+            default='info',
+            help='Уровень логирования (по умолчанию: info)',
+        )
+        parser.add_argument(
+            '--print',
+            action='store_true',
+            help='Только вывести команды запуска воркеров для всех очередей',
+        )
+
+    def handle(self, *args, **options):
+        profiles = get_worker_profiles()
+
+        if options['print']:
+            for queue, profile in profiles.items():
+                self.stdout.write(' '.join(self.worker_argv(queue, profile, options['loglevel'])))
+            return
+
+        queue = options['queue']
+        if queue not in profiles:
+            raise CommandError(f'Неизвестная очередь: {queue}. Доступны: {", ".join(profiles)}')
+
+        profile = dict(profiles[queue])
+        if options['concurrency']:
+            profile['concurrency'] = options['concurrency']
+        if options['prefetch_multiplier']:
+            profile['prefetch_multiplier'] = options['prefetch_multiplier']
+
+        argv = self.worker_argv(queue, profile, options['loglevel'])
+        self.stdout.write(self.style.SUCCESS(f'Запуск воркера: {" ".join(argv)}'))
+
+        from backend.celery import app
+        app.worker_main(argv[3:])
+
+    def worker_argv(self, queue, profile, loglevel):
+        return [
+            'celery', '-A', 'backend', 'worker',
+            '-Q', queue,
+            '-n', f'{queue}@%h',
+            f'--concurrency={profile["concurrency"]}',
+            f'--prefetch-multiplier={profile["prefetch_multiplier"]}',
+            '-O', 'fair',
+            f'--loglevel={loglevel}',
+        ]
@@ -0,0 +1,324 @@
+"""
+Django management команда для генерации большого синтетического набора данных.
+
+Создает источники, статьи (с тегами, локациями, темами и просмотрами),
+пользователей, избранное и логи API в заданном масштабе - для нагрузочного
+тестирования (команда load_test) и проверки планов запросов на объемах,
+близких к продакшену. Распределения приближены к реальным: темы и
+источники неравномерны, свежих статей больше, просмотры и избранное
+сосредоточены на популярных статьях.
+
+Все данные помечены (источники на seed.invalid, пользователи seed_user_*)
+и удаляются параметром --clear. Записи создаются через bulk_create пакетами,
+сигналы не срабатывают, поэтому профили пользователей создаются явно.
+Удаление тоже идет пакетами по диапазонам id статей прямыми DELETE -
+без загрузки статей в память и сигналов на каждую строку.
+"""
+
+import math
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from core.models import Article, CrawlRun, Source
+from core.text_analyzer import TextAnalyzer
+
+SEED_SOURCE_PREFIX = 'https://seed.invalid/'
+SEED_USER_PREFIX = 'seed_user_'
+SEED_PASSWORD = 'seed-password'
+
+# Доли тем в ленте (остальное - other)
+TOPIC_WEIGHTS = {
+    'politics': 18, 'economics': 14, 'technology': 12, 'war': 8, 'science': 6,
+    'health': 6, 'sports': 10, 'business': 8, 'entertainment': 6, 'culture': 5,
+}
+
+SOURCE_TYPES = ['html'] * 6 + ['rss'] * 3 + ['spa']
+
+TITLE_TEMPLATES = [
+    '{Subject}: {keyword} и {keyword2} ({place})',
+    'Обсуждение темы «{keyword}» ({place})',
+    'Эксперты оценили тему «{keyword}» после заявления о теме «{keyword2}»',
+    '{place}: {keyword} - что известно на данный момент',
+    'Итоги недели: {keyword}, {keyword2} и {keyword3}',
+]
+
+PARAGRAPH_TEMPLATES = [
+    'По данным источников ({place}), тема «{keyword}» остается главной.',
+    'Представители отрасли связывают тему «{keyword}» с темой «{keyword2}».',
+    'Аналитики ожидают, что ситуация вокруг темы «{keyword}» изменится в ближайшие недели.',
+    'Ранее {subject} заявляли о планах, связанных с темами «{keyword2}» и «{keyword3}».',
+    'Подробности опубликуют после официального заседания ({place}).',
+]
+
+SUBJECTS = ['правительство', 'эксперты', 'министерство', 'компания', 'ученые', 'депутаты', 'аналитики']
+
+ENDPOINTS = [
+    ('/api/articles/', 'GET', 40), ('/api/search/', 'GET', 15), ('/api/trending/', 'GET', 15),
+    ('/api/stats/articles/', 'GET', 5), ('/api/auth/dashboard/', 'GET', 10),
+    ('/api/auth/favorites/', 'GET', 8), ('/api/auth/articles/favorite-status/', 'GET', 6),
+    ('/api/sources/', 'GET', 3),
+]
+
+
+def raw_delete(queryset) -> int:
+    """
+    DELETE по фильтру queryset одним запросом.
+
+    В отличие от queryset.delete(), не загружает строки для каскада и
+    сигналов - зависимые записи удаляются вызывающим кодом заранее.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+class Command(BaseCommand):
+    help = 'Генерирует синтетический набор источников, статей, пользователей, избранного и логов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sources', type=int, default=50,
+                            help='Количество источников (по умолчанию: 50)')
+        parser.add_argument('--articles', type=int, default=100000,
+                            help='Количество статей (по умолчанию: 100000)')
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Количество пользователей (по умолчанию: 1000)')
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Среднее число избранных статей на пользователя (по умолчанию: 20)')
+        parser.add_argument('--usage-logs', type=int, default=100000,
+                            help='Количество записей лога API (по умолчанию: 100000)')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Глубина истории в днях (по умолчанию: 365)')
+        parser.add_argument('--analyzed-ratio', type=float, default=0.95,
+                            help='Доля проанализированных статей (по умолчанию: 0.95)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Размер пакета bulk_create (по умолчанию: 5000)')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Зерно генератора случайных чисел (по умолчанию: 42)')
+        parser.add_argument('--clear', action='store_true',
+                            help='Удалить ранее сгенерированные данные и выйти')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            self.clear(options['batch_size'])
+            return
+
+        if options['articles'] <= 0 or options['sources'] <= 0:
+            raise CommandError('--articles и --sources должны быть больше 0')
+        if Source.objects.filter(url__startswith=SEED_SOURCE_PREFIX).exists():
+            raise CommandError('Набор данных уже создан. Удалите его: seed_dataset --clear')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+
+        analyzer = TextAnalyzer()
+        self.keywords = {topic: words for topic, words in analyzer.topic_keywords.items()}
+        self.places = analyzer.locations
+
+        started = time.monotonic()
+        source_ids = self.create_sources(options['sources'])
+        self.create_articles(source_ids, options['articles'], options['analyzed_ratio'])
+        user_ids = self.create_users(options['users'])
+        self.create_favorites(user_ids, options['favorites'])
+        self.create_usage_logs(user_ids, options['usage_logs'])
+
+        from api.cache import bump_generation
+        bump_generation()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.0f} с. '
+            f'Вход для нагрузочного теста: {SEED_USER_PREFIX}0@seed.invalid / {SEED_PASSWORD}'
+        ))
+
+    def create_sources(self, count):
+        sources = [
+            Source(
+                name=f'Seed {i} {self.rng.choice(self.places).title()}',
+                url=f'{SEED_SOURCE_PREFIX}{i}/',
+                type=self.rng.choice(SOURCE_TYPES),
+                # Неактивны, чтобы плановый парсинг не ходил на несуществующие адреса
+                is_active=False,
+                description='Синтетический источник',
+            )
+            for i in range(count)
+        ]
+        Source.objects.bulk_create(sources, batch_size=self.batch_size)
+        self.stdout.write(f'Источники: {count}')
+        return list(Source.objects.filter(url__startswith=SEED_SOURCE_PREFIX).values_list('id', flat=True))
+
+    def create_articles(self, source_ids, count, analyzed_ratio):
+        from core.reanalysis import current_version
+
+        version = current_version()
+        topics = list(TOPIC_WEIGHTS) + ['other']
+        topic_weights = list(TOPIC_WEIGHTS.values()) + [8]
+        # Крупные источники публикуют заметно больше остальных (закон Ципфа)
+        source_weights = [1 / (rank + 1) for rank in range(len(source_ids))]
+
+        created = 0
+        while created < count:
+            batch = []
+            for i in range(created, min(created + self.batch_size, count)):
+                topic = self.rng.choices(topics, topic_weights)[0]
+                words = self.topic_words(topic)
+                analyzed = self.rng.random() < analyzed_ratio
+                published_at = self.random_moment()
+                batch.append(Article(
+                    title=self.render(self.rng.choice(TITLE_TEMPLATES), topic)[:500],
+                    content=' '.join(
+                        self.render(self.rng.choice(PARAGRAPH_TEMPLATES), topic)
+                        for _ in range(self.rng.randint(4, 20))
+                    ),
+                    summary=self.render(self.rng.choice(PARAGRAPH_TEMPLATES), topic),
+                    source_id=self.rng.choices(source_ids, source_weights)[0],
+                    url=f'{SEED_SOURCE_PREFIX}article/{i}',
+                    published_at=published_at,
+                    topic=topic if analyzed else 'other',
+                    tags=self.rng.sample(words, k=min(self.rng.randint(2, 6), len(words))) if analyzed else [],
+                    locations=self.rng.sample(self.places, k=self.rng.randint(0, 3)) if analyzed else [],
+                    is_analyzed=analyzed,
+                    analyzer_version=version if analyzed else '',
+                    analyzed_at=published_at if analyzed else None,
+                    read_count=min(int(self.rng.paretovariate(1.2)) - 1, 1000000),
+                    is_featured=self.rng.random() < 0.01,
+                ))
+            with transaction.atomic():
+                Article.objects.bulk_create(batch, batch_size=self.batch_size)
+            created += len(batch)
+            self.stdout.write(f'Статьи: {created}/{count}')
+
+    def create_users(self, count):
+        from accounts.models import User, UserProfile
+
+        password = make_password(SEED_PASSWORD)
+        users = [
+            User(
+                username=f'{SEED_USER_PREFIX}{i}',
+                email=f'{SEED_USER_PREFIX}{i}@seed.invalid',
+                first_name='Seed',
+                last_name=str(i),
+                password=password,
+                date_joined=self.random_moment(),
+            )
+            for i in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        user_ids = list(User.objects.filter(username__startswith=SEED_USER_PREFIX).values_list('id', flat=True))
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_id) for user_id in user_ids], batch_size=self.batch_size
+        )
+        self.stdout.write(f'Пользователи: {len(user_ids)}')
+        return user_ids
+
+    def create_favorites(self, user_ids, per_user):
+        from accounts.models import UserFavoriteArticle
+
+        if not user_ids or per_user <= 0:
+            return
+        # Избранное тяготеет к популярным статьям
+        popular = list(
+            Article.objects.filter(url__startswith=SEED_SOURCE_PREFIX)
+            .order_by('-read_count').values_list('id', flat=True)[:max(per_user * 50, 1000)]
+        )
+        favorites = []
+        for user_id in user_ids:
+            count = min(len(popular), max(0, int(self.rng.expovariate(1 / per_user))))
+            for article_id in self.rng.sample(popular, k=count):
+                favorites.append(UserFavoriteArticle(user_id=user_id, article_id=article_id))
+            if len(favorites) >= self.batch_size:
+                UserFavoriteArticle.objects.bulk_create(favorites, ignore_conflicts=True)
+                favorites = []
+        UserFavoriteArticle.objects.bulk_create(favorites, ignore_conflicts=True)
+        self.stdout.write(f'Избранное: {UserFavoriteArticle.objects.filter(user_id__in=user_ids).count()}')
+
+    def create_usage_logs(self, user_ids, count):
+        from accounts import partitions
+        from accounts.models import APIUsageLog
+
+        if not user_ids or count <= 0:
+            return
+        if partitions.is_partitioned():
+            month = partitions.month_start((self.now - timedelta(days=self.days)).date())
+            while month <= self.now.date():
+                partitions.create_partition(month)
+                month = partitions.add_months(month, 1)
+
+        paths = [(path, method) for path, method, _ in ENDPOINTS]
+        weights = [weight for _, _, weight in ENDPOINTS]
+        # Активность пользователей тоже неравномерна
+        user_weights = [1 / math.sqrt(rank + 1) for rank in range(len(user_ids))]
+
+        created = 0
+        while created < count:
+            size = min(self.batch_size, count - created)
+            APIUsageLog.objects.bulk_create([
+                APIUsageLog(
+                    user_id=self.rng.choices(user_ids, user_weights)[0],
+                    endpoint=endpoint,
+                    method=method,
+                    status_code=self.rng.choices([200, 304, 400, 404, 429], [85, 8, 3, 2, 2])[0],
+                    response_time=round(self.rng.lognormvariate(-3, 0.8), 4),
+                    ip_address=f'10.{self.rng.randint(0, 255)}.{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}',
+                    user_agent='seed-dataset',
+                    created_at=self.random_moment(),
+                )
+                for endpoint, method in self.rng.choices(paths, weights, k=size)
+            ])
+            created += size
+            self.stdout.write(f'Логи API: {created}/{count}')
+
+    def clear(self, batch_size):
+        from accounts.models import APIUsageLog, User, UserFavoriteArticle
+
+        source_ids = list(Source.objects.filter(url__startswith=SEED_SOURCE_PREFIX).values_list('id', flat=True))
+        articles = Article.objects.filter(source_id__in=source_ids)
+        bounds = articles.aggregate(first=Min('id'), last=Max('id'))
+
+        favorites = deleted_articles = 0
+        if bounds['first'] is not None:
+            for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+                batch = articles.filter(id__gte=start, id__lt=start + batch_size)
+                with transaction.atomic():
+                    favorites += raw_delete(UserFavoriteArticle.objects.filter(article__in=batch))
+                    deleted_articles += raw_delete(batch)
+                self.stdout.write(f'Удалено статей: {deleted_articles}')
+
+        crawl_runs = raw_delete(CrawlRun.objects.filter(source_id__in=source_ids))
+        sources = Source.objects.filter(id__in=source_ids).delete()[0]
+
+        users = User.objects.filter(username__startswith=SEED_USER_PREFIX)
+        logs = raw_delete(APIUsageLog.objects.filter(user__in=users))
+        users_deleted = users.delete()[0]
+
+        from api.cache import bump_generation
+        bump_generation()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено: статьи {deleted_articles}, избранное {favorites}, источники и их записи '
+            f'{sources + crawl_runs}, пользователи {users_deleted}, логи {logs}'
+        ))
+
+    def random_moment(self):
+        """Момент в пределах --days, свежие даты встречаются чаще."""
+        age = min(self.rng.expovariate(3 / self.days), self.days)
+        return self.now - timedelta(days=age)
+
+    def topic_words(self, topic):
+        return self.keywords.get(topic) or self.keywords['politics']
+
+    def render(self, template, topic):
+        words = self.topic_words(topic)
+        place = self.rng.choice(self.places)
+        return template.format(
+            Subject=self.rng.choice(SUBJECTS).capitalize(),
+            subject=self.rng.choice(SUBJECTS),
+            keyword=self.rng.choice(words),
+            keyword2=self.rng.choice(words),
+            keyword3=self.rng.choice(words),
+            place=place.title(),
+        )
@@ -0,0 +1,154 @@
+"""
+Метрики Prometheus для парсера, анализатора и API.
+
+Метрики объявлены здесь и обновляются в горячих путях:
+- scraper_fetch_seconds              - загрузка страницы источника (fetch_page)
+- scraper_html_parse_seconds         - построение дерева BeautifulSoup
+- scraper_selector_seconds           - поиск контейнеров по каждому селектору
+- scraper_extract_seconds            - извлечение полей статьи из контейнера
+- analyzer_seconds                   - analyze_text по анализаторам
+- api_request_seconds                - время ответа представлений API (core/middleware.py)
+- dedup_hits_total                   - повторы, отсеянные без лишней работы
+- spacy_model_loads_total            - загрузки модели spaCy
+- analysis_backlog_articles          - неанализированные статьи (считается при опросе)
+
+Эндпоинт /metrics отдает метрики в текстовом формате Prometheus. Доступ -
+по токену METRICS_AUTH_TOKEN (Authorization: Bearer <token>); без токена
+метрики отдаются только при DEBUG, иначе эндпоинт отвечает 404.
+
+Процессы Celery (prefork) и gunicorn: если задана переменная окружения
+PROMETHEUS_MULTIPROC_DIR (до запуска процессов, каталог очищается при
+деплое), prometheus_client пишет значения каждого процесса в свои файлы,
+а /metrics суммирует их по всем процессам. Без переменной метрики
+отражают только процесс, который обслужил запрос.
+
+Если prometheus_client не установлен, метрики становятся заглушками,
+а /metrics отвечает 503.
+"""
+
+import hmac
+import logging
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+    )
+    from prometheus_client.core import GaugeMetricFamily
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+# Границы гистограмм (сек): сетевые запросы и быстрые операции разбора
+NETWORK_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+CPU_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+class _NoopMetric:
+    """Заглушка метрики, когда prometheus_client не установлен."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, amount):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+
+if PROMETHEUS_AVAILABLE:
+    FETCH_SECONDS = Histogram(
+        'scraper_fetch_seconds', 'Загрузка страницы источника', ['result'], buckets=NETWORK_BUCKETS
+    )
+    HTML_PARSE_SECONDS = Histogram(
+        'scraper_html_parse_seconds', 'Построение дерева BeautifulSoup', buckets=CPU_BUCKETS
+    )
+    SELECTOR_SECONDS = Histogram(
+        'scraper_selector_seconds', 'Поиск контейнеров статей по селектору', ['selector'], buckets=CPU_BUCKETS
+    )
+    EXTRACT_SECONDS = Histogram(
+        'scraper_extract_seconds', 'Извлечение поля статьи из контейнера', ['field'], buckets=CPU_BUCKETS
+    )
+    ANALYZE_SECONDS = Histogram(
+        'analyzer_seconds', 'Анализ текста статьи', ['analyzer'], buckets=CPU_BUCKETS
+    )
+    API_REQUEST_SECONDS = Histogram(
+        'api_request_seconds', 'Время ответа API', ['view', 'method', 'status'], buckets=NETWORK_BUCKETS
+    )
+    DEDUP_HITS = Counter(
+        'dedup_hits', 'Повторы, обработанные без лишней работы', ['kind']
+    )
+    SPACY_MODEL_LOADS = Counter(
+        'spacy_model_loads', 'Загрузки модели spaCy', ['model', 'result']
+    )
+else:
+    FETCH_SECONDS = HTML_PARSE_SECONDS = SELECTOR_SECONDS = EXTRACT_SECONDS = _NoopMetric()
+    ANALYZE_SECONDS = API_REQUEST_SECONDS = DEDUP_HITS = SPACY_MODEL_LOADS = _NoopMetric()
+
+
+class BacklogCollector:
+    """Размер бэклога анализа на момент опроса (один COUNT запрос)."""
+
+    def collect(self):
+        from .models import Article
+
+        gauge = GaugeMetricFamily(
+            'analysis_backlog_articles', 'Активные статьи, ожидающие анализа'
+        )
+        try:
+            gauge.add_metric([], Article.objects.filter(is_analyzed=False, is_active=True).count())
+        except Exception as e:
+            logger.warning(f"Не удалось посчитать бэклог анализа: {e}")
+            return
+        yield gauge
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.environ.get('prometheus_multiproc_dir'))
+
+
+def mark_process_dead(pid: int) -> None:
+    """Убирает файлы завершившегося процесса (вызывается при остановке процесса воркера)."""
+    if PROMETHEUS_AVAILABLE and multiprocess_enabled():
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
+
+def render_latest() -> bytes:
+    """Метрики в текстовом формате Prometheus."""
+    if multiprocess_enabled():
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    backlog = CollectorRegistry()
+    backlog.register(BacklogCollector())
+    return generate_latest(registry) + generate_latest(backlog)
+
+
+def metrics_view(request):
+    """Эндпоинт /metrics для Prometheus."""
+    if not getattr(settings, 'METRICS_ENABLED', True):
+        return HttpResponse(status=404)
+
+    token = getattr(settings, 'METRICS_AUTH_TOKEN', '')
+    if not token:
+        # Без токена метрики (маршруты, очереди, объем трафика) видны только при отладке
+        if not settings.DEBUG:
+            return HttpResponse(status=404)
+    elif not hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+
+    if not PROMETHEUS_AVAILABLE:
+        return HttpResponse('prometheus_client не установлен', status=503, content_type='text/plain')
+
+    return HttpResponse(render_latest(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,75 @@
+import logging
+import time
+
+from django.conf import settings
+
+from . import metrics
+from .query_budget import QueryCounter
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """
+    Время ответа API в гистограмму api_request_seconds (core/metrics.py).
+
+    Метка view - имя маршрута (а не путь), чтобы число рядов не зависело
+    от ID в URL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True) and metrics.PROMETHEUS_AVAILABLE
+        self.prefixes = tuple(getattr(settings, 'METRICS_PATH_PREFIXES', ('/api/',)))
+
+    def __call__(self, request):
+        if not self.enabled or not request.path.startswith(self.prefixes):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        metrics.API_REQUEST_SECONDS.labels(
+            view=match.view_name if match else 'unresolved',
+            method=request.method,
+            status=f'{response.status_code // 100}xx',
+        ).observe(time.perf_counter() - started)
+        return response
+
+
+class QueryCountMiddleware:
+    """
+    Количество SQL-запросов и их суммарное время на запрос к API.
+
+    При QUERY_COUNT_HEADERS (по умолчанию - в режиме DEBUG) значения
+    отдаются в заголовках X-Query-Count и X-Query-Time-Ms. Запросы,
+    превысившие QUERY_COUNT_WARN_THRESHOLD, пишутся в лог с именем
+    маршрута - так N+1 в сериализаторах заметен и без профилировщика.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.headers = getattr(settings, 'QUERY_COUNT_HEADERS', settings.DEBUG)
+        self.warn_threshold = getattr(settings, 'QUERY_COUNT_WARN_THRESHOLD', None)
+        self.prefixes = tuple(getattr(settings, 'METRICS_PATH_PREFIXES', ('/api/',)))
+
+    def __call__(self, request):
+        if not (self.headers or self.warn_threshold) or not request.path.startswith(self.prefixes):
+            return self.get_response(request)
+
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+
+        if self.headers:
+            response['X-Query-Count'] = str(counter.count)
+            response['X-Query-Time-Ms'] = f'{counter.time_ms:.2f}'
+
+        if self.warn_threshold and counter.count > self.warn_threshold:
+            match = getattr(request, 'resolver_match', None)
+            logger.warning(
+                f'{request.method} {match.view_name if match else request.path}: '
+                f'{counter.count} SQL-запросов за {counter.time_ms:.1f} мс '
+                f'(порог {self.warn_threshold})'
+            )
+        return response
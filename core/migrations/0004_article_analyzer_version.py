@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-19 09:21
+
+from django.db import migrations, models
+
+
+# Версия анализатора (настройки по умолчанию) на момент создания миграции.
+# Зафиксирована строкой: миграция не должна зависеть от кода приложения
+BACKFILL_ANALYZER_VERSION = 'spacy:1:ru_core_news_sm'
+
+
+def backfill_analyzer_version(apps, schema_editor):
+    """Проставляет проанализированным статьям версию анализатора на момент миграции."""
+    Article = apps.get_model('core', 'Article')
+    Article.objects.filter(is_analyzed=True, analyzer_version='').update(
+        analyzer_version=BACKFILL_ANALYZER_VERSION
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_update_article_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='analyzed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата анализа'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='analyzer_version',
+            field=models.CharField(blank=True, default='', help_text='Анализатор и его версия, которыми получены тема, теги и локации', max_length=100, verbose_name='Версия анализатора'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['analyzer_version'], name='core_articl_analyze_ee6d57_idx'),
+        ),
+        migrations.RunPython(backfill_analyzer_version, migrations.RunPython.noop),
+    ]
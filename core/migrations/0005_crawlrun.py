@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-19 09:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_article_analyzer_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tier', models.CharField(choices=[('core', 'Источник платформы'), ('custom', 'Пользовательский источник')], default='core', max_length=10, verbose_name='Уровень')),
+                ('status', models.CharField(choices=[('success', 'Успешно'), ('no_articles', 'Статьи не найдены'), ('error', 'Ошибка')], max_length=20, verbose_name='Статус')),
+                ('fetch_outcome', models.CharField(choices=[('fetched', 'Загружено'), ('coalesced', 'Получено от параллельной загрузки'), ('cached', 'Из кэша загрузок'), ('direct', 'Без объединения загрузок')], default='fetched', max_length=20, verbose_name='Загрузка')),
+                ('http_status', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='HTTP статус')),
+                ('bytes_fetched', models.PositiveIntegerField(blank=True, null=True, verbose_name='Размер страницы (байт)')),
+                ('fetch_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Время загрузки (мс)')),
+                ('parse_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Время разбора (мс)')),
+                ('containers_found', models.PositiveIntegerField(default=0, verbose_name='Найдено контейнеров')),
+                ('articles_found', models.PositiveIntegerField(default=0, verbose_name='Извлечено статей')),
+                ('new_articles', models.PositiveIntegerField(default=0, verbose_name='Новых статей')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('started_at', models.DateTimeField(verbose_name='Начало')),
+                ('duration_ms', models.PositiveIntegerField(default=0, verbose_name='Длительность (мс)')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crawl_runs', to='core.source', verbose_name='Источник')),
+            ],
+            options={
+                'verbose_name': 'Парсинг источника',
+                'verbose_name_plural': 'Парсинги источников',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='crawlrun',
+            index=models.Index(fields=['source', '-started_at'], name='core_crawlr_source__cadf59_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crawlrun',
+            index=models.Index(fields=['started_at'], name='core_crawlr_started_cbd758_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-19 09:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_crawlrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('crawl', 'Парсинг источника'), ('analysis', 'Анализ статьи')], max_length=20, verbose_name='Тип')),
+                ('target', models.CharField(max_length=255, verbose_name='Объект')),
+                ('duration_ms', models.PositiveIntegerField(verbose_name='Длительность (мс)')),
+                ('engine', models.CharField(blank=True, max_length=20, verbose_name='Профилировщик')),
+                ('spans', models.JSONField(default=list, verbose_name='Этапы')),
+                ('report', models.TextField(blank=True, verbose_name='Отчет')),
+                ('raw', models.BinaryField(blank=True, null=True, verbose_name='Файл профиля')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('source', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profile_reports', to='core.source', verbose_name='Источник')),
+            ],
+            options={
+                'verbose_name': 'Профиль',
+                'verbose_name_plural': 'Профили',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
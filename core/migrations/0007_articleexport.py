@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-19 09:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0006_profilereport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('parquet', 'Parquet')], default='parquet', max_length=20, verbose_name='Формат')),
+                ('params', models.JSONField(default=dict, help_text='Фильтры и поля выгрузки (query-параметры списка статей)', verbose_name='Параметры')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('error', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('file', models.FileField(blank=True, upload_to='exports/%Y/%m/', verbose_name='Файл')),
+                ('rows', models.PositiveIntegerField(default=0, verbose_name='Строк')),
+                ('size_bytes', models.PositiveBigIntegerField(default=0, verbose_name='Размер (байт)')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершена')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='article_exports', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Выгрузка статей',
+                'verbose_name_plural': 'Выгрузки статей',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='articleexport',
+            index=models.Index(fields=['user', '-created_at'], name='core_articl_user_id_fa4521_idx'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.core.validators import URLValidator
 from django.contrib.postgres.fields import ArrayField
@@ -154,6 +155,18 @@ class Article(models.Model):
         verbose_name="Проанализирована",
         help_text="Был ли проведен автоматический анализ текста"
     )
+    analyzer_version = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name="Версия анализатора",
+        help_text="Анализатор и его версия, которыми получены тема, теги и локации"
+    )
+    analyzed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Дата анализа"
+    )
     
     # Технические поля
     read_count = models.PositiveIntegerField(
@@ -184,6 +197,7 @@ class Article(models.Model):
             models.Index(fields=['topic']),
             models.Index(fields=['source']),
             models.Index(fields=['is_analyzed']),
+            models.Index(fields=['analyzer_version']),
         ]
 
     def __str__(self):
@@ -197,3 +211,218 @@ class Article(models.Model):
         elif self.content:
             return self.content[:200] + "..." if len(self.content) > 200 else self.content
         return ""
+
+
+class CrawlRun(models.Model):
+    """Телеметрия одного парсинга источника."""
+
+    STATUS_CHOICES = [
+        ('success', 'Успешно'),
+        ('no_articles', 'Статьи не найдены'),
+        ('error', 'Ошибка'),
+    ]
+
+    TIER_CHOICES = [
+        ('core', 'Источник платформы'),
+        ('custom', 'Пользовательский источник'),
+    ]
+
+    FETCH_CHOICES = [
+        ('fetched', 'Загружено'),
+        ('coalesced', 'Получено от параллельной загрузки'),
+        ('cached', 'Из кэша загрузок'),
+        ('direct', 'Без объединения загрузок'),
+    ]
+
+    source = models.ForeignKey(
+        Source,
+        on_delete=models.CASCADE,
+        related_name='crawl_runs',
+        verbose_name="Источник"
+    )
+    tier = models.CharField(
+        max_length=10,
+        choices=TIER_CHOICES,
+        default='core',
+        verbose_name="Уровень"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        verbose_name="Статус"
+    )
+    fetch_outcome = models.CharField(
+        max_length=20,
+        choices=FETCH_CHOICES,
+        default='fetched',
+        verbose_name="Загрузка"
+    )
+    http_status = models.PositiveSmallIntegerField(
+        null=True, blank=True,
+        verbose_name="HTTP статус"
+    )
+    bytes_fetched = models.PositiveIntegerField(
+        null=True, blank=True,
+        verbose_name="Размер страницы (байт)"
+    )
+    fetch_ms = models.PositiveIntegerField(
+        null=True, blank=True,
+        verbose_name="Время загрузки (мс)"
+    )
+    parse_ms = models.PositiveIntegerField(
+        null=True, blank=True,
+        verbose_name="Время разбора (мс)"
+    )
+    containers_found = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Найдено контейнеров"
+    )
+    articles_found = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Извлечено статей"
+    )
+    new_articles = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Новых статей"
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name="Ошибка"
+    )
+    started_at = models.DateTimeField(verbose_name="Начало")
+    duration_ms = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Длительность (мс)"
+    )
+
+    class Meta:
+        verbose_name = "Парсинг источника"
+        verbose_name_plural = "Парсинги источников"
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['source', '-started_at']),
+            models.Index(fields=['started_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.source.name} - {self.get_status_display()} ({self.started_at:%Y-%m-%d %H:%M})"
+
+    @property
+    def extraction_yield(self):
+        """Доля контейнеров, из которых извлечена статья."""
+        if not self.containers_found:
+            return None
+        return self.articles_found / self.containers_found
+
+
+class ProfileReport(models.Model):
+    """Профиль медленного парсинга или анализа (core/profiling.py)."""
+
+    KIND_CHOICES = [
+        ('crawl', 'Парсинг источника'),
+        ('analysis', 'Анализ статьи'),
+    ]
+
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES,
+        verbose_name="Тип"
+    )
+    target = models.CharField(
+        max_length=255,
+        verbose_name="Объект"
+    )
+    source = models.ForeignKey(
+        Source,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='profile_reports',
+        verbose_name="Источник"
+    )
+    duration_ms = models.PositiveIntegerField(verbose_name="Длительность (мс)")
+    engine = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name="Профилировщик"
+    )
+    spans = models.JSONField(
+        default=list,
+        verbose_name="Этапы"
+    )
+    report = models.TextField(
+        blank=True,
+        verbose_name="Отчет"
+    )
+    raw = models.BinaryField(
+        null=True, blank=True,
+        verbose_name="Файл профиля"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создан")
+
+    class Meta:
+        verbose_name = "Профиль"
+        verbose_name_plural = "Профили"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.target} ({self.duration_ms} мс)"
+
+
+class ArticleExport(models.Model):
+    """Фоновая выгрузка статей в файл (api/export.py)."""
+
+    FORMAT_CHOICES = [
+        ('parquet', 'Parquet'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Готово'),
+        ('error', 'Ошибка'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='article_exports',
+        verbose_name="Пользователь"
+    )
+    format = models.CharField(
+        max_length=20,
+        choices=FORMAT_CHOICES,
+        default='parquet',
+        verbose_name="Формат"
+    )
+    params = models.JSONField(
+        default=dict,
+        verbose_name="Параметры",
+        help_text="Фильтры и поля выгрузки (query-параметры списка статей)"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name="Статус"
+    )
+    file = models.FileField(
+        upload_to='exports/%Y/%m/',
+        blank=True,
+        verbose_name="Файл"
+    )
+    rows = models.PositiveIntegerField(default=0, verbose_name="Строк")
+    size_bytes = models.PositiveBigIntegerField(default=0, verbose_name="Размер (байт)")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создана")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершена")
+
+    class Meta:
+        verbose_name = "Выгрузка статей"
+        verbose_name_plural = "Выгрузки статей"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_format_display()} #{self.pk} ({self.get_status_display()})"
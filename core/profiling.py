@@ -0,0 +1,179 @@
+"""
+Профилирование парсинга и анализа по запросу.
+
+Профилирование включается для отдельных источников и задач:
+- настройки PROFILING_SOURCES (ID или имена источников) и PROFILING_TASKS
+  (имена задач: parse_source, crawl_custom_source, analyze_article_text)
+- аргумент задачи profile=True (parse_source.delay(5, profile=True))
+
+Во время профилируемого запуска этапы парсера и анализатора записываются
+в именованные интервалы (span/record): загрузка, BeautifulSoup, поиск
+контейнеров по каждому селектору, извлечение полей, этапы анализа.
+Одноименные интервалы суммируются (время и количество).
+
+Если задан PROFILING_ENGINE (cprofile или pyinstrument), запуск
+дополнительно выполняется под профилировщиком. Отчет (ProfileReport)
+сохраняется, если запуск длился дольше PROFILING_SLOW_THRESHOLD_MS,
+и скачивается из админки: .prof для cProfile (snakeviz, pstats) или
+HTML для pyinstrument. Хранится не больше PROFILING_MAX_REPORTS отчетов.
+
+Вне профилируемого запуска span и record почти ничего не стоят:
+одна проверка ContextVar.
+"""
+
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_active: ContextVar[Optional['ProfileSession']] = ContextVar('profile_session', default=None)
+
+
+class ProfileSession:
+    """Интервалы одного профилируемого запуска."""
+
+    def __init__(self, kind: str, target: str):
+        self.kind = kind
+        self.target = target
+        self.spans: Dict[str, Dict[str, float]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        span = self.spans.setdefault(name, {'ms': 0.0, 'count': 0})
+        span['ms'] += seconds * 1000
+        span['count'] += 1
+
+    def as_list(self):
+        """Интервалы от самого долгого к самому короткому."""
+        return [
+            {'name': name, 'ms': round(span['ms'], 2), 'count': span['count']}
+            for name, span in sorted(self.spans.items(), key=lambda item: item[1]['ms'], reverse=True)
+        ]
+
+
+def is_enabled(task: str, source=None) -> bool:
+    """Включено ли профилирование задачи (и источника) в настройках."""
+    if task in getattr(settings, 'PROFILING_TASKS', ()):
+        return True
+    if source is not None:
+        sources = getattr(settings, 'PROFILING_SOURCES', ())
+        return source.id in sources or source.name in sources
+    return False
+
+
+@contextmanager
+def span(name: str):
+    """Интервал этапа внутри профилируемого запуска."""
+    session = _active.get()
+    if session is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        session.add(name, time.perf_counter() - started)
+
+
+def record(name: str, seconds: float) -> None:
+    """Добавляет уже измеренный интервал (когда время считается и для метрик)."""
+    session = _active.get()
+    if session is not None:
+        session.add(name, seconds)
+
+
+@contextmanager
+def profile_run(kind: str, target: str, enabled: bool, source=None):
+    """
+    Профилируемый запуск: интервалы этапов и, если настроено, профилировщик.
+
+    При enabled=False ничего не делает.
+    """
+    if not enabled or _active.get() is not None:
+        yield None
+        return
+
+    session = ProfileSession(kind, target)
+    token = _active.set(session)
+    engine = getattr(settings, 'PROFILING_ENGINE', 'cprofile')
+    profiler = _start_profiler(engine)
+    started = time.perf_counter()
+    try:
+        yield session
+    finally:
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        _active.reset(token)
+        report, raw = _stop_profiler(engine, profiler)
+        logger.info(f"Профиль {kind} {target}: {duration_ms} мс, этапы: {session.as_list()[:5]}")
+        if duration_ms >= getattr(settings, 'PROFILING_SLOW_THRESHOLD_MS', 5000):
+            _save_report(session, duration_ms, engine if profiler else '', report, raw, source)
+
+
+def _start_profiler(engine: Optional[str]):
+    if engine == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if engine == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument не установлен, профиль будет без стека вызовов")
+            return None
+        profiler = Profiler()
+        profiler.start()
+        return profiler
+    return None
+
+
+def _stop_profiler(engine: Optional[str], profiler):
+    """Останавливает профилировщик: (текстовый отчет, файл для скачивания)."""
+    if profiler is None:
+        return '', None
+
+    if engine == 'cprofile':
+        profiler.disable()
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(getattr(settings, 'PROFILING_TOP_FUNCTIONS', 40))
+        return stream.getvalue(), marshal.dumps(stats.stats)
+
+    profiler.stop()
+    return profiler.output_text(), profiler.output_html().encode('utf-8')
+
+
+def _save_report(session: ProfileSession, duration_ms: int, engine: str,
+                 report: str, raw: Optional[bytes], source=None) -> None:
+    from .models import ProfileReport
+
+    try:
+        ProfileReport.objects.create(
+            kind=session.kind,
+            target=session.target[:255],
+            source=source,
+            duration_ms=duration_ms,
+            engine=engine,
+            spans=session.as_list(),
+            report=report,
+            raw=raw,
+        )
+        keep = getattr(settings, 'PROFILING_MAX_REPORTS', 200)
+        stale = ProfileReport.objects.order_by('-created_at').values_list('id', flat=True)[keep:]
+        ProfileReport.objects.filter(id__in=list(stale)).delete()
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить профиль {session.kind} {session.target}: {e}")
+
+
+def download_name(report) -> str:
+    """Имя файла профиля для скачивания."""
+    extension = 'html' if report.engine == 'pyinstrument' else 'prof'
+    return f'profile-{report.kind}-{report.pk}.{extension}'
+
@@ -0,0 +1,59 @@
+"""
+Подсчет SQL-запросов и их суммарного времени.
+
+QueryCounter подключается к соединениям через execute_wrapper, поэтому
+работает и при DEBUG=False (в отличие от connection.queries) и не копит
+историю запросов между запросами к API. Используется в
+QueryCountMiddleware (заголовки ответа в режиме отладки) и в тестовом
+помощнике api.testing (бюджет запросов на эндпоинт).
+"""
+
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+
+class QueryCounter:
+    """
+    Контекстный менеджер, считающий запросы ко всем БД.
+
+        with QueryCounter() as counter:
+            ...
+        counter.count, counter.time_ms, counter.queries
+
+    Тексты запросов сохраняются только при keep_sql=True (для сообщений
+    об ошибках в тестах).
+    """
+
+    def __init__(self, keep_sql: bool = False):
+        self.keep_sql = keep_sql
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = []
+        self._stack = None
+
+    @property
+    def time_ms(self) -> float:
+        return round(self.seconds * 1000, 2)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+            if self.keep_sql:
+                self.queries.append(sql)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._stack = None
+        return False
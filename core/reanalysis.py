@@ -0,0 +1,122 @@
+"""
+Планировщик повторного анализа статей после смены версии анализатора.
+
+Каждая статья хранит версию анализатора, которым она обработана
+(Article.analyzer_version). Когда меняются словари тематик или модель spaCy,
+версия текущего анализатора меняется, и планировщик небольшими пачками
+отбирает статьи со старой версией:
+- сначала свежие статьи (за REANALYSIS_RECENT_DAYS), затем остальные
+- внутри группы - по количеству просмотров и дате публикации
+- пока очередь новых непроанализированных статей больше
+  REANALYSIS_MAX_PENDING_NEW, повторный анализ пропускается, чтобы не
+  задерживать анализ только что собранных статей
+- статьи, которые spaCy не смог разобрать (анализатор откатился на
+  legacy и поставил его версию), повторяются не раньше чем через
+  REANALYSIS_FALLBACK_RETRY_HOURS, а не на каждом запуске
+"""
+
+import logging
+import os
+from datetime import timedelta
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db.models import BooleanField, Case, Value, When
+from django.utils import timezone
+
+from core.models import Article
+
+logger = logging.getLogger(__name__)
+
+
+def current_version() -> str:
+    """Версия анализатора, которым сейчас анализируются статьи."""
+    if getattr(settings, 'USE_SPACY_ANALYZER', False):
+        try:
+            from core.spacy_analyzer import SpacyTextAnalyzer
+        except ImportError as e:
+            # Без spaCy задачи анализа переключаются на legacy-анализатор
+            logger.warning(f"spaCy недоступен, целевая версия - legacy: {e}")
+        else:
+            model_name = getattr(settings, 'SPACY_MODEL_NAME', SpacyTextAnalyzer.DEFAULT_MODEL)
+            if _spacy_model_installed(model_name):
+                return SpacyTextAnalyzer.namespace_for(model_name)
+            # Без модели анализатор откатывается на legacy и ставит его версию
+            logger.warning(f"Модель spaCy '{model_name}' не установлена, целевая версия - legacy")
+
+    from core.text_analyzer import TextAnalyzer
+    return TextAnalyzer.namespace()
+
+
+def _spacy_model_installed(model_name: str) -> bool:
+    """Установлена ли модель spaCy (пакет или каталог), без ее загрузки."""
+    import spacy.util
+    return spacy.util.is_package(model_name) or os.path.isdir(model_name)
+
+
+def stale_articles(version: str = None):
+    """Проанализированные статьи с версией анализатора, отличной от текущей."""
+    from core.text_analyzer import TextAnalyzer
+
+    version = version or current_version()
+    queryset = Article.objects.filter(
+        is_active=True,
+        is_analyzed=True
+    ).exclude(analyzer_version=version)
+
+    legacy_version = TextAnalyzer.namespace()
+    if version != legacy_version:
+        # Недавний откат на legacy - spaCy не справился с текстом, повтор позже
+        retry_since = timezone.now() - timedelta(
+            hours=getattr(settings, 'REANALYSIS_FALLBACK_RETRY_HOURS', 24)
+        )
+        queryset = queryset.exclude(analyzer_version=legacy_version, analyzed_at__gte=retry_since)
+    return queryset
+
+
+def pending_new_count() -> int:
+    """Количество новых статей, ожидающих первого анализа."""
+    return Article.objects.filter(is_active=True, is_analyzed=False).count()
+
+
+def plan_batch(batch_size: int = None, version: str = None) -> List[int]:
+    """ID статей для следующей пачки повторного анализа (в порядке приоритета)."""
+    batch_size = batch_size or getattr(settings, 'REANALYSIS_BATCH_SIZE', 200)
+    recent_since = timezone.now() - timedelta(days=getattr(settings, 'REANALYSIS_RECENT_DAYS', 7))
+
+    queryset = stale_articles(version).annotate(
+        is_recent=Case(
+            When(published_at__gte=recent_since, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        )
+    ).order_by('-is_recent', '-read_count', '-published_at', '-id')
+
+    return list(queryset.values_list('id', flat=True)[:batch_size])
+
+
+def next_batch(batch_size: int = None) -> Dict[str, Any]:
+    """
+    Решение планировщика на текущий запуск.
+
+    Возвращает {'status': 'disabled' | 'throttled' | 'up_to_date' | 'planned',
+    'version': ..., 'article_ids': [...], 'pending_new': ...}.
+    """
+    version = current_version()
+    decision = {'version': version, 'article_ids': [], 'pending_new': 0}
+
+    if not getattr(settings, 'REANALYSIS_ENABLED', True):
+        return {**decision, 'status': 'disabled'}
+
+    pending_new = pending_new_count()
+    decision['pending_new'] = pending_new
+    if pending_new >= getattr(settings, 'REANALYSIS_MAX_PENDING_NEW', 100):
+        logger.info(f"Повторный анализ отложен: {pending_new} новых статей ждут анализа")
+        return {**decision, 'status': 'throttled'}
+
+    article_ids = plan_batch(batch_size, version)
+    if not article_ids:
+        return {**decision, 'status': 'up_to_date'}
+
+    logger.info(f"Запланирован повторный анализ {len(article_ids)} статей (версия {version})")
+    return {**decision, 'status': 'planned', 'article_ids': article_ids}
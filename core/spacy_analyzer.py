@@ -5,12 +5,26 @@
 
 import spacy
 import logging
+import time
 from typing import List, Tuple, Dict, Any, Optional
 from collections import Counter
 from django.conf import settings
 
+from core import analysis_cache, metrics, profiling
+from core.text_analyzer import TOPIC_KEYWORDS, dictionary_digest
+
 logger = logging.getLogger(__name__)
 
+# Стоп-слова для фильтрации
+STOP_WORDS = {
+    'это', 'как', 'его', 'что', 'или', 'для', 'при', 'все', 'так',
+    'был', 'есть', 'уже', 'еще', 'чем', 'где', 'кто', 'они', 'она',
+    'и', 'в', 'на', 'с', 'по', 'к', 'о', 'от', 'до', 'за', 'под',
+    'над', 'между', 'через', 'из', 'у', 'а', 'но', 'да', 'же', 'ли',
+    'не', 'ни', 'бы', 'вы', 'мы', 'ты', 'он', 'то', 'тот', 'эта',
+    'быть', 'мочь', 'стать', 'сказать', 'говорить', 'знать', 'видеть'
+}
+
 
 class SpacyTextAnalyzer:
     """
@@ -22,8 +36,24 @@ class SpacyTextAnalyzer:
     - Part-of-Speech tagging
     - Векторные представления слов
     """
+
+    # Имя, версия, модель и хэш словарей входят в ключ кэша анализа
+    # и в Article.analyzer_version; версию увеличивают только при
+    # изменении алгоритма
+    ANALYZER_NAME = 'spacy'
+    ANALYZER_VERSION = '1'
+    DICTIONARY_DIGEST = dictionary_digest(TOPIC_KEYWORDS, STOP_WORDS)
+    DEFAULT_MODEL = 'ru_core_news_sm'
+
+    @classmethod
+    def namespace_for(cls, model_name: str) -> str:
+        return f'{cls.ANALYZER_NAME}:{cls.ANALYZER_VERSION}:{model_name}:{cls.DICTIONARY_DIGEST}'
+
+    @property
+    def cache_namespace(self) -> str:
+        return self.namespace_for(self.model_name)
     
-    def __init__(self, model_name: str = 'ru_core_news_sm'):
+    def __init__(self, model_name: str = DEFAULT_MODEL):
         """
         Инициализация анализатора.
         
@@ -34,80 +64,18 @@ class SpacyTextAnalyzer:
         self.nlp = None
         self._load_model()
         
-        # Словари тематик для гибридного подхода (fallback)
-        self.topic_keywords = {
-            'politics': [
-                'политик', 'выборы', 'президент', 'министр', 'правительство', 
-                'парламент', 'депутат', 'власть', 'оппозиция', 'партия',
-                'голосование', 'референдум', 'законопроект', 'дума', 'совет',
-                'мэр', 'губернатор', 'администрация', 'кандидат', 'кампания'
-            ],
-            'economics': [
-                'экономика', 'бюджет', 'налог', 'ввп', 'инфляция', 'банк',
-                'кредит', 'инвестиции', 'рынок', 'торговля', 'экспорт',
-                'импорт', 'валюта', 'рубль', 'доллар', 'евро', 'цена',
-                'стоимость', 'тариф', 'пошлина', 'санкции'
-            ],
-            'technology': [
-                'технология', 'компьютер', 'интернет', 'программа', 'софт',
-                'приложение', 'сайт', 'платформа', 'алгоритм', 'данные',
-                'цифровой', 'искусственный интеллект', 'роботы', 'автоматизация',
-                'стартап', 'it', 'разработка', 'программирование', 'код'
-            ],
-            'war': [
-                'война', 'конфликт', 'военный', 'армия', 'солдат', 'боевые',
-                'атака', 'операция', 'фронт', 'обстрел', 'ракета', 'танк',
-                'авиация', 'флот', 'оружие', 'защита', 'наступление', 'оборона',
-                'мир', 'перемирие', 'украина', 'россия', 'спецоперация'
-            ],
-            'science': [
-                'исследование', 'ученые', 'открытие', 'эксперимент', 'наука',
-                'научный', 'лаборатория', 'институт', 'университет', 'диссертация',
-                'публикация', 'журнал', 'конференция', 'симпозиум', 'академия'
-            ],
-            'health': [
-                'здоровье', 'медицина', 'врач', 'больница', 'лечение', 'болезнь',
-                'вирус', 'вакцина', 'эпидемия', 'пандемия', 'коронавирус',
-                'ковид', 'пациент', 'диагноз', 'терапия', 'операция'
-            ],
-            'sports': [
-                'спорт', 'футбол', 'хоккей', 'баскетбол', 'теннис', 'бокс',
-                'олимпиада', 'чемпионат', 'турнир', 'матч', 'игра', 'команда',
-                'спортсмен', 'тренер', 'стадион', 'соревнование', 'победа'
-            ],
-            'business': [
-                'бизнес', 'компания', 'корпорация', 'предприятие', 'фирма',
-                'организация', 'директор', 'менеджер', 'сделка', 'контракт',
-                'партнерство', 'слияние', 'поглощение', 'ipo', 'акции'
-            ],
-            'entertainment': [
-                'кино', 'фильм', 'актер', 'режиссер', 'музыка', 'концерт',
-                'альбом', 'песня', 'артист', 'театр', 'спектакль', 'шоу',
-                'телевидение', 'сериал', 'премьера', 'фестиваль'
-            ],
-            'culture': [
-                'культура', 'искусство', 'музей', 'выставка', 'картина',
-                'художник', 'скульптура', 'галерея', 'литература', 'книга',
-                'автор', 'писатель', 'поэт', 'библиотека', 'памятник'
-            ]
-        }
-        
-        # Стоп-слова для фильтрации
-        self.stop_words = {
-            'это', 'как', 'его', 'что', 'или', 'для', 'при', 'все', 'так',
-            'был', 'есть', 'уже', 'еще', 'чем', 'где', 'кто', 'они', 'она',
-            'и', 'в', 'на', 'с', 'по', 'к', 'о', 'от', 'до', 'за', 'под',
-            'над', 'между', 'через', 'из', 'у', 'а', 'но', 'да', 'же', 'ли',
-            'не', 'ни', 'бы', 'вы', 'мы', 'ты', 'он', 'то', 'тот', 'эта',
-            'быть', 'мочь', 'стать', 'сказать', 'говорить', 'знать', 'видеть'
-        }
+        # Словари тематик для гибридного подхода (fallback) - общие с legacy
+        self.topic_keywords = TOPIC_KEYWORDS
+        self.stop_words = STOP_WORDS
     
     def _load_model(self):
         """Загружает spaCy модель с обработкой ошибок."""
         try:
             self.nlp = spacy.load(self.model_name)
+            metrics.SPACY_MODEL_LOADS.labels(model=self.model_name, result='ok').inc()
             logger.info(f"spaCy модель '{self.model_name}' успешно загружена")
         except OSError as e:
+            metrics.SPACY_MODEL_LOADS.labels(model=self.model_name, result='error').inc()
             logger.error(f"Не удалось загрузить spaCy модель '{self.model_name}': {e}")
             logger.error("Убедитесь, что модель установлена: python -m spacy download ru_core_news_sm")
             raise
@@ -127,9 +95,24 @@ class SpacyTextAnalyzer:
         Returns:
             Dict с результатами анализа: topic, tags, locations, entities
         """
+        started = time.perf_counter()
+        result = analysis_cache.cached_analysis(
+            self.cache_namespace, title, summary, content,
+            lambda: self._analyze_spacy(title, content, summary)
+        )
+        if result is None:
+            # Результат fallback-анализа не кэшируется под ключом spaCy
+            result = self._fallback_analysis(title, content, summary)
+            metrics.ANALYZE_SECONDS.labels(analyzer='fallback').observe(time.perf_counter() - started)
+            return result
+        metrics.ANALYZE_SECONDS.labels(analyzer=self.ANALYZER_NAME).observe(time.perf_counter() - started)
+        return result
+
+    def _analyze_spacy(self, title: str, content: str, summary: str) -> Optional[Dict[str, Any]]:
+        """Анализ через spaCy без кэша (None - нужен fallback)."""
         if not self.nlp:
             logger.error("spaCy модель не загружена")
-            return self._fallback_analysis(title, content, summary)
+            return None
         
         try:
             # Объединяем весь доступный текст
@@ -140,13 +123,18 @@ class SpacyTextAnalyzer:
                 return {'topic': 'other', 'tags': [], 'locations': [], 'entities': []}
             
             # Обрабатываем текст через spaCy
-            doc = self.nlp(full_text)
+            with profiling.span('analyze:spacy_pipeline'):
+                doc = self.nlp(full_text)
             
             # Извлекаем различные типы информации
-            topic = self._determine_topic_spacy(doc, full_text.lower())
-            tags = self._extract_keywords_spacy(doc, title)
-            locations = self._extract_locations_spacy(doc)
-            entities = self._extract_entities_spacy(doc)
+            with profiling.span('analyze:topic'):
+                topic = self._determine_topic_spacy(doc, full_text.lower())
+            with profiling.span('analyze:keywords'):
+                tags = self._extract_keywords_spacy(doc, title)
+            with profiling.span('analyze:locations'):
+                locations = self._extract_locations_spacy(doc)
+            with profiling.span('analyze:entities'):
+                entities = self._extract_entities_spacy(doc)
             
             logger.info(f"spaCy анализ завершен: тема={topic}, тегов={len(tags)}, "
                        f"локаций={len(locations)}, сущностей={len(entities)}")
@@ -161,7 +149,7 @@ class SpacyTextAnalyzer:
         except Exception as e:
             logger.error(f"Ошибка spaCy анализа: {e}")
             logger.info("Переключаемся на fallback анализ")
-            return self._fallback_analysis(title, content, summary)
+            return None
     
     def _determine_topic_spacy(self, doc, text_lower: str) -> str:
         """
@@ -282,6 +270,9 @@ class SpacyTextAnalyzer:
         
         # Добавляем пустое поле entities для совместимости
         result['entities'] = []
+        # Статья получит версию legacy-анализатора и будет переанализирована
+        # не раньше REANALYSIS_FALLBACK_RETRY_HOURS (core/reanalysis.py)
+        result['analyzer_version'] = old_analyzer.cache_namespace
         
         return result
 
@@ -296,7 +287,18 @@ def analyze_article_content_spacy(article) -> Dict[str, Any]:
     Returns:
         Dict с результатами анализа
     """
-    analyzer = SpacyTextAnalyzer()
+    model_name = getattr(settings, 'SPACY_MODEL_NAME', SpacyTextAnalyzer.DEFAULT_MODEL)
+
+    # Проверяем кэш до загрузки модели - она самая дорогая часть
+    cached = analysis_cache.lookup(
+        SpacyTextAnalyzer.namespace_for(model_name),
+        article.title, article.summary, article.content
+    )
+    if cached is not None:
+        logger.info(f"Результат анализа статьи {article.id} взят из кэша")
+        return cached
+
+    analyzer = SpacyTextAnalyzer(model_name)
     
     try:
         result = analyzer.analyze_text(
@@ -1,3 +1,303 @@
-from django.test import TestCase
+import os
+import sqlite3
+from datetime import timedelta
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core import analysis_cache, analysis_executor, crawl_telemetry, metrics, reanalysis, trending, view_counter
+from core.kvstore import MemoryStore, reset_store
+from core.models import Article, CrawlRun, Source
+
+
+class SharedMemoryStore(MemoryStore):
+    """MemoryStore, который ведет себя как общее хранилище (Redis)."""
+    is_shared = True
+
+
+@override_settings(VIEW_COUNTER_FLUSH_INTERVAL=0)
+class ViewCounterFlushTests(SimpleTestCase):
+    """Просмотры пишутся в БД из запроса только без общего хранилища."""
+
+    def tearDown(self):
+        reset_store(None)
+
+    def test_shared_store_leaves_flush_to_beat_task(self):
+        reset_store(SharedMemoryStore())
+        with patch.object(view_counter, 'flush_pending_views') as flush:
+            view_counter.record_view(1)
+        flush.assert_not_called()
+        self.assertEqual(view_counter.get_pending_counts([1]), {1: 1})
+
+    def test_process_store_flushes_inline(self):
+        reset_store(MemoryStore())
+        with patch.object(view_counter, 'flush_pending_views') as flush:
+            view_counter.record_view(1)
+        flush.assert_called_once_with()
+
+
+class ViewCounterRollbackTests(TestCase):
+    """Ошибка посреди сброса не засчитывает просмотры дважды."""
+
+    def tearDown(self):
+        reset_store(None)
+
+    def test_failed_flush_rolls_back_committed_deltas(self):
+        from django.db.models.query import QuerySet
+
+        reset_store(MemoryStore())
+        source = Source.objects.create(name='Источник', url='https://example.com', type='html')
+        first, second = [
+            Article.objects.create(
+                title=f'Статья {index}', url=f'https://example.com/{index}', source=source,
+                published_at=timezone.now()
+            )
+            for index in range(2)
+        ]
+        store = view_counter.get_store()
+        store.hincrby(view_counter.PENDING_VIEWS_KEY, str(first.id), 1)
+        store.hincrby(view_counter.PENDING_VIEWS_KEY, str(second.id), 2)
+
+        update = QuerySet.update
+        calls = []
+
+        def fail_second_update(queryset, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise RuntimeError('БД недоступна')
+            return update(queryset, **kwargs)
+
+        with patch.object(QuerySet, 'update', fail_second_update), self.assertRaises(RuntimeError):
+            view_counter.flush_pending_views()
+        self.assertEqual(sorted(Article.objects.values_list('read_count', flat=True)), [0, 0])
+        self.assertEqual(view_counter.get_all_pending_counts(), {first.id: 1, second.id: 2})
+
+        view_counter.flush_pending_views()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.read_count, second.read_count), (1, 2))
+
+
+@patch.object(metrics, 'PROMETHEUS_AVAILABLE', True)
+@patch.object(metrics, 'render_latest', lambda: b'')
+class MetricsAccessTests(SimpleTestCase):
+    """/metrics без токена доступен только в режиме отладки."""
+
+    @override_settings(METRICS_AUTH_TOKEN='', DEBUG=False)
+    def test_no_token_hidden_in_production(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICS_AUTH_TOKEN='', DEBUG=True)
+    def test_no_token_open_in_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_AUTH_TOKEN='secret', DEBUG=False)
+    def test_token_required(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+
+class TrendingReadPathTests(TestCase):
+    """Эндпоинт трендов только читает материализованные списки."""
+
+    def tearDown(self):
+        reset_store(None)
+
+    def test_process_store_never_materializes_in_request(self):
+        reset_store(MemoryStore())
+        with patch.object(trending, 'materialize_trending') as materialize:
+            self.assertIsNone(trending.get_trending_ids())
+        materialize.assert_not_called()
+
+    def test_shared_store_reads_materialized_lists(self):
+        reset_store(SharedMemoryStore())
+        source = Source.objects.create(name='Источник', url='https://example.com', type='html')
+        articles = [
+            Article.objects.create(
+                title=f'Статья {index}', url=f'https://example.com/{index}', source=source,
+                published_at=timezone.now(), topic='sports'
+            )
+            for index in range(3)
+        ]
+        self.assertIsNone(trending.get_trending_ids())
+
+        for views, article in zip([1, 3, 2], articles):
+            for _ in range(views):
+                trending.record_view(article.id)
+        trending.materialize_trending()
+
+        expected = [articles[1].id, articles[2].id, articles[0].id]
+        self.assertEqual(trending.get_trending_ids(), expected)
+        self.assertEqual(trending.get_trending_ids(topic='sports'), expected)
+        self.assertEqual(trending.get_trending_ids(topic='politics'), [])
+
+    def test_empty_materialized_list_skips_database(self):
+        from django.urls import reverse
+
+        reset_store(SharedMemoryStore())
+        trending.materialize_trending()
+        self.assertEqual(trending.get_trending_ids(topic='politics'), [])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('api:trending-articles'), {'topic': 'politics'})
+        self.assertEqual(response.data, {'count': 0, 'results': []})
+
+
+class AnalysisExecutorTests(SimpleTestCase):
+    """Пул процессов анализа."""
+
+    payloads = [
+        (1, 'Президент подписал закон о бюджете', '', 'Министр финансов рассказал о налогах.'),
+        (2, 'Сборная выиграла матч чемпионата', '', 'Футбольная команда победила на стадионе.'),
+    ]
+
+    def tearDown(self):
+        analysis_executor.close_shared_executor()
+
+    def test_results_carry_analyzer_version(self):
+        with analysis_executor.AnalysisExecutor(workers=2, chunk_size=1,
+                                                spec=analysis_executor.LEGACY_SPEC) as executor:
+            results = list(executor.map(self.payloads))
+
+        self.assertEqual([article_id for article_id, _, _ in results], [1, 2])
+        for _, result, error in results:
+            self.assertIsNone(error)
+            self.assertEqual(result['analyzer_version'], analysis_executor.TextAnalyzer.namespace())
+
+    def test_unavailable_spacy_model_falls_back_to_legacy(self):
+        analyzer = analysis_executor._create_analyzer(('spacy', 'missing_model'))
+        self.assertIsInstance(analyzer, analysis_executor.TextAnalyzer)
+
+    @override_settings(USE_SPACY_ANALYZER=False, ANALYSIS_WORKERS=2)
+    def test_shared_executor_is_reused(self):
+        executor = analysis_executor.get_shared_executor()
+        self.assertIs(analysis_executor.get_shared_executor(), executor)
+        self.assertEqual(len(list(executor.map(self.payloads))), 2)
+
+
+class AnalyzerVersionTests(SimpleTestCase):
+    """Версия анализатора меняется вместе со словарями."""
+
+    def test_dictionary_change_changes_version(self):
+        from core.text_analyzer import LOCATIONS, STOP_WORDS, TOPIC_KEYWORDS, TextAnalyzer, dictionary_digest
+
+        self.assertTrue(TextAnalyzer.namespace().endswith(TextAnalyzer.DICTIONARY_DIGEST))
+        self.assertEqual(
+            dictionary_digest(TOPIC_KEYWORDS, LOCATIONS, set(sorted(STOP_WORDS, reverse=True))),
+            TextAnalyzer.DICTIONARY_DIGEST
+        )
+        sports = TOPIC_KEYWORDS['sports'] + ['регби']
+        self.assertNotEqual(
+            dictionary_digest({**TOPIC_KEYWORDS, 'sports': sports}, LOCATIONS, STOP_WORDS),
+            TextAnalyzer.DICTIONARY_DIGEST
+        )
+        self.assertNotEqual(
+            dictionary_digest(TOPIC_KEYWORDS, LOCATIONS + ['тула'], STOP_WORDS),
+            TextAnalyzer.DICTIONARY_DIGEST
+        )
+
+
+class AnalysisCacheDiskTests(SimpleTestCase):
+    """Дисковый уровень кэша анализа."""
+
+    def used_at(self, path):
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT used_at FROM analysis_cache").fetchone()[0]
+
+    @patch.object(analysis_cache, 'TOUCH_EVERY', 3)
+    def test_hits_touch_used_at_in_batches(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite3')
+            analysis_cache.AnalysisCache(path=path).set('legacy:1', 'abc', {'topic': 'sports'})
+            written_at = self.used_at(path)
+
+            reader = analysis_cache.AnalysisCache(path=path)
+            for _ in range(2):
+                # пустой уровень в памяти - чтение с диска
+                reader._memory.clear()
+                self.assertEqual(reader.get('legacy:1', 'abc'), {'topic': 'sports'})
+            self.assertEqual(self.used_at(path), written_at)
+
+            reader._memory.clear()
+            reader.get('legacy:1', 'abc')
+            self.assertGreater(self.used_at(path), written_at)
+
+
+class ReanalysisPlanTests(TestCase):
+    """Отбор статей для повторного анализа."""
+
+    spacy_version = 'spacy:1:ru_core_news_sm'
+
+    def setUp(self):
+        self.legacy_version = analysis_executor.TextAnalyzer.namespace()
+        self.source = Source.objects.create(name='Источник', url='https://example.com', type='html')
+
+    def add_article(self, index, version, analyzed_at):
+        return Article.objects.create(
+            title=f'Статья {index}', url=f'https://example.com/{index}', source=self.source,
+            published_at=timezone.now(), is_analyzed=True, analyzer_version=version, analyzed_at=analyzed_at
+        )
+
+    @override_settings(REANALYSIS_FALLBACK_RETRY_HOURS=24)
+    def test_recent_fallback_is_retried_later(self):
+        old_legacy = self.add_article(1, self.legacy_version, timezone.now() - timedelta(days=3))
+        self.add_article(2, self.legacy_version, timezone.now())
+        self.add_article(3, self.spacy_version, timezone.now())
+
+        self.assertEqual(reanalysis.plan_batch(version=self.spacy_version), [old_legacy.id])
+
+    def test_legacy_target_has_no_backoff(self):
+        article = self.add_article(1, 'legacy:0', timezone.now())
+        self.assertEqual(reanalysis.plan_batch(version=self.legacy_version), [article.id])
+
+    @override_settings(USE_SPACY_ANALYZER=True, SPACY_MODEL_NAME='missing_model')
+    def test_missing_model_targets_legacy(self):
+        self.assertEqual(reanalysis.current_version(), self.legacy_version)
+
+
+class CrawlTelemetryTests(TestCase):
+    """Агрегация телеметрии парсинга."""
+
+    def setUp(self):
+        self.slow = Source.objects.create(name='Медленный', url='https://slow.example.com', type='html')
+        self.fast = Source.objects.create(name='Быстрый', url='https://fast.example.com', type='html')
+        now = timezone.now()
+        CrawlRun.objects.bulk_create([
+            CrawlRun(source=self.slow, status='success', fetch_outcome='fetched', started_at=now,
+                     fetch_ms=100, containers_found=10, articles_found=8, new_articles=4),
+            # объединенная загрузка: статьи есть, контейнеры не считались
+            CrawlRun(source=self.slow, status='success', fetch_outcome='coalesced', started_at=now,
+                     fetch_ms=300, containers_found=0, articles_found=8, new_articles=0),
+            CrawlRun(source=self.slow, status='error', started_at=now, error='timeout'),
+            CrawlRun(source=self.fast, status='success', fetch_outcome='direct', started_at=now,
+                     fetch_ms=50, containers_found=5, articles_found=5, new_articles=5),
+            CrawlRun(source=self.fast, status='success', started_at=now - timedelta(days=10),
+                     fetch_ms=5000, containers_found=5, articles_found=1),
+        ])
+
+    def test_source_metrics(self):
+        slow, fast = crawl_telemetry.source_metrics(days=7)
+
+        self.assertEqual(slow['source_id'], self.slow.id)
+        self.assertEqual((slow['runs'], slow['errors']), (3, 1))
+        self.assertEqual(slow['error_rate'], 0.333)
+        self.assertEqual(slow['fetch_ms'], {'p50': 200, 'p95': 290})
+        self.assertEqual((slow['containers_found'], slow['articles_found']), (10, 16))
+        self.assertEqual(slow['extraction_yield'], 0.8)
+        self.assertEqual(slow['new_ratio'], 0.25)
+
+        self.assertEqual(fast['runs'], 1)
+        self.assertEqual(fast['extraction_yield'], 1.0)
+
+    def test_yield_ignores_coalesced_only_days(self):
+        CrawlRun.objects.filter(fetch_outcome='fetched').delete()
+        slow = crawl_telemetry.source_metrics(days=7, source_id=self.slow.id)[0]
+        self.assertIsNone(slow['extraction_yield'])
+
+    def test_yield_trend(self):
+        trend = crawl_telemetry.yield_trend(self.fast.id, days=30)
+        self.assertEqual([day['runs'] for day in trend], [1, 1])
+        self.assertEqual([day['extraction_yield'] for day in trend], [0.2, 1.0])
@@ -3,94 +3,132 @@
 Определяет тематику, ключевые слова и географические упоминания.
 """
 
+import hashlib
+import json
 import re
 import logging
+import time
 from typing import List, Tuple, Dict, Any
 from collections import Counter
 
+from core import analysis_cache, metrics, profiling
+
 logger = logging.getLogger(__name__)
 
+# Словари ключевых слов для определения тематики
+TOPIC_KEYWORDS = {
+    'politics': [
+        'политик', 'выборы', 'президент', 'министр', 'правительство', 
+        'парламент', 'депутат', 'власть', 'оппозиция', 'партия',
+        'голосование', 'референдум', 'законопроект', 'дума', 'совет',
+        'мэр', 'губернатор', 'администрация', 'кандидат', 'кампания'
+    ],
+    'economics': [
+        'экономика', 'бюджет', 'налог', 'ввп', 'инфляция', 'банк',
+        'кредит', 'инвестиции', 'рынок', 'торговля', 'экспорт',
+        'импорт', 'валюта', 'рубль', 'доллар', 'евро', 'цена',
+        'стоимость', 'тариф', 'пошлина', 'санкции'
+    ],
+    'technology': [
+        'технология', 'компьютер', 'интернет', 'программа', 'софт',
+        'приложение', 'сайт', 'платформа', 'алгоритм', 'данные',
+        'цифровой', 'искусственный интеллект', 'роботы', 'автоматизация',
+        'стартап', 'it', 'разработка', 'программирование', 'код'
+    ],
+    'war': [
+        'война', 'конфликт', 'военный', 'армия', 'солдат', 'боевые',
+        'атака', 'операция', 'фронт', 'обстрел', 'ракета', 'танк',
+        'авиация', 'флот', 'оружие', 'защита', 'наступление', 'оборона',
+        'мир', 'перемирие', 'украина', 'россия', 'спецоперация'
+    ],
+    'science': [
+        'исследование', 'ученые', 'открытие', 'эксперимент', 'наука',
+        'научный', 'лаборатория', 'институт', 'университет', 'диссертация',
+        'публикация', 'журнал', 'конференция', 'симпозиум', 'академия'
+    ],
+    'health': [
+        'здоровье', 'медицина', 'врач', 'больница', 'лечение', 'болезнь',
+        'вирус', 'вакцина', 'эпидемия', 'пандемия', 'коронавирус',
+        'ковид', 'пациент', 'диагноз', 'терапия', 'операция'
+    ],
+    'sports': [
+        'спорт', 'футбол', 'хоккей', 'баскетбол', 'теннис', 'бокс',
+        'олимпиада', 'чемпионат', 'турнир', 'матч', 'игра', 'команда',
+        'спортсмен', 'тренер', 'стадион', 'соревнование', 'победа'
+    ],
+    'business': [
+        'бизнес', 'компания', 'корпорация', 'предприятие', 'фирма',
+        'организация', 'директор', 'менеджер', 'сделка', 'контракт',
+        'партнерство', 'слияние', 'поглощение', 'ipo', 'акции'
+    ],
+    'entertainment': [
+        'кино', 'фильм', 'актер', 'режиссер', 'музыка', 'концерт',
+        'альбом', 'песня', 'артист', 'театр', 'спектакль', 'шоу',
+        'телевидение', 'сериал', 'премьера', 'фестиваль'
+    ],
+    'culture': [
+        'культура', 'искусство', 'музей', 'выставка', 'картина',
+        'художник', 'скульптура', 'галерея', 'литература', 'книга',
+        'автор', 'писатель', 'поэт', 'библиотека', 'памятник'
+    ]
+}
+
+# Географические названия (можно расширить)
+LOCATIONS = [
+    # Страны
+    'россия', 'украина', 'беларусь', 'казахстан', 'китай', 'сша',
+    'германия', 'франция', 'италия', 'япония', 'индия', 'бразилия',
+
+    # Города России
+    'москва', 'санкт-петербург', 'новосибирск', 'екатеринбург',
+    'казань', 'челябинск', 'омск', 'самара', 'ростов-на-дону',
+    'уфа', 'красноярск', 'воронеж', 'пермь', 'волгоград',
+
+    # Зарубежные города
+    'киев', 'минск', 'алматы', 'пекин', 'токио', 'нью-йорк',
+    'лондон', 'париж', 'берлин', 'рим', 'мадрид', 'варшава',
+
+    # Регионы
+    'сибирь', 'урал', 'дальний восток', 'кавказ', 'крым', 'донбасс'
+]
+
+# Служебные слова, не попадающие в теги
+STOP_WORDS = {
+    'это', 'как', 'его', 'что', 'или', 'для', 'при', 'все', 'так',
+    'был', 'есть', 'уже', 'еще', 'чем', 'где', 'кто', 'они', 'она',
+    'и', 'в', 'на', 'с', 'по', 'к', 'о', 'от', 'до', 'за', 'под',
+    'над', 'между', 'через', 'из', 'у', 'а', 'но', 'да', 'же', 'ли',
+    'не', 'ни', 'бы', 'вы', 'мы', 'ты', 'он', 'то', 'тот', 'эта'
+}
+
+
+def dictionary_digest(*tables) -> str:
+    """Короткий хэш словарей анализатора: меняется при любой их правке."""
+    raw = json.dumps(tables, ensure_ascii=False, sort_keys=True, default=sorted)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]
+
 
 class TextAnalyzer:
     """Анализатор текста для определения тематики, тегов и локаций."""
+
+    # Имя, версия и хэш словарей входят в ключ кэша анализа и в
+    # Article.analyzer_version. Правка словарей меняет хэш сама, версию
+    # нужно увеличить только при изменении алгоритма
+    ANALYZER_NAME = 'legacy'
+    ANALYZER_VERSION = '1'
+    DICTIONARY_DIGEST = dictionary_digest(TOPIC_KEYWORDS, LOCATIONS, STOP_WORDS)
+
+    @classmethod
+    def namespace(cls) -> str:
+        return f'{cls.ANALYZER_NAME}:{cls.ANALYZER_VERSION}:{cls.DICTIONARY_DIGEST}'
+
+    @property
+    def cache_namespace(self) -> str:
+        return self.namespace()
     
     def __init__(self):
-        # Словари ключевых слов для определения тематики
-        self.topic_keywords = {
-            'politics': [
-                'политик', 'выборы', 'президент', 'министр', 'правительство', 
-                'парламент', 'депутат', 'власть', 'оппозиция', 'партия',
-                'голосование', 'референдум', 'законопроект', 'дума', 'совет',
-                'мэр', 'губернатор', 'администрация', 'кандидат', 'кампания'
-            ],
-            'economics': [
-                'экономика', 'бюджет', 'налог', 'ввп', 'инфляция', 'банк',
-                'кредит', 'инвестиции', 'рынок', 'торговля', 'экспорт',
-                'импорт', 'валюта', 'рубль', 'доллар', 'евро', 'цена',
-                'стоимость', 'тариф', 'пошлина', 'санкции'
-            ],
-            'technology': [
-                'технология', 'компьютер', 'интернет', 'программа', 'софт',
-                'приложение', 'сайт', 'платформа', 'алгоритм', 'данные',
-                'цифровой', 'искусственный интеллект', 'роботы', 'автоматизация',
-                'стартап', 'it', 'разработка', 'программирование', 'код'
-            ],
-            'war': [
-                'война', 'конфликт', 'военный', 'армия', 'солдат', 'боевые',
-                'атака', 'операция', 'фронт', 'обстрел', 'ракета', 'танк',
-                'авиация', 'флот', 'оружие', 'защита', 'наступление', 'оборона',
-                'мир', 'перемирие', 'украина', 'россия', 'спецоперация'
-            ],
-            'science': [
-                'исследование', 'ученые', 'открытие', 'эксперимент', 'наука',
-                'научный', 'лаборатория', 'институт', 'университет', 'диссертация',
-                'публикация', 'журнал', 'конференция', 'симпозиум', 'академия'
-            ],
-            'health': [
-                'здоровье', 'медицина', 'врач', 'больница', 'лечение', 'болезнь',
-                'вирус', 'вакцина', 'эпидемия', 'пандемия', 'коронавирус',
-                'ковид', 'пациент', 'диагноз', 'терапия', 'операция'
-            ],
-            'sports': [
-                'спорт', 'футбол', 'хоккей', 'баскетбол', 'теннис', 'бокс',
-                'олимпиада', 'чемпионат', 'турнир', 'матч', 'игра', 'команда',
-                'спортсмен', 'тренер', 'стадион', 'соревнование', 'победа'
-            ],
-            'business': [
-                'бизнес', 'компания', 'корпорация', 'предприятие', 'фирма',
-                'организация', 'директор', 'менеджер', 'сделка', 'контракт',
-                'партнерство', 'слияние', 'поглощение', 'ipo', 'акции'
-            ],
-            'entertainment': [
-                'кино', 'фильм', 'актер', 'режиссер', 'музыка', 'концерт',
-                'альбом', 'песня', 'артист', 'театр', 'спектакль', 'шоу',
-                'телевидение', 'сериал', 'премьера', 'фестиваль'
-            ],
-            'culture': [
-                'культура', 'искусство', 'музей', 'выставка', 'картина',
-                'художник', 'скульптура', 'галерея', 'литература', 'книга',
-                'автор', 'писатель', 'поэт', 'библиотека', 'памятник'
-            ]
-        }
-        
-        # Географические названия (можно расширить)
-        self.locations = [
-            # Страны
-            'россия', 'украина', 'беларусь', 'казахстан', 'китай', 'сша',
-            'германия', 'франция', 'италия', 'япония', 'индия', 'бразилия',
-            
-            # Города России
-            'москва', 'санкт-петербург', 'новосибирск', 'екатеринбург',
-            'казань', 'челябинск', 'омск', 'самара', 'ростов-на-дону',
-            'уфа', 'красноярск', 'воронеж', 'пермь', 'волгоград',
-            
-            # Зарубежные города
-            'киев', 'минск', 'алматы', 'пекин', 'токио', 'нью-йорк',
-            'лондон', 'париж', 'берлин', 'рим', 'мадрид', 'варшава',
-            
-            # Регионы
-            'сибирь', 'урал', 'дальний восток', 'кавказ', 'крым', 'донбасс'
-        ]
+        self.topic_keywords = TOPIC_KEYWORDS
+        self.locations = LOCATIONS
     
     def analyze_text(self, title: str, content: str = "", summary: str = "") -> Dict[str, Any]:
         """
@@ -104,18 +142,31 @@ class TextAnalyzer:
         Returns:
             Dict с результатами анализа: topic, tags, locations
         """
+        started = time.perf_counter()
+        result = analysis_cache.cached_analysis(
+            self.cache_namespace, title, summary, content,
+            lambda: self._analyze(title, content, summary)
+        )
+        metrics.ANALYZE_SECONDS.labels(analyzer=self.ANALYZER_NAME).observe(time.perf_counter() - started)
+        return result
+
+    def _analyze(self, title: str, content: str, summary: str) -> Dict[str, Any]:
+        """Анализ без кэша."""
         # Объединяем весь доступный текст
         full_text = f"{title} {summary} {content}"
         text_lower = full_text.lower()
         
         # Определяем тематику
-        topic = self._determine_topic(text_lower)
+        with profiling.span('analyze:topic'):
+            topic = self._determine_topic(text_lower)
         
         # Извлекаем ключевые слова
-        tags = self._extract_keywords(text_lower, title)
+        with profiling.span('analyze:keywords'):
+            tags = self._extract_keywords(text_lower, title)
         
         # Находим географические упоминания
-        locations = self._find_locations(text_lower)
+        with profiling.span('analyze:locations'):
+            locations = self._find_locations(text_lower)
         
         logger.info(f"Анализ завершен: тема={topic}, тегов={len(tags)}, локаций={len(locations)}")
         
@@ -156,13 +207,7 @@ class TextAnalyzer:
         words = cleaned_text.split()
         
         # Исключаем служебные слова
-        stop_words = {
-            'это', 'как', 'его', 'что', 'или', 'для', 'при', 'все', 'так',
-            'был', 'есть', 'уже', 'еще', 'чем', 'где', 'кто', 'они', 'она',
-            'и', 'в', 'на', 'с', 'по', 'к', 'о', 'от', 'до', 'за', 'под',
-            'над', 'между', 'через', 'из', 'у', 'а', 'но', 'да', 'же', 'ли',
-            'не', 'ни', 'бы', 'вы', 'мы', 'ты', 'он', 'то', 'тот', 'эта'
-        }
+        stop_words = STOP_WORDS
         
         # Ищем важные слова (длиннее 3 символов, не служебные)
         word_freq = Counter()
@@ -0,0 +1,136 @@
+"""
+Движок трендов: затухающий рейтинг статей по просмотрам.
+
+Каждый просмотр добавляет статье вес exp((t - EPOCH) / tau) (forward decay).
+Сумма хранится в логарифмической шкале в sorted set быстрого хранилища,
+поэтому порядок статей всегда соответствует экспоненциально взвешенной
+скорости просмотров с периодом полураспада TRENDING_HALF_LIFE_HOURS,
+а пересчитывать старые счета не нужно.
+
+Фоновая задача materialize_trending раз в минуту собирает топ-N статей
+(общий, по темам и по источникам) и сохраняет готовые списки ID —
+эндпоинт трендов только читает их.
+"""
+
+import json
+import logging
+import math
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.kvstore import get_store
+
+logger = logging.getLogger(__name__)
+
+SCORES_KEY = 'trending:scores'
+TOP_KEY_PREFIX = 'trending:top:'
+MATERIALIZED_AT_KEY = 'trending:materialized_at'
+
+# Точка отсчета forward decay; счета хранятся как ln(sum(exp((t - EPOCH) / tau)))
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc).timestamp()
+
+
+def _tau() -> float:
+    """Постоянная затухания в секундах."""
+    half_life_hours = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 6)
+    return half_life_hours * 3600 / math.log(2)
+
+
+def record_view(article_id: int, weight: float = 1.0) -> None:
+    """Учитывает просмотр статьи в затухающем рейтинге."""
+    log_weight = (time.time() - EPOCH) / _tau() + math.log(weight)
+    get_store().zlogaddexp(SCORES_KEY, str(article_id), log_weight)
+
+
+def top_key(topic: Optional[str] = None, source_id: Optional[int] = None) -> str:
+    """Ключ материализованного списка для заданного среза."""
+    if topic:
+        return f'{TOP_KEY_PREFIX}topic:{topic}'
+    if source_id:
+        return f'{TOP_KEY_PREFIX}source:{source_id}'
+    return f'{TOP_KEY_PREFIX}global'
+
+
+def get_trending_ids(topic: Optional[str] = None, source_id: Optional[int] = None) -> Optional[List[int]]:
+    """
+    Возвращает материализованный список ID статей или None.
+
+    None означает, что рейтинг еще не материализован (холодный старт) или
+    недоступен, и вызывающий код должен использовать запасной вариант.
+    Рейтинг материализует только задача materialize_trending: хранилище в
+    памяти процесса (memory://) ей не видно, поэтому для него всегда None.
+    """
+    store = get_store()
+    if not store.is_shared or store.get(MATERIALIZED_AT_KEY) is None:
+        return None
+
+    raw = store.get(top_key(topic, source_id))
+    return json.loads(raw) if raw else []
+
+
+def materialize_trending() -> Dict[str, int]:
+    """
+    Пересчитывает и сохраняет топ-N статей по всем срезам.
+
+    Кандидаты берутся из вершины рейтинга и фильтруются по окну
+    публикации TRENDING_WINDOW_DAYS и активности статьи.
+    """
+    from core.models import Article
+
+    store = get_store()
+    tau = _tau()
+    now = time.time()
+    top_n = getattr(settings, 'TRENDING_TOP_N', 20)
+    candidates_limit = getattr(settings, 'TRENDING_CANDIDATES', 1000)
+    window_days = getattr(settings, 'TRENDING_WINDOW_DAYS', 7)
+    ttl = getattr(settings, 'TRENDING_MATERIALIZE_TTL', 300)
+
+    # Статьи, чей затухший вес меньше 0.01 просмотра, выпадают из рейтинга
+    store.zremrangebyscore(SCORES_KEY, float('-inf'), (now - EPOCH) / tau + math.log(0.01))
+
+    ranked = store.zrevrange(SCORES_KEY, 0, candidates_limit - 1)
+    ranked_ids = [int(member) for member, _ in ranked]
+
+    window_start = timezone.now() - timedelta(days=window_days)
+    rows = Article.objects.filter(
+        id__in=ranked_ids,
+        is_active=True,
+        published_at__gte=window_start
+    ).values_list('id', 'topic', 'source_id')
+    meta = {article_id: (topic, source_id) for article_id, topic, source_id in rows}
+
+    global_top = []
+    by_topic = defaultdict(list)
+    by_source = defaultdict(list)
+    for article_id in ranked_ids:
+        if article_id not in meta:
+            continue
+        topic, source_id = meta[article_id]
+        if len(global_top) < top_n:
+            global_top.append(article_id)
+        if len(by_topic[topic]) < top_n:
+            by_topic[topic].append(article_id)
+        if len(by_source[source_id]) < top_n:
+            by_source[source_id].append(article_id)
+
+    store.set(top_key(), json.dumps(global_top), ttl)
+    for topic, ids in by_topic.items():
+        store.set(top_key(topic=topic), json.dumps(ids), ttl)
+    for source_id, ids in by_source.items():
+        store.set(top_key(source_id=source_id), json.dumps(ids), ttl)
+    store.set(MATERIALIZED_AT_KEY, str(now), ttl)
+
+    logger.debug(f"Тренды материализованы: {len(global_top)} статей, "
+                 f"{len(by_topic)} тем, {len(by_source)} источников")
+
+    return {
+        'candidates': len(ranked_ids),
+        'trending': len(global_top),
+        'topics': len(by_topic),
+        'sources': len(by_source),
+    }
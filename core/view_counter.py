@@ -0,0 +1,108 @@
+"""
+Write-behind счетчик просмотров статей.
+
+Вместо UPDATE на каждый GET просмотры накапливаются в быстром хранилище
+(core.kvstore) и периодически сбрасываются в БД пакетными
+UPDATE ... SET read_count = read_count + N через F()-выражения.
+
+Сброс выполняется Celery-задачей flush_article_views по расписанию.
+Только для memory://, где буфер не виден воркерам, процесс сбрасывает
+его сам не чаще VIEW_COUNTER_FLUSH_INTERVAL секунд; с общим хранилищем
+запрос просмотра в БД не пишет.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from core.kvstore import get_store
+
+logger = logging.getLogger(__name__)
+
+PENDING_VIEWS_KEY = 'views:pending'
+
+_flush_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def record_view(article_id: int) -> None:
+    """Регистрирует просмотр статьи в буфере."""
+    store = get_store()
+    store.hincrby(PENDING_VIEWS_KEY, str(article_id), 1)
+    if not store.is_shared:
+        _maybe_flush()
+
+
+def get_pending_counts(article_ids: Iterable[int]) -> Dict[int, int]:
+    """Возвращает еще не сброшенные в БД просмотры для указанных статей."""
+    pending = get_store().hmget(PENDING_VIEWS_KEY, [str(pk) for pk in article_ids])
+    return {int(pk): count for pk, count in pending.items()}
+
+
+def get_all_pending_counts() -> Dict[int, int]:
+    """Возвращает весь буфер просмотров {article_id: количество}."""
+    return {int(pk): count for pk, count in get_store().hgetall(PENDING_VIEWS_KEY).items()}
+
+
+def flush_pending_views() -> Dict[str, int]:
+    """
+    Сбрасывает накопленные просмотры в БД.
+
+    Статьи группируются по величине прироста, поэтому на сброс уходит
+    по одному UPDATE на каждое уникальное значение, а не на каждую статью.
+    Все UPDATE выполняются в одной транзакции: при ошибке БД ни один
+    прирост не остается записанным, и просмотры целиком возвращаются в буфер.
+    """
+    from core.models import Article
+
+    store = get_store()
+    pending = store.hpop_all(PENDING_VIEWS_KEY)
+    if not pending:
+        return {'articles': 0, 'views': 0}
+
+    by_delta = defaultdict(list)
+    for article_id, delta in pending.items():
+        if delta > 0:
+            by_delta[delta].append(int(article_id))
+
+    try:
+        with transaction.atomic():
+            for delta, article_ids in by_delta.items():
+                Article.objects.filter(id__in=article_ids).update(read_count=F('read_count') + delta)
+    except Exception as e:
+        logger.error(f"Ошибка сброса счетчика просмотров, возвращаем в буфер: {e}")
+        for article_id, delta in pending.items():
+            store.hincrby(PENDING_VIEWS_KEY, article_id, delta)
+        raise
+
+    total_views = sum(pending.values())
+    logger.debug(f"Сброшено {total_views} просмотров для {len(pending)} статей")
+    return {'articles': len(pending), 'views': total_views}
+
+
+def _maybe_flush() -> None:
+    """
+    Сбрасывает буфер процесса, если с прошлого сброса прошло достаточно времени.
+
+    Вызывается только для хранилища в памяти процесса.
+    """
+    global _last_flush
+
+    interval = getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 10)
+    if time.monotonic() - _last_flush < interval:
+        return
+    if not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        _last_flush = time.monotonic()
+        flush_pending_views()
+    except Exception as e:
+        logger.error(f"Не удалось сбросить просмотры: {e}")
+    finally:
+        _flush_lock.release()
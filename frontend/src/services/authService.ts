@@ -169,6 +169,12 @@ export const authService = {
     return response.data;
   },
 
+  // Статус избранного для всей страницы ленты одним запросом
+  async checkFavoriteArticles(articleIds: number[]): Promise<Record<string, boolean>> {
+    const response = await authApi.post(AUTH_ENDPOINTS.favoriteStatus, { article_ids: articleIds });
+    return response.data.favorites;
+  },
+
   async addFavoriteArticle(articleId: number, notes?: string): Promise<FavoriteArticle> {
     const response = await authApi.post(AUTH_ENDPOINTS.favorites, {
       article: articleId,
@@ -215,4 +215,5 @@ export const AUTH_ENDPOINTS = {
   favorites: '/api/auth/favorites/',
   toggleFavorite: (articleId: number) => `/api/auth/articles/${articleId}/toggle-favorite/`,
   checkFavorite: (articleId: number) => `/api/auth/articles/${articleId}/check-favorite/`,
+  favoriteStatus: '/api/auth/articles/favorite-status/',
 } as const; 
\ No newline at end of file
@@ -0,0 +1,213 @@
+"""
+Отдельный уровень парсинга для пользовательских источников (UserCustomSource).
+
+- Каждому уникальному (после нормализации) URL одобренных пользовательских
+  источников соответствует один core.Source (is_active=False - основной планировщик
+  parse_all_sources его не трогает). Сколько бы пользователей ни добавили
+  один URL, страница загружается один раз, а статьи сохраняются в общий
+  источник. Если URL уже есть среди активных источников платформы, он
+  парсится основным уровнем и здесь пропускается.
+- Частота и параллельность ограничены планом подписки (CUSTOM_CRAWL_PLAN_LIMITS):
+  интервал источника - минимальный из интервалов подписчиков, но не чаще,
+  чем разрешает их план; приоритет и слот параллельности - по лучшему плану.
+- Источники, требующие headless-парсинга, собираются только для подписчиков
+  с SubscriptionPlan.headless_parsing_enabled.
+- Задачи идут в отдельную очередь crawl_custom со своим воркером, поэтому
+  пользовательские источники не отнимают ресурсы у основного парсинга.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.kvstore import get_store
+from core.models import Source
+
+logger = logging.getLogger(__name__)
+
+CRAWLABLE_STATUSES = ('approved', 'active')
+
+# От лучшего плана к худшему
+TIER_ORDER = ['enterprise', 'premium', 'basic', 'free']
+
+DEFAULT_PLAN_LIMITS = {
+    'enterprise': {'min_interval': 5, 'concurrency': 8},
+    'premium': {'min_interval': 15, 'concurrency': 4},
+    'basic': {'min_interval': 60, 'concurrency': 2},
+    'free': {'min_interval': 240, 'concurrency': 1},
+}
+
+PENDING_KEY = 'crawl:custom:pending:{source_id}'
+SLOTS_KEY = 'crawl:custom:slots:{tier}'
+
+
+@dataclass
+class CrawlTarget:
+    """Источник, который пора собрать."""
+    source_id: int
+    url: str
+    tier: str
+    interval: int
+    subscribers: int
+    overdue: float
+
+
+def get_plan_limits() -> Dict[str, Dict[str, int]]:
+    """Ограничения по планам с учетом настройки CUSTOM_CRAWL_PLAN_LIMITS."""
+    overrides = getattr(settings, 'CUSTOM_CRAWL_PLAN_LIMITS', {}) or {}
+    return {
+        tier: {**limits, **overrides.get(tier, {})}
+        for tier, limits in DEFAULT_PLAN_LIMITS.items()
+    }
+
+
+def link_crawl_sources() -> int:
+    """Привязывает одобренные пользовательские источники к общим core.Source."""
+    from accounts.models import UserCustomSource
+
+    from .fetch_coalescer import normalize_url
+
+    unlinked = list(UserCustomSource.objects.filter(
+        status__in=CRAWLABLE_STATUSES,
+        crawl_source__isnull=True
+    ))
+    if not unlinked:
+        return 0
+
+    # Источник с тем же URL в другом написании (слеш, регистр, utm-метки)
+    existing = {normalize_url(url): source_id for source_id, url in Source.objects.values_list('id', 'url')}
+
+    for custom_source in unlinked:
+        source_id = existing.get(normalize_url(custom_source.url))
+        if source_id:
+            custom_source.crawl_source_id = source_id
+            continue
+
+        source, created = Source.objects.get_or_create(
+            url=custom_source.url,
+            defaults={
+                'name': custom_source.name,
+                'type': 'spa' if custom_source.requires_headless else 'html',
+                'is_active': False,
+                'description': 'Пользовательский источник',
+                'update_frequency': custom_source.parsing_frequency,
+            }
+        )
+        if created:
+            logger.info(f"Создан общий источник для пользовательского URL {source.url}")
+        custom_source.crawl_source = source
+        existing[normalize_url(source.url)] = source.id
+
+    UserCustomSource.objects.bulk_update(unlinked, ['crawl_source'])
+    return len(unlinked)
+
+
+def _active_plans(user_ids) -> Dict[int, object]:
+    """Планы активных подписок пользователей одним запросом."""
+    from accounts.models import UserSubscription
+
+    subscriptions = UserSubscription.objects.filter(
+        user_id__in=user_ids,
+        status='active',
+        end_date__gt=timezone.now()
+    ).select_related('plan')
+    return {subscription.user_id: subscription.plan for subscription in subscriptions}
+
+
+def plan_targets(now=None) -> List[CrawlTarget]:
+    """Источники, которые пора собрать, в порядке приоритета."""
+    from accounts.models import UserCustomSource
+
+    now = now or timezone.now()
+    limits = get_plan_limits()
+
+    rows = list(UserCustomSource.objects.filter(
+        status__in=CRAWLABLE_STATUSES,
+        crawl_source__isnull=False,
+        crawl_source__is_active=False
+    ).values(
+        'user_id', 'parsing_frequency', 'requires_headless',
+        'crawl_source_id', 'crawl_source__url', 'crawl_source__last_parsed'
+    ))
+    plans = _active_plans({row['user_id'] for row in rows})
+
+    grouped: Dict[int, dict] = {}
+    for row in rows:
+        plan = plans.get(row['user_id'])
+        if row['requires_headless'] and not (plan and plan.headless_parsing_enabled):
+            continue
+
+        tier = plan.plan_type if plan and plan.plan_type in limits else 'free'
+        interval = max(row['parsing_frequency'], limits[tier]['min_interval'])
+
+        entry = grouped.setdefault(row['crawl_source_id'], {
+            'url': row['crawl_source__url'],
+            'last_parsed': row['crawl_source__last_parsed'],
+            'tier': tier,
+            'interval': interval,
+            'subscribers': 0,
+        })
+        entry['subscribers'] += 1
+        entry['interval'] = min(entry['interval'], interval)
+        if TIER_ORDER.index(tier) < TIER_ORDER.index(entry['tier']):
+            entry['tier'] = tier
+
+    targets = []
+    for source_id, entry in grouped.items():
+        last_parsed = entry['last_parsed']
+        due_at = last_parsed + timedelta(minutes=entry['interval']) if last_parsed else None
+        if due_at and due_at > now:
+            continue
+        overdue = (now - due_at).total_seconds() if due_at else float('inf')
+        targets.append(CrawlTarget(
+            source_id=source_id,
+            url=entry['url'],
+            tier=entry['tier'],
+            interval=entry['interval'],
+            subscribers=entry['subscribers'],
+            overdue=overdue,
+        ))
+
+    targets.sort(key=lambda target: (TIER_ORDER.index(target.tier), -target.overdue))
+    return targets
+
+
+def claim(target: CrawlTarget) -> bool:
+    """Помечает источник как поставленный в очередь (защита от повторной постановки)."""
+    ttl = getattr(settings, 'CUSTOM_CRAWL_LEASE', 900)
+    return get_store().set_if_absent(PENDING_KEY.format(source_id=target.source_id), '1', ttl)
+
+
+def unclaim(source_id: int) -> None:
+    get_store().delete(PENDING_KEY.format(source_id=source_id))
+
+
+def acquire_slot(tier: str) -> bool:
+    """Занимает слот параллельности плана."""
+    concurrency = get_plan_limits().get(tier, DEFAULT_PLAN_LIMITS['free'])['concurrency']
+    allowed, _ = get_store().incr_with_limit(
+        SLOTS_KEY.format(tier=tier), 1, concurrency, getattr(settings, 'CUSTOM_CRAWL_LEASE', 900)
+    )
+    return allowed
+
+
+def release_slot(tier: str) -> None:
+    key = SLOTS_KEY.format(tier=tier)
+    store = get_store()
+    _, value = store.incr_with_limit(key, -1, None)
+    if value <= 0:
+        # Счетчик мог истечь по TTL, пока шел парсинг
+        store.delete(key)
+
+
+def tier_priority(tier: Optional[str]) -> int:
+    """Приоритет задачи в очереди (0 - высший)."""
+    from .queues import PRIORITY_HIGH, PRIORITY_LOW
+
+    rank = TIER_ORDER.index(tier) if tier in TIER_ORDER else len(TIER_ORDER) - 1
+    step = (PRIORITY_LOW - PRIORITY_HIGH) // (len(TIER_ORDER) - 1)
+    return PRIORITY_HIGH + rank * step
@@ -0,0 +1,183 @@
+"""
+Объединение загрузок одного и того же URL источника.
+
+Один и тот же список статей может быть адресом нескольких источников
+(core.Source с другим написанием URL, общие источники пользовательского
+уровня, ручной запуск парсинга во время планового). Слой объединения:
+- нормализует URL (регистр схемы и хоста, порт по умолчанию, фрагмент,
+  завершающий слеш, порядок query-параметров, utm-метки)
+- пропускает только одну загрузку URL одновременно: в пределах процесса
+  через блокировку, между воркерами через ключ в быстром хранилище
+  (core/kvstore.py); остальные ждут ее результата
+- хранит результат разбора FETCH_RESULT_TTL секунд, и все подписчики,
+  пришедшие за это время, получают его без повторной загрузки
+
+Если хранилище недоступно, загрузка выполняется напрямую.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from hashlib import sha1
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+
+from core import metrics
+from core.kvstore import get_store
+
+logger = logging.getLogger(__name__)
+
+RESULT_KEY = 'fetch:result:{digest}'
+LOCK_KEY = 'fetch:lock:{digest}'
+STATS_KEY = 'fetch:stats'
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+POLL_INTERVAL = 0.5
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+def normalize_url(url: str) -> str:
+    """Канонический вид URL списка статей."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_')
+    ))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def url_digest(url: str) -> str:
+    return sha1(normalize_url(url).encode('utf-8')).hexdigest()
+
+
+def fetch_articles(source, stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Статьи источника с объединением одновременных и недавних загрузок URL.
+
+    В stats (если передан) записываются телеметрия загрузки и разбора
+    и fetch_outcome - как получен результат (fetched, coalesced, cached, direct).
+    """
+    from .parsers.universal_parser import fetch_generic_articles
+
+    return coalesce(source.url, lambda: asyncio.run(fetch_generic_articles(source, stats)), stats)
+
+
+def coalesce(
+    url: str,
+    fetch: Callable[[], List[Dict[str, Any]]],
+    stats: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Выполняет fetch() не чаще одного раза на URL за FETCH_RESULT_TTL секунд.
+
+    Пустой результат не кэшируется, чтобы временная ошибка сайта не
+    распространялась на всех подписчиков.
+    """
+    if stats is None:
+        stats = {}
+
+    if not getattr(settings, 'FETCH_COALESCE_ENABLED', True):
+        stats['fetch_outcome'] = 'direct'
+        return fetch()
+
+    digest = url_digest(url)
+    with _local_lock(digest):
+        try:
+            store = get_store()
+            cached = _read_result(store, digest)
+        except Exception as e:
+            logger.warning(f"Хранилище недоступно, загрузка {url} без объединения: {e}")
+            stats['fetch_outcome'] = 'direct'
+            return fetch()
+
+        if cached is not None:
+            _record(store, 'cached')
+            stats['fetch_outcome'] = 'cached'
+            return cached
+
+        token = uuid.uuid4().hex
+        lock_key = LOCK_KEY.format(digest=digest)
+        if not store.set_if_absent(lock_key, token, getattr(settings, 'FETCH_LOCK_TTL', 60)):
+            waited = _wait_for_result(store, digest, lock_key)
+            if waited is not None:
+                _record(store, 'coalesced')
+                stats['fetch_outcome'] = 'coalesced'
+                return waited
+            # Загрузка другого воркера не дала результата - загружаем сами
+
+        try:
+            _record(store, 'fetched')
+            stats['fetch_outcome'] = 'fetched'
+            articles = fetch()
+            if articles:
+                store.set(
+                    RESULT_KEY.format(digest=digest),
+                    json.dumps(articles, default=_json_default, ensure_ascii=False),
+                    getattr(settings, 'FETCH_RESULT_TTL', 120)
+                )
+            return articles
+        finally:
+            if store.get(lock_key) == token:
+                store.delete(lock_key)
+
+
+def get_stats() -> Dict[str, int]:
+    """Счетчики загрузок: fetched, coalesced (ожидание чужой загрузки), cached."""
+    stats = get_store().hgetall(STATS_KEY)
+    return {outcome: stats.get(outcome, 0) for outcome in ('fetched', 'coalesced', 'cached')}
+
+
+def _wait_for_result(store, digest: str, lock_key: str) -> Optional[List[Dict[str, Any]]]:
+    """Ждет результата загрузки, которую выполняет другой воркер."""
+    deadline = time.monotonic() + getattr(settings, 'FETCH_WAIT_TIMEOUT', 45)
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        result = _read_result(store, digest)
+        if result is not None:
+            return result
+        if store.get(lock_key) is None:
+            return _read_result(store, digest)
+    logger.warning(f"Не дождались загрузки {digest}, загружаем самостоятельно")
+    return None
+
+
+def _read_result(store, digest: str) -> Optional[List[Dict[str, Any]]]:
+    raw = store.get(RESULT_KEY.format(digest=digest))
+    return json.loads(raw) if raw is not None else None
+
+
+def _local_lock(digest: str) -> threading.Lock:
+    with _local_locks_guard:
+        return _local_locks.setdefault(digest, threading.Lock())
+
+
+def _record(store, outcome: str) -> None:
+    if outcome != 'fetched':
+        metrics.DEDUP_HITS.labels(kind=f'fetch_{outcome}').inc()
+    try:
+        store.hincrby(STATS_KEY, outcome)
+    except Exception:
+        pass
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
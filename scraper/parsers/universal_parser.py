@@ -9,11 +9,14 @@ import aiohttp
 import asyncio
 import logging
 import re
+import time
 from typing import List, Dict, Optional, Any, Protocol
 from urllib.parse import urljoin, urlparse
 from datetime import datetime
 from bs4 import BeautifulSoup, Tag
 
+from core import metrics, profiling
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,6 +33,9 @@ class UniversalNewsParser:
     
     def __init__(self):
         self.session = None
+        # Ответ последнего fetch_page (для телеметрии парсинга)
+        self.last_http_status: Optional[int] = None
+        self.last_bytes: Optional[int] = None
         # Headers для имитации реального браузера
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -133,8 +139,11 @@ class UniversalNewsParser:
            пытаемся использовать headless-парсинг (если включен)
         3. Возвращаем лучший доступный результат
         """
+        self.last_http_status = None
+        self.last_bytes = None
         try:
             async with self.session.get(url) as response:
+                self.last_http_status = response.status
                 if response.status == 403:
                     logger.warning(f"Получен статус 403 для {url}, возможна защита от ботов")
                 elif response.status == 429:
@@ -142,6 +151,7 @@ class UniversalNewsParser:
                 
                 response.raise_for_status()
                 content = await response.text()
+                self.last_bytes = len(content.encode('utf-8'))
                 logger.debug(f"Получено {len(content)} символов с {url}")
                 
                 # Проверяем, нужен ли fallback на headless-парсинг
@@ -149,9 +159,11 @@ class UniversalNewsParser:
                     logger.info(f"Пытаемся headless-парсинг для {url}")
                     
                     try:
-                        headless_html = await self._try_headless_parsing(url)
+                        with profiling.span('headless'):
+                            headless_html = await self._try_headless_parsing(url)
                         if headless_html and len(headless_html) > len(content):
                             logger.info(f"Headless-парсинг улучшил результат для {url}: {len(content)} → {len(headless_html)} символов")
+                            self.last_bytes = len(headless_html.encode('utf-8'))
                             return headless_html
                         else:
                             logger.warning(f"Headless-парсинг не улучшил результат для {url}")
@@ -230,7 +242,11 @@ class UniversalNewsParser:
         
         for selector in self.article_container_selectors:
             try:
+                started = time.perf_counter()
                 elements = soup.select(selector)
+                elapsed = time.perf_counter() - started
+                metrics.SELECTOR_SECONDS.labels(selector=selector).observe(elapsed)
+                profiling.record(f'selector:{selector}', elapsed)
                 if elements:
                     logger.debug(f"Найдено {len(elements)} элементов по селектору '{selector}'")
                     containers.extend(elements)
@@ -605,7 +621,7 @@ class UniversalNewsParser:
         return True
 
 
-async def fetch_generic_articles(source: SourceProtocol) -> List[Dict[str, Any]]:
+async def fetch_generic_articles(source: SourceProtocol, stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """
     Универсальная функция для парсинга статей с любого новостного сайта.
     
@@ -614,74 +630,132 @@ async def fetch_generic_articles(source: SourceProtocol) -> List[Dict[str, Any]]
     
     Args:
         source: Объект источника с URL и метаданными
+        stats: Словарь для телеметрии парсинга (http_status, bytes_fetched,
+            fetch_ms, parse_ms, containers_found), заполняется при передаче
     
     Returns:
         Список словарей с извлеченными статьями
     """
     logger.info(f"Начало универсального парсинга {source.name} ({source.url})")
     
+    if stats is None:
+        stats = {}
+    
     async with UniversalNewsParser() as parser:
         # Получаем HTML страницу
+        started = time.perf_counter()
         html_content = await parser.fetch_page(source.url)
+        elapsed = time.perf_counter() - started
+        metrics.FETCH_SECONDS.labels(result='ok' if html_content else 'error').observe(elapsed)
+        profiling.record('fetch', elapsed)
+        stats['fetch_ms'] = int(elapsed * 1000)
+        stats['http_status'] = parser.last_http_status
+        stats['bytes_fetched'] = parser.last_bytes
         if not html_content:
             logger.error(f"Не удалось получить содержимое {source.url}")
             return []
         
-        # Парсим HTML
-        try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-        except Exception as e:
-            logger.error(f"Ошибка парсинга HTML {source.url}: {e}")
-            return []
-        
-        # Находим контейнеры статей
+        return parse_listing(html_content, source, parser, stats)
+
+
+def parse_listing(html_content: str, source: SourceProtocol,
+                  parser: Optional[UniversalNewsParser] = None,
+                  stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Извлечение статей из уже полученной страницы списка статей.
+    
+    Сетевая сессия для разбора не нужна, поэтому функция используется
+    и без загрузки (например, в бенчмарках на записанных страницах).
+    """
+    if parser is None:
+        parser = UniversalNewsParser()
+    if stats is None:
+        stats = {}
+    
+    # Парсим HTML
+    started = time.perf_counter()
+    try:
+        soup = BeautifulSoup(html_content, 'html.parser')
+        elapsed = time.perf_counter() - started
+        metrics.HTML_PARSE_SECONDS.observe(elapsed)
+        profiling.record('html_parse', elapsed)
+    except Exception as e:
+        logger.error(f"Ошибка парсинга HTML {source.url}: {e}")
+        return []
+    
+    # Находим контейнеры статей
+    with profiling.span('find_containers'):
         containers = parser.find_article_containers(soup)
-        if not containers:
-            logger.warning(f"Не найдено контейнеров статей на {source.url}")
-            return []
-        
-        articles = []
-        successful_extractions = 0
-        
-        for i, container in enumerate(containers):
-            try:
-                # Извлекаем заголовок
-                title = parser.extract_title(container)
-                if not title:
-                    logger.debug(f"Контейнер {i+1}: заголовок не найден, пропускаем")
-                    continue
-                
-                # Извлекаем URL
-                article_url = parser.extract_url(container, source.url)
-                if not article_url:
-                    logger.debug(f"Контейнер {i+1}: URL не найден, пропускаем")
-                    continue
-                
-                # Извлекаем контент (опционально)
-                content = parser.extract_content(container)
-                
-                # Извлекаем дату
-                published_at = parser.extract_date(container, article_url)
-                
-                # Формируем результат
-                article = {
-                    "title": title,
-                    "url": article_url,
-                    "content": content or "",
-                    "published_at": published_at,
-                    "source_name": source.name
-                }
-                
-                articles.append(article)
-                successful_extractions += 1
-                
-                logger.debug(f"Успешно извлечена статья {successful_extractions}: {title[:50]}...")
-                
-            except Exception as e:
-                logger.warning(f"Ошибка обработки контейнера {i+1}: {e}")
+    stats['containers_found'] = len(containers)
+    if not containers:
+        stats['parse_ms'] = int((time.perf_counter() - started) * 1000)
+        logger.warning(f"Не найдено контейнеров статей на {source.url}")
+        return []
+    
+    articles = extract_articles(parser, containers, source)
+    
+    stats['parse_ms'] = int((time.perf_counter() - started) * 1000)
+    logger.info(f"Универсальный парсинг {source.name} завершен: "
+               f"{len(articles)} статей из {len(containers)} контейнеров")
+    
+    return articles
+
+
+def extract_articles(parser: UniversalNewsParser, containers: List[Tag],
+                     source: SourceProtocol) -> List[Dict[str, Any]]:
+    """Извлечение полей статей из найденных контейнеров."""
+    articles = []
+    successful_extractions = 0
+    
+    for i, container in enumerate(containers):
+        try:
+            # Извлекаем заголовок
+            field_started = time.perf_counter()
+            title = parser.extract_title(container)
+            field_started = _observe_field('title', field_started)
+            if not title:
+                logger.debug(f"Контейнер {i+1}: заголовок не найден, пропускаем")
                 continue
-        
-        logger.info(f"Универсальный парсинг {source.name} завершен: "
-                   f"{successful_extractions} статей из {len(containers)} контейнеров")
-        
-        return articles 
\ No newline at end of file
+            
+            # Извлекаем URL
+            article_url = parser.extract_url(container, source.url)
+            field_started = _observe_field('url', field_started)
+            if not article_url:
+                logger.debug(f"Контейнер {i+1}: URL не найден, пропускаем")
+                continue
+            
+            # Извлекаем контент (опционально)
+            content = parser.extract_content(container)
+            field_started = _observe_field('content', field_started)
+            
+            # Извлекаем дату
+            published_at = parser.extract_date(container, article_url)
+            _observe_field('date', field_started)
+            
+            # Формируем результат
+            article = {
+                "title": title,
+                "url": article_url,
+                "content": content or "",
+                "published_at": published_at,
+                "source_name": source.name
+            }
+            
+            articles.append(article)
+            successful_extractions += 1
+            
+            logger.debug(f"Успешно извлечена статья {successful_extractions}: {title[:50]}...")
+            
+        except Exception as e:
+            logger.warning(f"Ошибка обработки контейнера {i+1}: {e}")
+            continue
+    
+    return articles
+
+
+def _observe_field(field: str, started: float) -> float:
+    """Записывает время извлечения поля и возвращает отметку для следующего."""
+    now = time.perf_counter()
+    metrics.EXTRACT_SECONDS.labels(field=field).observe(now - started)
+    profiling.record(f'extract:{field}', now - started)
+    return now
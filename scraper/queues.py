@@ -0,0 +1,90 @@
+"""
+Очереди и приоритеты задач Celery.
+
+Задачи разнесены по очередям, чтобы разбор бэклога не задерживал свежие данные:
+- crawl            - парсинг источников (сетевые задачи, много параллельных)
+- crawl_custom     - парсинг пользовательских источников (scraper/custom_sources.py)
+- ingest           - сохранение найденных статей
+- analysis_fresh   - анализ только что сохраненных статей
+- analysis_backlog - массовый и повторный анализ старых статей
+- maintenance      - периодические служебные задачи (счетчики, тренды, секции)
+
+Каждую очередь обслуживает свой воркер с собственными concurrency и
+prefetch (WORKER_PROFILES, команда run_worker). Внутри очереди действуют
+приоритеты брокера Redis: 0 - самый высокий, 9 - самый низкий.
+"""
+
+from typing import Any, Dict
+
+from kombu import Queue
+
+QUEUE_DEFAULT = 'celery'
+QUEUE_CRAWL = 'crawl'
+QUEUE_CRAWL_CUSTOM = 'crawl_custom'
+QUEUE_INGEST = 'ingest'
+QUEUE_ANALYSIS_FRESH = 'analysis_fresh'
+QUEUE_ANALYSIS_BACKLOG = 'analysis_backlog'
+QUEUE_MAINTENANCE = 'maintenance'
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+TASK_QUEUES = [
+    Queue(QUEUE_DEFAULT),
+    Queue(QUEUE_CRAWL),
+    Queue(QUEUE_CRAWL_CUSTOM),
+    Queue(QUEUE_INGEST),
+    Queue(QUEUE_ANALYSIS_FRESH),
+    Queue(QUEUE_ANALYSIS_BACKLOG),
+    Queue(QUEUE_MAINTENANCE),
+]
+
+TASK_ROUTES = {
+    'scraper.tasks.parse_source': {'queue': QUEUE_CRAWL},
+    'scraper.tasks.parse_all_sources': {'queue': QUEUE_CRAWL},
+    'scraper.tasks.collect_*': {'queue': QUEUE_CRAWL},
+    'scraper.tasks.test_universal_parser': {'queue': QUEUE_CRAWL},
+    'scraper.tasks.schedule_custom_sources': {'queue': QUEUE_MAINTENANCE},
+    'scraper.tasks.crawl_custom_source': {'queue': QUEUE_CRAWL_CUSTOM},
+    'scraper.tasks.save_article': {'queue': QUEUE_INGEST},
+    # Новые статьи; массовые постановки явно отправляют задачу в бэклог
+    'scraper.tasks.analyze_article_text': {'queue': QUEUE_ANALYSIS_FRESH, 'priority': PRIORITY_HIGH},
+    'scraper.tasks.analyze_unanalyzed_articles': {'queue': QUEUE_ANALYSIS_BACKLOG},
+    'scraper.tasks.reanalyze_stale_articles': {'queue': QUEUE_ANALYSIS_BACKLOG},
+    'scraper.tasks.flush_article_views': {'queue': QUEUE_MAINTENANCE},
+    'scraper.tasks.persist_usage_counters': {'queue': QUEUE_MAINTENANCE},
+    'scraper.tasks.maintain_usage_partitions': {'queue': QUEUE_MAINTENANCE},
+    'scraper.tasks.materialize_trending': {'queue': QUEUE_MAINTENANCE},
+    'scraper.tasks.prune_crawl_runs': {'queue': QUEUE_MAINTENANCE},
+    'scraper.tasks.prune_article_exports': {'queue': QUEUE_MAINTENANCE},
+    # Выгрузки могут идти минутами - не занимаем ими очередь обслуживания
+    'scraper.tasks.export_articles_parquet': {'queue': QUEUE_DEFAULT},
+}
+
+# Параметры воркеров по очередям (переопределяются настройкой WORKER_PROFILES)
+WORKER_PROFILES = {
+    QUEUE_CRAWL: {'concurrency': 4, 'prefetch_multiplier': 1},
+    QUEUE_CRAWL_CUSTOM: {'concurrency': 2, 'prefetch_multiplier': 1},
+    QUEUE_INGEST: {'concurrency': 4, 'prefetch_multiplier': 4},
+    QUEUE_ANALYSIS_FRESH: {'concurrency': 2, 'prefetch_multiplier': 1},
+    QUEUE_ANALYSIS_BACKLOG: {'concurrency': 1, 'prefetch_multiplier': 1},
+    QUEUE_MAINTENANCE: {'concurrency': 1, 'prefetch_multiplier': 1},
+    QUEUE_DEFAULT: {'concurrency': 2, 'prefetch_multiplier': 1},
+}
+
+
+def get_worker_profiles() -> Dict[str, Dict[str, Any]]:
+    """Параметры воркеров с учетом настройки WORKER_PROFILES."""
+    from django.conf import settings
+
+    overrides = getattr(settings, 'WORKER_PROFILES', {}) or {}
+    return {
+        queue: {**profile, **overrides.get(queue, {})}
+        for queue, profile in WORKER_PROFILES.items()
+    }
+
+
+def backlog_options() -> Dict[str, Any]:
+    """Параметры apply_async для массовой постановки анализа в бэклог."""
+    return {'queue': QUEUE_ANALYSIS_BACKLOG, 'priority': PRIORITY_LOW}
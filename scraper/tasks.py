@@ -6,20 +6,24 @@ from datetime import datetime
 from django.utils import timezone
 from dateutil import parser as date_parser
 
+from core import metrics, profiling
 from core.models import Source, Article
 from core.text_analyzer import analyze_article_content
+from .fetch_coalescer import fetch_articles
 from .parsers.universal_parser import fetch_generic_articles
+from .queues import backlog_options
 # TODO: Импортировать другие парсеры при необходимости
 
 logger = logging.getLogger(__name__)
 
 @shared_task
-def parse_source(source_id: int) -> Dict[str, Any]:
+def parse_source(source_id: int, profile: bool = False) -> Dict[str, Any]:
     """
     Задача для парсинга одного источника.
     
     Использует универсальный парсер и отправляет каждую статью 
     в отдельную задачу save_article для сохранения и анализа.
+    profile=True включает профилирование запуска (core/profiling.py).
     """
     try:
         source = Source.objects.get(id=source_id)
@@ -27,57 +31,173 @@ def parse_source(source_id: int) -> Dict[str, Any]:
             logger.info(f"Source {source.name} is inactive, skipping")
             return {'status': 'inactive', 'saved_count': 0}
         
-        logger.info(f"Начинаем парсинг {source.name} (тип: {source.type})")
+        return _crawl_source(source, profile=profile or profiling.is_enabled('parse_source', source))
         
-        # Используем универсальный парсер
-        articles = asyncio.run(fetch_generic_articles(source))
+    except Source.DoesNotExist:
+        logger.error(f"Source {source_id} not found")
+        return {'status': 'not_found', 'error': f'Source {source_id} not found'}
+    except Exception as e:
+        logger.error(f"Error parsing source {source_id}: {str(e)}")
+        return {'status': 'error', 'error': str(e)}
+
+def _crawl_source(source: Source, tier: str = 'core', profile: bool = False) -> Dict[str, Any]:
+    """
+    Парсит источник и ставит новые статьи в задачи save_article.
+    
+    Результат парсинга записывается в телеметрию CrawlRun (core/crawl_telemetry.py),
+    при profile=True этапы парсинга профилируются (core/profiling.py).
+    """
+    with profiling.profile_run('crawl', source.name, profile, source=source):
+        return _crawl_and_schedule(source, tier)
+
+def _crawl_and_schedule(source: Source, tier: str) -> Dict[str, Any]:
+    from core import crawl_telemetry
+    
+    logger.info(f"Начинаем парсинг {source.name} (тип: {source.type})")
+    started_at = timezone.now()
+    stats: Dict[str, Any] = {}
+    
+    # Универсальный парсер; одновременные и недавние загрузки того же URL
+    # другими источниками объединяются в одну (scraper/fetch_coalescer.py)
+    try:
+        articles = fetch_articles(source, stats)
+    except Exception as e:
+        crawl_telemetry.record_run(source, tier=tier, started_at=started_at, status='error', stats=stats, error=str(e))
+        raise
+    
+    if not articles:
+        logger.warning(f"Не найдено статей для {source.name}")
+        # Страница не получена - это ошибка источника, а не пустой список
+        status = 'no_articles' if stats.get('bytes_fetched') else 'error'
+        crawl_telemetry.record_run(
+            source, tier=tier, started_at=started_at, status=status, stats=stats,
+            error=f"HTTP {stats['http_status']}" if status == 'error' and stats.get('http_status') else ''
+        )
+        return {'status': 'no_articles', 'saved_count': 0}
+    
+    # Уже сохраненные статьи отсекаются одним запросом, а не задачей на каждую
+    known_urls = set(Article.objects.filter(
+        url__in=[article_data['url'] for article_data in articles]
+    ).values_list('url', flat=True))
+    if known_urls:
+        metrics.DEDUP_HITS.labels(kind='known_url').inc(len(known_urls))
+    
+    # Отправляем каждую новую статью в отдельную задачу сохранения
+    scheduled_count = 0
+    for article_data in articles:
+        if article_data['url'] in known_urls:
+            continue
+        try:
+            # Подготавливаем данные для задачи сохранения
+            save_data = {
+                'title': article_data['title'],
+                'content': article_data.get('content', ''),
+                'summary': article_data.get('summary', ''),
+                'url': article_data['url'],
+                'published_at': article_data.get('published_at'),
+                'source_id': source.id,
+                'topic': article_data.get('topic', 'other')
+            }
+            
+            # Запускаем задачу сохранения асинхронно
+            save_article.delay(save_data)
+            scheduled_count += 1
+            known_urls.add(article_data['url'])
+            
+        except Exception as e:
+            logger.error(f"Ошибка планирования сохранения статьи {article_data.get('url', 'unknown')}: {e}")
+            continue
+    
+    # Обновляем время последнего парсинга
+    source.last_parsed = timezone.now()
+    source.save(update_fields=['last_parsed'])
+    
+    crawl_telemetry.record_run(
+        source, tier=tier, started_at=started_at, status='success', stats=stats,
+        articles_found=len(articles), new_articles=scheduled_count
+    )
+    
+    logger.info(f"Запланировано сохранение {scheduled_count} новых статей из {len(articles)} ({source.name})")
+    
+    return {
+        'status': 'success',
+        'source_name': source.name,
+        'found_articles': len(articles),
+        'scheduled_count': scheduled_count
+    }
+
+@shared_task
+def schedule_custom_sources() -> Dict[str, Any]:
+    """
+    Задача-планировщик парсинга пользовательских источников.
+    
+    Привязывает новые одобренные источники к общим core.Source и ставит
+    в очередь crawl_custom те, которые пора собрать, с учетом лимитов
+    планов подписчиков (scraper/custom_sources.py).
+    """
+    try:
+        from django.conf import settings
+        from . import custom_sources
         
-        if not articles:
-            logger.warning(f"Не найдено статей для {source.name}")
-            return {'status': 'no_articles', 'saved_count': 0}
+        linked = custom_sources.link_crawl_sources()
+        targets = custom_sources.plan_targets()
+        batch = getattr(settings, 'CUSTOM_CRAWL_BATCH_SIZE', 50)
         
-        # Отправляем каждую статью в отдельную задачу сохранения
-        scheduled_count = 0
-        for article_data in articles:
-            try:
-                # Подготавливаем данные для задачи сохранения
-                save_data = {
-                    'title': article_data['title'],
-                    'content': article_data.get('content', ''),
-                    'summary': article_data.get('summary', ''),
-                    'url': article_data['url'],
-                    'published_at': article_data.get('published_at'),
-                    'source_id': source.id,
-                    'topic': article_data.get('topic', 'other')
-                }
-                
-                # Запускаем задачу сохранения асинхронно
-                save_article.delay(save_data)
-                scheduled_count += 1
-                
-            except Exception as e:
-                logger.error(f"Ошибка планирования сохранения статьи {article_data.get('url', 'unknown')}: {e}")
+        scheduled = 0
+        for target in targets:
+            if scheduled >= batch:
+                break
+            if not custom_sources.claim(target):
                 continue
+            crawl_custom_source.apply_async(
+                (target.source_id, target.tier),
+                priority=custom_sources.tier_priority(target.tier)
+            )
+            scheduled += 1
         
-        # Обновляем время последнего парсинга
-        source.last_parsed = timezone.now()
-        source.save(update_fields=['last_parsed'])
-        
-        logger.info(f"Запланировано сохранение {scheduled_count} статей из {source.name}")
-        
+        logger.info(f"Пользовательские источники: запланировано {scheduled} из {len(targets)}")
         return {
             'status': 'success',
-            'source_name': source.name,
-            'found_articles': len(articles),
-            'scheduled_count': scheduled_count
+            'linked': linked,
+            'due': len(targets),
+            'scheduled': scheduled
         }
         
+    except Exception as e:
+        logger.error(f"Error in schedule_custom_sources: {str(e)}")
+        return {'status': 'error', 'error': str(e)}
+
+@shared_task
+def crawl_custom_source(source_id: int, tier: str = 'free', profile: bool = False) -> Dict[str, Any]:
+    """
+    Задача для парсинга общего источника пользовательского уровня.
+    
+    Страница загружается один раз для всех пользователей, добавивших URL;
+    число одновременных парсингов ограничено слотами плана.
+    """
+    from . import custom_sources
+    
+    if not custom_sources.acquire_slot(tier):
+        # Слотов плана нет - источник вернется в следующий запуск планировщика
+        custom_sources.unclaim(source_id)
+        return {'status': 'throttled', 'source_id': source_id, 'tier': tier}
+    
+    try:
+        source = Source.objects.get(id=source_id)
+        return _crawl_source(
+            source, tier='custom', profile=profile or profiling.is_enabled('crawl_custom_source', source)
+        )
     except Source.DoesNotExist:
         logger.error(f"Source {source_id} not found")
         return {'status': 'not_found', 'error': f'Source {source_id} not found'}
     except Exception as e:
-        logger.error(f"Error parsing source {source_id}: {str(e)}")
+        logger.error(f"Error crawling custom source {source_id}: {str(e)}")
         return {'status': 'error', 'error': str(e)}
+    finally:
+        # Пустой или неудачный парсинг тоже сдвигает срок следующего
+        Source.objects.filter(id=source_id).update(last_parsed=timezone.now())
+        custom_sources.release_slot(tier)
+        custom_sources.unclaim(source_id)
 
 @shared_task
 def save_article(article_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -94,6 +214,7 @@ def save_article(article_data: Dict[str, Any]) -> Dict[str, Any]:
         # Проверяем, существует ли уже статья с таким URL
         if Article.objects.filter(url=url).exists():
             logger.debug(f"Статья уже существует: {url}")
+            metrics.DEDUP_HITS.labels(kind='duplicate_article').inc()
             return {'status': 'duplicate', 'url': url}
         
         # Получаем источник
@@ -153,7 +274,7 @@ def save_article(article_data: Dict[str, Any]) -> Dict[str, Any]:
         return {'status': 'error', 'error': str(e), 'url': article_data.get('url')}
 
 @shared_task
-def analyze_article_text(article_id: int) -> Dict[str, Any]:
+def analyze_article_text(article_id: int, force: bool = False, profile: bool = False) -> Dict[str, Any]:
     """
     Задача для анализа текста конкретной статьи.
     
@@ -163,11 +284,15 @@ def analyze_article_text(article_id: int) -> Dict[str, Any]:
     Поддерживает два типа анализаторов:
     - spaCy (ML-based) - более точный, медленнее
     - Legacy (dictionary-based) - быстрый, менее точный
+    
+    force=True используется для повторного анализа статей,
+    обработанных старой версией анализатора; profile=True включает
+    профилирование анализа (core/profiling.py).
     """
     try:
         article = Article.objects.get(id=article_id)
         
-        if article.is_analyzed:
+        if article.is_analyzed and not force:
             logger.info(f"Article {article_id} already analyzed, skipping")
             return {'status': 'already_analyzed', 'article_id': article_id}
         
@@ -175,35 +300,48 @@ def analyze_article_text(article_id: int) -> Dict[str, Any]:
         
         # Выбираем анализатор на основе настроек
         from django.conf import settings
-        use_spacy = getattr(settings, 'USE_SPACY_ANALYZER', False)
-        
-        if use_spacy:
-            try:
-                # Используем spaCy анализатор
-                from core.spacy_analyzer import analyze_article_content_spacy
-                result = analyze_article_content_spacy(article)
-                analyzer_type = 'spacy'
-                logger.info(f"Использован spaCy анализатор для статьи {article_id}")
-            except Exception as e:
-                logger.error(f"Ошибка spaCy анализатора: {e}")
-                # Fallback на legacy анализатор
-                from core.text_analyzer import analyze_article_content
+        profile = profile or profiling.is_enabled('analyze_article_text')
+        
+        with profiling.profile_run('analysis', f'article {article_id}', profile):
+            use_spacy = getattr(settings, 'USE_SPACY_ANALYZER', False)
+            
+            if use_spacy:
+                try:
+                    # Используем spaCy анализатор
+                    from core.spacy_analyzer import SpacyTextAnalyzer, analyze_article_content_spacy
+                    result = analyze_article_content_spacy(article)
+                    analyzer_type = 'spacy'
+                    analyzer_version = result.get('analyzer_version') or SpacyTextAnalyzer.namespace_for(
+                        getattr(settings, 'SPACY_MODEL_NAME', SpacyTextAnalyzer.DEFAULT_MODEL)
+                    )
+                    logger.info(f"Использован spaCy анализатор для статьи {article_id}")
+                except Exception as e:
+                    logger.error(f"Ошибка spaCy анализатора: {e}")
+                    # Fallback на legacy анализатор
+                    from core.text_analyzer import TextAnalyzer, analyze_article_content
+                    result = analyze_article_content(article)
+                    analyzer_type = 'legacy_fallback'
+                    analyzer_version = TextAnalyzer.namespace()
+                    logger.info(f"Переключились на legacy анализатор для статьи {article_id}")
+            else:
+                # Используем legacy анализатор
+                from core.text_analyzer import TextAnalyzer, analyze_article_content
                 result = analyze_article_content(article)
-                analyzer_type = 'legacy_fallback'
-                logger.info(f"Переключились на legacy анализатор для статьи {article_id}")
-        else:
-            # Используем legacy анализатор
-            from core.text_analyzer import analyze_article_content
-            result = analyze_article_content(article)
-            analyzer_type = 'legacy'
-            logger.info(f"Использован legacy анализатор для статьи {article_id}")
+                analyzer_type = 'legacy'
+                analyzer_version = TextAnalyzer.namespace()
+                logger.info(f"Использован legacy анализатор для статьи {article_id}")
         
         # Обновляем статью с результатами анализа
         article.topic = result['topic']
         article.tags = result['tags']
         article.locations = result['locations']
         article.is_analyzed = True
-        article.save(update_fields=['topic', 'tags', 'locations', 'is_analyzed'])
+        article.analyzer_version = analyzer_version
+        article.analyzed_at = timezone.now()
+        # updated_at обновляется (auto_now) только если указан в update_fields
+        article.save(update_fields=[
+            'topic', 'tags', 'locations', 'is_analyzed', 'analyzer_version', 'analyzed_at', 'updated_at'
+        ])
         
         # Подготавливаем результат для логирования
         entities_info = ""
@@ -219,6 +357,7 @@ def analyze_article_text(article_id: int) -> Dict[str, Any]:
             'status': 'success',
             'article_id': article_id,
             'analyzer_type': analyzer_type,
+            'analyzer_version': analyzer_version,
             'topic': result['topic'],
             'tags_count': len(result['tags']),
             'locations_count': len(result['locations']),
@@ -240,44 +379,214 @@ def analyze_unanalyzed_articles(batch_size: int = 50) -> Dict[str, Any]:
     """
     Задача для анализа всех непроанализированных статей.
     
-    Запускает анализ для статей, которые еще не были проанализированы.
+    Анализирует пачку в пуле процессов (core/analysis_executor.py) тем
+    анализатором, который выбран в настройках (spaCy или legacy), и
+    сохраняет ее одним bulk_update. Пул и загруженные в нем модели
+    переиспользуются всеми запусками задачи в процессе воркера.
     """
     try:
         # Получаем непроанализированные статьи
         unanalyzed_articles = Article.objects.filter(
             is_analyzed=False,
             is_active=True
-        ).only('id')[:batch_size]
+        ).order_by('id')[:batch_size]
         
-        total_count = unanalyzed_articles.count()
-        if total_count == 0:
-            logger.info("No unanalyzed articles found")
-            return {'status': 'no_articles', 'processed': 0}
+        return _analyze_articles_in_pool(unanalyzed_articles)
         
-        # Запускаем анализ для каждой статьи
-        success_count = 0
-        error_count = 0
+    except Exception as e:
+        logger.error(f"Error in analyze_unanalyzed_articles: {str(e)}")
+        return {'status': 'error', 'error': str(e)}
+
+def _analyze_articles_in_pool(queryset) -> Dict[str, Any]:
+    """Анализирует статьи в общем пуле процессов воркера."""
+    from core.analysis_executor import get_shared_executor, payloads_for, save_results
+    
+    payloads = payloads_for(queryset)
+    if not payloads:
+        logger.info("No unanalyzed articles found")
+        return {'status': 'no_articles', 'processed': 0}
+    
+    saved, failures = save_results(get_shared_executor().map(payloads))
+    
+    for article_id, error in failures:
+        logger.error(f"Error analyzing article {article_id}: {error}")
+    
+    if saved:
+        from api.cache import bump_generation
+        bump_generation()
+    
+    logger.info(f"Analyzed {saved} articles in process pool, {len(failures)} errors")
+    return {
+        'status': 'success',
+        'analyzed': saved,
+        'errors': len(failures),
+        'total_found': len(payloads)
+    }
+
+@shared_task
+def reanalyze_stale_articles(batch_size: int = None) -> Dict[str, Any]:
+    """
+    Задача для повторного анализа статей, обработанных старой версией анализатора.
+    
+    Пачку выбирает планировщик (core/reanalysis.py): свежие и популярные
+    статьи первыми, пропуск запуска при большой очереди новых статей.
+    """
+    try:
+        from core.reanalysis import next_batch
+        decision = next_batch(batch_size)
+        article_ids = decision.pop('article_ids')
+        if not article_ids:
+            return decision
         
-        for article in unanalyzed_articles:
-            try:
-                # Запускаем задачу анализа асинхронно
-                analyze_article_text.delay(article.id)
-                success_count += 1
-            except Exception as e:
-                logger.error(f"Failed to schedule analysis for article {article.id}: {str(e)}")
-                error_count += 1
+        from django.conf import settings
+        if not getattr(settings, 'USE_SPACY_ANALYZER', False):
+            result = _analyze_articles_in_pool(Article.objects.filter(id__in=article_ids))
+            return {**decision, **result}
         
-        logger.info(f"Scheduled analysis for {success_count} articles, {error_count} errors")
+        for article_id in article_ids:
+            analyze_article_text.apply_async((article_id,), {'force': True}, **backlog_options())
         
-        return {
-            'status': 'success',
-            'scheduled': success_count,
-            'errors': error_count,
-            'total_found': total_count
-        }
+        return {**decision, 'scheduled': len(article_ids)}
         
     except Exception as e:
-        logger.error(f"Error in analyze_unanalyzed_articles: {str(e)}")
+        logger.error(f"Error in reanalyze_stale_articles: {str(e)}")
+        return {'status': 'error', 'error': str(e)}
+
+@shared_task
+def flush_article_views() -> Dict[str, Any]:
+    """
+    Задача для сброса буфера просмотров статей в БД.
+    
+    Запускается по расписанию; просмотры накапливаются в быстром
+    хранилище и записываются пакетными UPDATE через F()-выражения.
+    """
+    try:
+        from core.view_counter import flush_pending_views
+        result = flush_pending_views()
+        if result['views']:
+            logger.info(f"Сброшено {result['views']} просмотров для {result['articles']} статей")
+        return {'status': 'success', **result}
+    except Exception as e:
+        logger.error(f"Error in flush_article_views: {str(e)}")
+        return {'status': 'error', 'error': str(e)}
+
+@shared_task
+def persist_usage_counters() -> Dict[str, Any]:
+    """
+    Задача для сохранения счетчиков квот в UsageTracking.
+    
+    Квоты расходуются атомарно в быстром хранилище; задача пакетно
+    записывает измененные счетчики в БД как долговременную копию.
+    """
+    try:
+        from accounts.quota import persist_usage
+        result = persist_usage()
+        return {'status': 'success', **result}
+    except Exception as e:
+        logger.error(f"Error in persist_usage_counters: {str(e)}")
+        return {'status': 'error', 'error': str(e)}
+
+@shared_task
+def maintain_usage_partitions() -> Dict[str, Any]:
+    """
+    Задача для обслуживания помесячных секций APIUsageLog.
+    
+    Создает секции на будущие месяцы, удаляет секции и строки секции
+    DEFAULT старше срока хранения (см. команду manage_usage_partitions).
+    """
+    try:
+        from django.core.management import call_command
+        from accounts.partitions import is_partitioned
+        if not is_partitioned():
+            return {'status': 'skipped'}
+        call_command('manage_usage_partitions')
+        return {'status': 'success'}
+    except Exception as e:
+        logger.error(f"Error in maintain_usage_partitions: {str(e)}")
+        return {'status': 'error', 'error': str(e)}
+
+@shared_task
+def materialize_trending() -> Dict[str, Any]:
+    """
+    Задача для пересчета трендов.
+    
+    Собирает топ-N статей по затухающему рейтингу просмотров
+    (общий, по темам и по источникам) для эндпоинта трендов.
+    """
+    try:
+        from core.trending import materialize_trending as materialize
+        result = materialize()
+        return {'status': 'success', **result}
+    except Exception as e:
+        logger.error(f"Error in materialize_trending: {str(e)}")
+        return {'status': 'error', 'error': str(e)}
+
+@shared_task
+def prune_crawl_runs() -> Dict[str, Any]:
+    """
+    Задача для очистки телеметрии парсинга.
+    
+    Удаляет записи CrawlRun старше CRAWL_RUN_RETENTION_DAYS дней.
+    """
+    try:
+        from core.crawl_telemetry import prune
+        deleted = prune()
+        return {'status': 'success', 'deleted': deleted}
+    except Exception as e:
+        logger.error(f"Error in prune_crawl_runs: {str(e)}")
+        return {'status': 'error', 'error': str(e)}
+
+@shared_task
+def export_articles_parquet(export_id: int) -> Dict[str, Any]:
+    """
+    Задача для фоновой выгрузки статей в Parquet.
+    
+    Собирает файл для ArticleExport (api/export.py). При ошибке
+    выгрузка помечается как неудачная, а израсходованная квота
+    возвращается пользователю.
+    """
+    from accounts import quota
+    from api.export import write_parquet
+    from core.models import ArticleExport
+    
+    try:
+        article_export = ArticleExport.objects.get(id=export_id)
+    except ArticleExport.DoesNotExist:
+        logger.error(f"Export {export_id} not found")
+        return {'status': 'error', 'error': 'Export not found'}
+    
+    article_export.status = 'running'
+    article_export.save(update_fields=['status'])
+    
+    try:
+        write_parquet(article_export)
+        article_export.status = 'done'
+    except Exception as e:
+        logger.error(f"Error in export_articles_parquet for export {export_id}: {str(e)}")
+        article_export.status = 'error'
+        article_export.error = str(e)
+        try:
+            quota.release(article_export.user_id, 'exports')
+        except Exception as release_error:
+            logger.error(f"Failed to release export quota for user {article_export.user_id}: {release_error}")
+    
+    article_export.finished_at = timezone.now()
+    article_export.save()
+    return {'status': article_export.status, 'export_id': export_id, 'rows': article_export.rows}
+
+@shared_task
+def prune_article_exports() -> Dict[str, Any]:
+    """
+    Задача для очистки фоновых выгрузок.
+    
+    Удаляет выгрузки и их файлы старше EXPORT_RETENTION_DAYS дней.
+    """
+    try:
+        from api.export import prune
+        deleted = prune()
+        return {'status': 'success', 'deleted': deleted}
+    except Exception as e:
+        logger.error(f"Error in prune_article_exports: {str(e)}")
         return {'status': 'error', 'error': str(e)}
 
 @shared_task